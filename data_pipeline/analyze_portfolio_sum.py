@@ -2,6 +2,7 @@
 import os
 from dotenv import load_dotenv
 from supabase import create_client
+from utils import fund_summary_utils
 
 load_dotenv('../credentials.env')
 supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
@@ -9,37 +10,26 @@ supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
 def analyze_sum():
     target_fund = "e5c0779e-996c-4094-9cb4-60e8f69df161"
     
-    # 1. Get Latest Period
+    # 1. Get Latest Period and its totals (fund_period_summary)
     print("Fetching latest period...")
-    res = supabase.table("fund_holdings").select("report_period").eq("fund_id", target_fund).order("report_period", desc=True).limit(1).execute()
-    if not res.data:
+    summaries = fund_summary_utils.get_fund_summaries(supabase, target_fund, latest_only=True)
+    if not summaries:
         print("No data.")
         return
         
-    latest = res.data[0]['report_period']
+    summary = summaries[0]
+    latest = summary['report_period']
     print(f"Latest Period: {latest}")
+    print(f"Holdings: {summary['position_count']}")
+    print(f"Total Assets: ${summary['total_value'] or 0:,.0f}")
+    print(f"Top 10 Weight: {(summary['top10_weight'] or 0) * 100:.1f}% | HHI: {summary['hhi'] or 0:.4f}")
     
-    # 2. Fetch all holdings for this period
-    rows = []
-    start = 0
-    batch = 1000
-    while True:
-        r = supabase.table("fund_holdings").select("symbol, value").eq("fund_id", target_fund).eq("report_period", latest).range(start, start+batch-1).execute()
-        if not r.data: break
-        rows.extend(r.data)
-        if len(r.data) < batch: break
-        start += batch
-        
-    print(f"Fetched {len(rows)} holdings.")
-    
-    # 3. Sum and Sort
-    total = sum(r['value'] for r in rows)
-    print(f"Total Assets: ${total:,.0f}")
-    
-    rows.sort(key=lambda x: x['value'], reverse=True)
+    # 2. Only the top entries are needed from fund_holdings
+    top = supabase.table("fund_holdings").select("symbol, value").eq("fund_id", target_fund).eq("report_period", latest) \
+        .order("value", desc=True).limit(20).execute()
     
     print("\n--- Top 20 Entries ---")
-    for i, r in enumerate(rows[:20]):
+    for i, r in enumerate(top.data or []):
         print(f"{i+1}. {r['symbol']}: ${r['value']:,.0f}")
 
 if __name__ == "__main__":
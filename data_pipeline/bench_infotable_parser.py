@@ -0,0 +1,103 @@
+
+import os
+import sys
+import time
+import resource
+import subprocess
+import tempfile
+import xml.etree.ElementTree as ET
+
+from utils.infotable_utils import iter_infotable_holdings
+
+# Peak RSS of the old buffer-everything parser vs the streaming parser
+# on synthetic information tables of increasing size.
+# Each measurement runs in a fresh process so ru_maxrss is not shared.
+
+SIZES = [5_000, 20_000, 80_000]
+CHUNK_SIZE = 64 * 1024
+
+NS = "http://www.sec.gov/edgar/document/thirteenf/informationtable"
+
+ENTRY = (
+    "<infoTable><nameOfIssuer>ISSUER {i} INC</nameOfIssuer><titleOfClass>COM</titleOfClass>"
+    "<cusip>{i:09d}</cusip><value>{value}</value>"
+    "<shrsOrPrnAmt><sshPrnamt>{shares}</sshPrnamt><sshPrnamtType>SH</sshPrnamtType></shrsOrPrnAmt>"
+    "<investmentDiscretion>SOLE</investmentDiscretion>"
+    "<votingAuthority><Sole>{shares}</Sole><Shared>0</Shared><None>0</None></votingAuthority>"
+    "</infoTable>\n"
+)
+
+
+def write_infotable(path, n):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<informationTable xmlns="{NS}">\n')
+        for i in range(n):
+            f.write(ENTRY.format(i=i, value=1000 + i, shares=100 + i))
+        f.write("</informationTable>\n")
+
+
+def parse_legacy(path):
+    # Same approach as the old parse_13f_infotable: whole body -> ET.fromstring -> list
+    with open(path, 'rb') as f:
+        root = ET.fromstring(f.read())
+    holdings = []
+    for info in root:
+        holding = {}
+        for child in info:
+            tag = child.tag.split('}', 1)[1]
+            if tag == 'nameOfIssuer': holding['name'] = child.text
+            elif tag == 'value': holding['value'] = float(child.text) * 1000
+        holdings.append(holding)
+    return len(holdings)
+
+
+def parse_streaming(path):
+    def chunks():
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+    return sum(1 for _ in iter_infotable_holdings(chunks()))
+
+
+def run_child(mode, path):
+    start = time.time()
+    count = parse_legacy(path) if mode == 'legacy' else parse_streaming(path)
+    elapsed = time.time() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{count} {elapsed:.3f} {peak_kb}")
+
+
+def measure(mode, path):
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', mode, path],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    ).stdout.split()
+    return int(out[0]), float(out[1]), int(out[2]) / 1024
+
+
+def main():
+    print(f"{'Entries':>8} | {'File MB':>7} | {'Legacy RSS MB':>13} | {'Stream RSS MB':>13} | {'Legacy s':>8} | {'Stream s':>8}")
+    print("-" * 75)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in SIZES:
+            path = os.path.join(tmp, f"infotable_{n}.xml")
+            write_infotable(path, n)
+            size_mb = os.path.getsize(path) / 1024 / 1024
+
+            legacy_count, legacy_s, legacy_mb = measure('legacy', path)
+            stream_count, stream_s, stream_mb = measure('streaming', path)
+            assert legacy_count == stream_count == n
+
+            print(f"{n:>8} | {size_mb:>7.1f} | {legacy_mb:>13.1f} | {stream_mb:>13.1f} | {legacy_s:>8.2f} | {stream_s:>8.2f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == '--child':
+        run_child(sys.argv[2], sys.argv[3])
+    else:
+        main()
@@ -0,0 +1,27 @@
+import os
+import sys
+from dotenv import load_dotenv
+from supabase import create_client
+from utils import fund_summary_utils
+
+load_dotenv('../credentials.env')
+supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
+
+def build_all(fund_ids=None):
+    """Backfill fund_period_summary for every quarter already in fund_holdings."""
+    print("📈 Building fund period summaries...\n")
+
+    query = supabase.table("hedge_funds").select("id, name")
+    if fund_ids:
+        query = query.in_("id", fund_ids)
+    funds = query.execute().data
+
+    for fund in funds:
+        try:
+            fund_summary_utils.refresh_fund_summaries(supabase, fund['id'], label=f"{fund['name']}: ")
+        except Exception as e:
+            print(f"   ❌ {fund['name']}: {e}")
+
+if __name__ == "__main__":
+    # Optional: fund ids as arguments to limit the run
+    build_all(sys.argv[1:] or None)
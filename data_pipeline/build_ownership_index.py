@@ -0,0 +1,30 @@
+import os
+import sys
+from dotenv import load_dotenv
+from supabase import create_client
+from utils import ownership_utils
+
+load_dotenv('../credentials.env')
+supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
+
+def build_all(fund_ids=None):
+    """Backfill symbol_ownership from fund_holdings, then export the web ownership artifacts."""
+    print("🗂️  Building symbol ownership index...\n")
+
+    query = supabase.table("hedge_funds").select("id, name")
+    if fund_ids:
+        query = query.in_("id", fund_ids)
+    funds = query.execute().data
+
+    for fund in funds:
+        try:
+            written = ownership_utils.rebuild_ownership(supabase, fund['id'], label=f"{fund['name']}: ")
+            print(f"   ✅ {fund['name']}: {written} index rows")
+        except Exception as e:
+            print(f"   ❌ {fund['name']}: {e}")
+
+    ownership_utils.export_ownership_index(supabase)
+
+if __name__ == "__main__":
+    # Optional: fund ids as arguments to limit the run
+    build_all(sys.argv[1:] or None)
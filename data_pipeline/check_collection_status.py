@@ -1,4 +1,3 @@
-
 import os
 from dotenv import load_dotenv
 from supabase import create_client
@@ -9,36 +8,21 @@ supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
 def check_status():
     print("📋 Checking Historical Data Collection Status...\n")
     
-    # 1. Get Funds
-    funds = supabase.table("hedge_funds").select("id, name").execute().data
+    # 1. One RPC for every fund: counts and range are aggregated in Postgres
+    # (see database/migrations/20261018_fund_audit_functions.sql) and come
+    # back as a single jsonb array, so the API row cap can't truncate it.
+    funds = supabase.rpc("fund_collection_status").execute().data or []
     
     for fund in funds:
-        fid = fund['id']
         name = fund['name']
         
-        # 2. Get Holdings Stats
-        # We can't do complex agg in one REST call easily without views/RPC.
-        # We'll fetch 'report_period' distinct or just count.
-        # Best proxy: fetch all unique report_periods
-        res = supabase.table("fund_holdings") \
-            .select("report_period") \
-            .eq("fund_id", fid) \
-            .execute()
-            
-        periods = [r['report_period'] for r in res.data]
-        unique_periods = sorted(list(set(periods)))
-        
-        if not unique_periods:
+        if not fund['period_count']:
             print(f"🔹 {name}: No data collected yet.")
             continue
             
-        count = len(unique_periods)
-        oldest = unique_periods[0]
-        newest = unique_periods[-1]
-        
         print(f"🔹 {name}:")
-        print(f"   - Collected Quarters: {count}")
-        print(f"   - Range: {oldest} ~ {newest}")
+        print(f"   - Collected Quarters: {fund['period_count']} ({fund['row_count']:,} rows)")
+        print(f"   - Range: {fund['oldest_period']} ~ {fund['newest_period']}")
         
         # Estimate completeness (approx 4 quarters per year)
         # If we expect back to 2000...
@@ -0,0 +1,24 @@
+import os
+import sys
+from dotenv import load_dotenv
+from supabase import create_client
+from utils import stock_sink_utils
+
+# Load environment variables
+load_dotenv(dotenv_path='../credentials.env')
+
+SUPABASE_URL = os.getenv('SUPABASE_URL')
+SUPABASE_KEY = os.getenv('SUPABASE_KEY')
+
+if not all([SUPABASE_URL, SUPABASE_KEY]):
+    print("❌ Error: Missing Supabase Credentials")
+    exit(1)
+
+supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+# Confirms the collector's stock_data sink merges valuation_metrics instead of
+# replacing it (enrich_stock_analysis.py's ai_analysis must survive a run).
+# Optional: a symbol to check; defaults to any enriched row.
+print("🔎 Checking that a stock_data sink write keeps enrichment keys...")
+ok = stock_sink_utils.check_enrichment_survives(supabase, sys.argv[1] if len(sys.argv) > 1 else None)
+sys.exit(0 if ok else 1)
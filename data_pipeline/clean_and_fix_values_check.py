@@ -3,6 +3,7 @@ import os
 import time
 from dotenv import load_dotenv
 from supabase import create_client
+from utils.pagination_utils import TableIterator
 
 load_dotenv('../credentials.env')
 supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
@@ -14,23 +15,8 @@ def clean_and_fix():
     print("Deleting symbols with '='...")
     # There isn't a simple LIKE query in python client for Delete? 
     # We can select IDs and delete.
-    res = supabase.table("fund_holdings").select("id, symbol").csv().execute()
-    # CSV is raw text, let's use standard select
-    # Fetching all symbols to filter locally might be safer/easier than complex match
-    
-    # Pagination
-    all_rows = []
-    start = 0
-    batch = 5000
-    while True:
-        print(f"   Fetching metadata {start}...")
-        r = supabase.table("fund_holdings").select("id, symbol, value").range(start, start+batch-1).execute()
-        if not r.data: break
-        all_rows.extend(r.data)
-        if len(r.data) < batch: break
-        start += batch
-        
-    print(f"Total rows: {len(all_rows)}")
+    # Keyset-paginated scan (prefetches the next page while this one is checked)
+    rows = TableIterator(supabase, "fund_holdings", "id, symbol, value", key_columns=("id",))
     
     # Identify items to delete and update
     to_delete = []
@@ -38,7 +24,7 @@ def clean_and_fix():
     
     bad_suffixes = ["=F", "=X", ".BA", ".SA", ".MX", ".T", "^"]
     
-    for row in all_rows:
+    for row in rows:
         sym = row['symbol']
         val = row['value']
         
@@ -70,6 +56,8 @@ def clean_and_fix():
         # STOP.
         # Let's re-verify the math.
     
+    rows.print_stats("fund_holdings: ")
+    print(f"Total rows: {rows.rows} ({len(to_delete)} bad symbols)")
     print("⚠️  Logic check required. Pausing.")
 
 if __name__ == "__main__":
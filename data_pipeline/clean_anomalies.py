@@ -1,57 +1,20 @@
-
-import os
+import sys
 from dotenv import load_dotenv
-from supabase import create_client
+from utils import maintenance_utils
 
 load_dotenv('../credentials.env')
-supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
+# Repair RPCs are granted to service_role only
+supabase = maintenance_utils.service_client()
 
-def clean_anomalies():
+def clean_anomalies(dry_run=False):
     print("🧹 Starting anomaly cleanup...")
 
-    # 1. Delete Bad Symbols
-    # Fetch all checking for bad patterns
-    print("Scanning for bad symbols...")
-    start = 0
-    batch = 5000
-    ids_to_back = []
-    
-    # Suffixes to remove
-    # Common Yahoo noise: =F, =X, .BA (Buenos Aires), .SA (Sao Paolo), .T (Tokyo), .L (London), .MX (Mexico)
-    bad_suffixes = ["=F", "=X", ".BA", ".SA", ".MX", ".T", ".L", ".HK", ".KS", ".TWO"] 
-    # Also anything with usually long extensions? 
-    # Just stick to observed ones + generic =.
-    
-    while True:
-        res = supabase.table("fund_holdings").select("id, symbol, value").range(start, start+batch-1).execute()
-        if not res.data: break
-        
-        for row in res.data:
-            sym = row['symbol']
-            val = row['value']
-            
-            # Check symbol
-            is_bad = False
-            if "=" in sym: is_bad = True
-            for s in bad_suffixes:
-                if sym.endswith(s): is_bad = True
-            
-            if is_bad:
-                print(f"   Deleting Bad Symbol: {sym}")
-                supabase.table("fund_holdings").delete().eq("id", row['id']).execute()
-            
-            # Check Value > 500 Billion (500 * 10^9 = 500,000,000,000)
-            # 500 Billion.
-            elif val > 500_000_000_000:
-                print(f"   Fixing Inflated Value: {sym} (${val:,.0f})")
-                new_val = val / 1000
-                supabase.table("fund_holdings").update({"value": new_val}).eq("id", row['id']).execute()
-
-        if len(res.data) < batch: break
-        start += batch
-        print(f"   Scanned up to {start}...")
+    # 1. Delete Bad Symbols (=F, =X, .BA, .SA, .T, .L, ...)
+    # 2. Fix Inflated Values (> $500B -> / 1000)
+    # Both run server-side as single statements (see utils/maintenance_utils.py)
+    maintenance_utils.run_rules(supabase, ['bad_symbols', 'inflated_values'], dry_run=dry_run)
 
     print("✅ Cleanup finished.")
 
 if __name__ == "__main__":
-    clean_anomalies()
+    clean_anomalies(dry_run="--dry-run" in sys.argv)
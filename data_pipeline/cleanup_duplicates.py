@@ -1,7 +1,9 @@
-
 import os
+import sys
 from dotenv import load_dotenv
 from supabase import create_client
+from utils import maintenance_utils, dedup_utils
+from utils.pagination_utils import Throughput
 
 # Load environment variables
 load_dotenv('../credentials.env')
@@ -15,70 +17,53 @@ if not all([SUPABASE_URL, SUPABASE_KEY]):
 
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-def cleanup_duplicates():
-    print("Fetching all fund_holdings to check for metadata duplicates...")
-    
-    # Fetch relevant columns (all rows)
-    # Uses pagination
-    all_rows = []
-    start = 0
-    batch_size = 1000
-    
-    while True:
-        print(f"Fetching rows {start}...")
-        res = supabase.table("fund_holdings").select("id, fund_id, symbol, report_period, created_at").range(start, start + batch_size - 1).execute()
-        data = res.data
-        if not data:
-            break
-        all_rows.extend(data)
-        if len(data) < batch_size:
-            break
-        start += batch_size
+def cleanup_duplicates(dry_run=False):
+    print("Checking fund_holdings for (fund_id, symbol, report_period) duplicates...")
 
-    print(f"Total rows fetched: {len(all_rows)}")
+    # Grouping and deletion happen in one server-side statement; the oldest
+    # row (created_at) of each group is kept.
+    # The repair RPC is granted to service_role only
+    maintenance_utils.run_rules(maintenance_utils.service_client(), ['duplicate_keys'], dry_run=dry_run)
 
-    # Group by (fund_id, symbol, report_period)
-    groups = {}
-    for row in all_rows:
-        key = (row['fund_id'], row['symbol'], row['report_period'])
-        if key not in groups:
-            groups[key] = []
-        groups[key].append(row)
+    print("✅ Cleanup complete.")
 
-    # Identify duplicates
-    ids_to_delete = []
-    duplicate_groups = 0
-    
-    for key, rows in groups.items():
-        if len(rows) > 1:
-            duplicate_groups += 1
-            # Sort by created_at desc (keep latest) or asc (keep first). 
-            # Let's keep the one created LATEST? Or FIRST? 
-            # Ideally keep the first one to avoid "new" IDs if referenced elsewhere?
-            # Actually, let's keep the one with the LATEST created_at (most recent update?)
-            # Or usually FIRST is safer for strict continuity. Let's keep the FIRST one (oldest).
-            rows.sort(key=lambda x: x['created_at'])
-            
-            # Keep rows[0], delete rest
-            for r in rows[1:]:
-                ids_to_delete.append(r['id'])
+def cleanup_duplicates_streaming(dry_run=False, batch_size=100):
+    """
+    Client-side fallback (no maintenance RPC deployed): stream rows in
+    natural-key order and delete every row but the oldest of each group.
+    Memory holds one key group plus the pending delete batch.
+    """
+    print("Streaming fund_holdings in (fund_id, symbol, report_period) order...")
 
-    print(f"Found {duplicate_groups} groups with duplicates.")
-    print(f"Total records to delete: {len(ids_to_delete)}")
+    meter = Throughput(label="Scanned ")
+    pending = []
+    touched = set()
+    duplicate_groups = deleted = 0
 
-    if not ids_to_delete:
-        print("No duplicates found to delete.")
-        return
+    def flush():
+        nonlocal deleted
+        if pending and not dry_run:
+            supabase.table("fund_holdings").delete().in_("id", pending).execute()
+            deleted += len(pending)
+        pending.clear()
 
-    # Delete in batches
-    print("Deleting duplicates...")
-    batch_size = 100
-    for i in range(0, len(ids_to_delete), batch_size):
-        batch = ids_to_delete[i:i+batch_size]
-        print(f"Deleting batch {i//batch_size + 1}/{len(ids_to_delete)//batch_size + 1} ({len(batch)} items)")
-        supabase.table("fund_holdings").delete().in_("id", batch).execute()
+    for group in dedup_utils.iter_holdings_duplicates(supabase, meter=meter):
+        duplicate_groups += 1
+        # Keep group[0] (oldest created_at), delete the rest
+        pending.extend(r['id'] for r in group[1:])
+        touched.add((group[0]['fund_id'], group[0]['report_period']))
+        if len(pending) >= batch_size:
+            flush()
+    flush()
 
-    print("✅ Cleanup complete.")
+    stats = meter.summary()
+    print(f"Scanned {stats['rows']:,} rows in {stats['elapsed']}s ({stats['rows_per_s']:,} rows/s)")
+    print(f"Found {duplicate_groups} groups with duplicates, deleted {deleted} records{' (dry run)' if dry_run else ''}.")
+    if deleted:
+        maintenance_utils.refresh_derived(supabase, touched)
 
 if __name__ == "__main__":
-    cleanup_duplicates()
+    if "--streaming" in sys.argv:
+        cleanup_duplicates_streaming(dry_run="--dry-run" in sys.argv)
+    else:
+        cleanup_duplicates(dry_run="--dry-run" in sys.argv)
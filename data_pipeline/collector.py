@@ -3,43 +3,42 @@ import yfinance as yf
 import json
 from datetime import datetime
 import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from utils.retry_utils import retry
+from utils import market_data_utils
+from utils.journal_utils import RecordJournal, write_json_atomic
+from utils import universe_utils
+from utils import static_artifact_utils
+from utils import stock_sink_utils
 
 # Define JSON Output Path (Next.js Public Folder)
 script_dir = os.path.dirname(os.path.abspath(__file__))
 # Note: ../web-app/public is standard for Next.js static assets
-JSON_OUTPUT_PATH = os.path.join(script_dir, '..', 'web-app', 'public', 'stock_data.json')
-CHECKPOINT_FILE = os.path.join(script_dir, 'processed_symbols.json')
-
-# Static List for MVP
-TARGET_SYMBOLS = [
-    "AAPL", "MSFT", "NVDA", "GOOGL", "AMZN", "META", "TSLA", # Tech
-    "MMM", "KO", "JNJ", "PG", "O", "T", "MAIN", "SCHD", "JEPI", # Dividend
-    "SPY", "QQQ", "VOO" # ETF
-]
-
-def load_checkpoint():
-    if os.path.exists(CHECKPOINT_FILE):
-        try:
-            with open(CHECKPOINT_FILE, 'r') as f:
-                return set(json.load(f))
-        except:
-            return set()
-    return set()
+PUBLIC_DIR = os.path.join(script_dir, '..', 'web-app', 'public')
+# Full dataset (pipeline merge base); the web app reads the per-view artifacts from stock_manifest.json
+JSON_OUTPUT_PATH = os.path.join(PUBLIC_DIR, 'stock_data.json')
+# Per-symbol results of the current run (JSON lines); removed once the artifact is built
+JOURNAL_FILE = os.path.join(script_dir, '.cache', 'collector_journal.jsonl')
+# A journal older than this is from an abandoned run, not a resumable one
+JOURNAL_MAX_AGE_HOURS = 20
+# Output of `--shard i/N` runs, combined by `--merge N`
+SHARD_DIR = os.path.join(script_dir, '.cache', 'shards')
 
-def save_checkpoint(processed):
-    with open(CHECKPOINT_FILE, 'w') as f:
-        json.dump(list(processed), f)
+# Batched mode: symbols per quote download / journal append, and concurrent .info fetches
+BATCH_SIZE = 100
+INFO_WORKERS = 8
 
 @retry(max_retries=3, initial_delay=2, backoff_factor=2)
-def process_symbol(symbol):
-    print(f"Processing {symbol}...")
+def fetch_info(symbol):
     ticker = yf.Ticker(symbol)
     # Force fetch to trigger potential network errors enabling retry
-    info = ticker.info
-    
-    # Map yfinance info to our schema
-    price = info.get('currentPrice') or info.get('regularMarketPrice') or info.get('previousClose')
+    return ticker.info
+
+def build_record(symbol, info, quote=None):
+    """Map yfinance info (plus an optional batch quote for the price fields) to our schema."""
+    quote = quote or {}
+    price = quote.get('price') or info.get('currentPrice') or info.get('regularMarketPrice') or info.get('previousClose')
     if not price:
         print(f"Skipping {symbol}: No price data")
         return None
@@ -63,7 +62,8 @@ def process_symbol(symbol):
         'ev_ebitda_ttm': info.get('enterpriseToEbitda')
     }
     
-    change_p = info.get('regularMarketChangePercent') or 0.0
+    change_p = quote.get('changes_percentage') if 'changes_percentage' in quote \
+        else (info.get('regularMarketChangePercent') or 0.0)
 
     data = {
         'symbol': symbol,
@@ -83,56 +83,229 @@ def process_symbol(symbol):
     }
     return data
 
-def fetch_and_save_data():
-    print(f"Starting data collection for {len(TARGET_SYMBOLS)} symbols via yfinance...")
-    
-    # Load existing data to append/update instead of overwrite if resuming
-    all_stocks = []
+def process_symbol(symbol):
+    print(f"Processing {symbol}...")
+    return build_record(symbol, fetch_info(symbol))
+
+def process_batch(symbols, max_workers=INFO_WORKERS):
+    """
+    Collect one batch: price fields for every symbol in a single multi-ticker
+    download, .info on a bounded thread pool. Each symbol keeps its own @retry
+    and a failure only drops that symbol. Returns (records, failed).
+    """
+    quotes = market_data_utils.get_batch_quotes(symbols, batch_size=len(symbols) or 1)
+    records, failed = {}, []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch_info, sym): sym for sym in symbols}
+        for future in as_completed(futures):
+            sym = futures[future]
+            try:
+                data = build_record(sym, future.result(), quotes.get(sym))
+                if data:
+                    records[sym] = data
+            except Exception as e:
+                print(f"Failed to process {sym} after retries: {e}")
+                failed.append(sym)
+    return records, failed
+
+def load_published():
     if os.path.exists(JSON_OUTPUT_PATH):
         try:
             with open(JSON_OUTPUT_PATH, 'r', encoding='utf-8') as f:
-                all_stocks = json.load(f)
-        except:
-            all_stocks = []
-            
-    # Create a map for easy update
-    stock_map = {item['symbol']: item for item in all_stocks}
-    
-    processed_symbols = load_checkpoint()
-    
-    # Check if we should reset checkpoint (e.g., if all done, or simple manual reset logic)
-    # For this simple bot, we'll assume if len(processed) == len(TARGET), we reset.
-    if len(processed_symbols) >= len(TARGET_SYMBOLS):
-        print("All symbols previously processed. Resetting checkpoint for new run.")
-        processed_symbols = set()
-        save_checkpoint(processed_symbols)
-
-    for symbol in TARGET_SYMBOLS:
-        if symbol in processed_symbols:
-            print(f"Skipping {symbol} (Already processed).")
-            continue
-            
-        try:
-            data = process_symbol(symbol)
-            if data:
-                stock_map[symbol] = data
-                processed_symbols.add(symbol)
-                save_checkpoint(processed_symbols)
-                
-                # Intermediate save to JSON (Safety)
-                with open(JSON_OUTPUT_PATH, 'w', encoding='utf-8') as f:
-                    json.dump(list(stock_map.values()), f, indent=2, ensure_ascii=False)
-                    
+                return json.load(f)
         except Exception as e:
-            print(f"Failed to process {symbol} after retries: {e}")
-            # Do not add to processed_symbols so it tries again next run
-            
-    # Final Save
-    final_list = list(stock_map.values())
-    with open(JSON_OUTPUT_PATH, 'w', encoding='utf-8') as f:
-        json.dump(final_list, f, indent=2, ensure_ascii=False)
-        
-    print(f"✅ Successfully saved {len(final_list)} stocks to {JSON_OUTPUT_PATH}")
+            print(f"⚠️ Could not read {JSON_OUTPUT_PATH}: {e}")
+    return []
+
+def get_supabase():
+    """Supabase client from credentials.env / the environment, or None when not configured."""
+    from dotenv import load_dotenv
+    from supabase import create_client
+    load_dotenv('../credentials.env')
+    url, key = os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY')
+    return create_client(url, key) if url and key else None
+
+def load_universe(source='file'):
+    """Symbols to collect: the versioned universe file, or everything already in stock_data."""
+    if source == 'db':
+        return universe_utils.load_symbols_from_db(get_supabase())
+    return universe_utils.load_symbol_file()
+
+def shard_path(index, count):
+    return os.path.join(SHARD_DIR, f"stock_data.shard-{index}-of-{count}.json")
+
+def collect(symbols, journal, batched=True, max_workers=INFO_WORKERS):
+    """Fetch `symbols`, resuming from `journal`. Returns (records by symbol, failed symbols)."""
+    wanted = set(symbols)
+    collected = {s: r for s, r in journal.load().items() if s in wanted}
+    if collected:
+        print(f"Resuming: {len(collected)} symbols already collected in the journal.")
+
+    pending = [s for s in symbols if s not in collected]
+    if len(pending) < len(symbols):
+        print(f"Skipping {len(symbols) - len(pending)} symbols (Already processed).")
+
+    # Failed symbols are not journaled: they keep their published values and are fetched again next run
+    start = time.time()
+    done = 0
+    failed = []
+    if batched:
+        for i in range(0, len(pending), BATCH_SIZE):
+            batch = pending[i:i + BATCH_SIZE]
+            batch_start = time.time()
+            records, batch_failed = process_batch(batch, max_workers=max_workers)
+            journal.append(records.values())
+            collected.update(records)
+            failed.extend(batch_failed)
+
+            done += len(batch)
+            elapsed = time.time() - batch_start
+            print(f"📦 Batch {i // BATCH_SIZE + 1}: {len(records)}/{len(batch)} ok, {len(batch_failed)} failed "
+                  f"in {elapsed:.1f}s ({elapsed / len(batch) * 100:.1f}s per 100 symbols)")
+    else:
+        for symbol in pending:
+            try:
+                data = process_symbol(symbol)
+                if data:
+                    journal.append([data])
+                    collected[symbol] = data
+            except Exception as e:
+                print(f"Failed to process {symbol} after retries: {e}")
+                failed.append(symbol)
+            done += 1
+
+    if done:
+        elapsed = time.time() - start
+        print(f"⏱️ {done} symbols in {elapsed:.1f}s ({elapsed / done * 100:.1f}s per 100 symbols, "
+              f"{'batched' if batched else 'serial'})")
+    return collected, failed
+
+def publish(collected, failed_count=0):
+    """
+    Sink this run's records. Each record is hashed (volatile fields excluded)
+    and compared with the last published hash: stock_data gets one bulk
+    upsert of the rows that changed, and stock_data.json is rewritten with
+    the changed records merged in. The web artifacts are rebuilt whenever
+    anything changed or the manifest does not match stock_data.json (missing,
+    or left stale by a failed export); unchanged symbols reuse their
+    content-hashed detail files. An export failure is raised, not swallowed.
+    """
+    published = {item['symbol']: item for item in load_published()}
+    changed, unchanged = stock_sink_utils.split_changed(
+        collected.values(), {sym: stock_sink_utils.record_hash(r) for sym, r in published.items()})
+    print(f"🧮 JSON: {len(changed)} changed, {len(unchanged)} skipped ({failed_count} failed)")
+
+    published.update({r['symbol']: r for r in changed})
+    final_list = list(published.values())
+    if changed:
+        write_json_atomic(JSON_OUTPUT_PATH, final_list, separators=(',', ':'))
+        print(f"✅ Successfully saved {len(final_list)} stocks to {JSON_OUTPUT_PATH}")
+    else:
+        print(f"✅ {JSON_OUTPUT_PATH} already up to date.")
+
+    try:
+        supabase = get_supabase()
+        if supabase is None:
+            print("⚠️ Supabase credentials missing. Skipping the stock_data sink.")
+        else:
+            db = stock_sink_utils.sink_to_db(supabase, list(collected.values()))
+            print(f"🧮 stock_data: {db['changed']} changed, {db['skipped']} skipped, {db['written']} written")
+    except Exception as e:
+        print(f"⚠️ stock_data sink failed: {e}")
+
+    public_dir = os.path.dirname(JSON_OUTPUT_PATH)
+    if not changed and static_artifact_utils.artifacts_current(final_list, public_dir):
+        print("✅ Web artifacts already up to date.")
+        return
+    stats = static_artifact_utils.publish_static_artifacts(final_list, public_dir)
+    print(f"🗂️ Web artifacts: index {stats['index_bytes']:,} B ({stats['index_gzip_bytes']:,} B gzip), "
+          f"{stats['buckets']} buckets, {stats['written']} files written, {stats['reused']} unchanged, "
+          f"{stats['removed']} pruned")
+
+def fetch_and_save_data(batched=True, max_workers=INFO_WORKERS, shard=None, universe_source='file'):
+    symbols = load_universe(universe_source)
+    version = universe_utils.universe_version(symbols)
+
+    if shard is None:
+        print(f"Starting data collection for {len(symbols)} symbols via yfinance (universe {version})...")
+        journal = RecordJournal(JOURNAL_FILE, key='symbol', max_age_hours=JOURNAL_MAX_AGE_HOURS)
+        collected, failed = collect(symbols, journal, batched, max_workers)
+        publish(collected, len(failed))
+        journal.discard()
+        return
+
+    index, count = shard
+    selected = universe_utils.select_shard(symbols, index, count)
+    print(f"Starting shard {index}/{count}: {len(selected)} of {len(symbols)} symbols (universe {version})...")
+    journal = RecordJournal(JOURNAL_FILE.replace('.jsonl', f'.shard-{index}-of-{count}.jsonl'),
+                            key='symbol', max_age_hours=JOURNAL_MAX_AGE_HOURS)
+    collected, failed = collect(selected, journal, batched, max_workers)
+
+    write_json_atomic(shard_path(index, count), {
+        'shard': index,
+        'shards': count,
+        'universe_version': version,
+        'symbols': len(selected),
+        'failed': failed,
+        'generated_at': datetime.utcnow().isoformat(),
+        'records': list(collected.values())
+    }, separators=(',', ':'))
+    journal.discard()
+    print(f"✅ Shard {index}/{count}: {len(collected)} collected, {len(failed)} failed -> {shard_path(index, count)}")
+
+def merge_shards(count):
+    """
+    Combine the outputs of `--shard 0/N` ... `--shard N-1/N` into the public
+    artifact. Whatever shards exist are published; the missing shard indexes
+    are returned (their symbols keep their old values) so the caller can fail.
+    """
+    print(f"🔗 Merging {count} shards...")
+    collected, failed, versions, found, missing = {}, [], set(), [], []
+    for index in range(count):
+        path = shard_path(index, count)
+        if not os.path.exists(path):
+            missing.append(index)
+            print(f"   ⚠️ Shard {index}/{count} missing ({path}); its symbols keep their published values.")
+            if os.getenv('GITHUB_ACTIONS'):
+                print(f"::warning::Stock shard {index}/{count} output missing; its symbols were not updated")
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            part = json.load(f)
+        versions.add(part['universe_version'])
+        collected.update({r['symbol']: r for r in part['records']})
+        failed.extend(part['failed'])
+        found.append(path)
+        print(f"   Shard {index}/{count}: {len(part['records'])}/{part['symbols']} symbols")
+
+    if not found:
+        print("❌ No shard outputs found. Nothing to merge.")
+        return missing
+    if len(versions) > 1:
+        # Shards cut from different universe lists can overlap or leave gaps
+        print(f"   ⚠️ Shards were built from different universe versions: {sorted(versions)}")
+
+    publish(collected, len(failed))
+    for path in found:
+        os.remove(path)
+    return missing
 
 if __name__ == "__main__":
-    fetch_and_save_data()
+    parser = argparse.ArgumentParser(description="Collect quotes and fundamentals for the stock universe")
+    parser.add_argument("--serial", action="store_true", help="Fetch one symbol at a time (no batching)")
+    parser.add_argument("--workers", type=int, default=INFO_WORKERS, help="Concurrent .info fetches in batched mode")
+    parser.add_argument("--universe", choices=["file", "db"], default="file",
+                        help="Symbol source: universe/stock_universe.txt or the stock_data table")
+    parser.add_argument("--shard", help="Collect only shard i of N (e.g. 0/4) into .cache/shards/")
+    parser.add_argument("--merge", type=int, metavar="N", help="Merge the outputs of N shards and publish")
+    args = parser.parse_args()
+
+    if args.merge:
+        missing = merge_shards(args.merge)
+        if missing:
+            # Published what was there, but the run is incomplete: fail the step
+            print(f"❌ {len(missing)}/{args.merge} shard(s) missing: {missing}")
+            exit(1)
+    else:
+        shard = universe_utils.parse_shard(args.shard) if args.shard else None
+        fetch_and_save_data(batched=not args.serial, max_workers=args.workers,
+                            shard=shard, universe_source=args.universe)
@@ -0,0 +1,39 @@
+import os
+import sys
+from dotenv import load_dotenv
+from supabase import create_client
+from utils import fund_similarity_utils
+from utils.pagination_utils import TableIterator
+
+load_dotenv('../credentials.env')
+supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
+
+def compute_all(periods=None):
+    """Recompute fund_similarity for the given quarters (default: every quarter in fund_period_summary)."""
+    print("🧬 Computing fund similarity...\n")
+
+    if not periods:
+        rows = TableIterator(supabase, "fund_period_summary", "fund_id, report_period",
+                             key_columns=("report_period", "fund_id"))
+        periods = sorted({r['report_period'] for r in rows})
+
+    # Oldest first so cosine_change can compare against the quarter before
+    for period in sorted(periods):
+        fund_similarity_utils.update_period_similarity(supabase, period)
+
+    # Latest quarter: most similar pairs
+    funds = {f['id']: f['name'] for f in supabase.table("hedge_funds").select("id, name").execute().data}
+    if periods:
+        latest = max(periods)
+        top = supabase.table("fund_similarity").select("*").eq("report_period", latest) \
+            .order("cosine", desc=True).limit(10).execute().data or []
+        print(f"\n--- Most similar pairs ({latest}) ---")
+        for p in top:
+            change = f" ({p['cosine_change']:+.3f} q/q)" if p['cosine_change'] is not None else ""
+            print(f"{funds.get(p['fund_a'], p['fund_a'])} ↔ {funds.get(p['fund_b'], p['fund_b'])}: "
+                  f"cosine {p['cosine']:.3f}{change}, overlap {p['overlap_a']:.0%} / {p['overlap_b']:.0%}, "
+                  f"{p['shared_positions']} shared")
+
+if __name__ == "__main__":
+    # Optional: report periods (YYYY-MM-DD) as arguments
+    compute_all(sys.argv[1:] or None)
@@ -0,0 +1,27 @@
+import os
+import sys
+from dotenv import load_dotenv
+from supabase import create_client
+from utils import position_diff_utils
+
+load_dotenv('../credentials.env')
+supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
+
+def compute_all(fund_ids=None):
+    """Full recompute of change_from_prev / first_added / estimated_entry_price for every fund."""
+    print("🔁 Computing quarter-over-quarter position diffs...\n")
+
+    query = supabase.table("hedge_funds").select("id, name")
+    if fund_ids:
+        query = query.in_("id", fund_ids)
+    funds = query.execute().data
+
+    for fund in funds:
+        try:
+            position_diff_utils.update_fund_diffs(supabase, fund['id'], label=f"{fund['name']}: ")
+        except Exception as e:
+            print(f"   ❌ {fund['name']}: {e}")
+
+if __name__ == "__main__":
+    # Optional: fund ids as arguments to limit the run
+    compute_all(sys.argv[1:] or None)
@@ -2,6 +2,8 @@
 import os
 from dotenv import load_dotenv
 from supabase import create_client
+from utils import dedup_utils
+from utils.pagination_utils import Throughput
 
 # Load environment variables
 load_dotenv('../credentials.env')
@@ -25,36 +27,22 @@ print(f"Total Rows: {res.count}")
 target_fund_id = "e5c0779e-996c-4094-9cb4-60e8f69df161" # Berkshire Hathaway
 print(f"\nChecking duplicates for Fund ID: {target_fund_id}")
 
-# Fetch all holdings for this fund
-all_holdings = []
-start = 0
-step = 1000
-while True:
-    print(f"Fetching {start}..{start+step}")
-    res = supabase.table("fund_holdings").select("symbol, report_period").eq("fund_id", target_fund_id).range(start, start+step-1).execute()
-    data = res.data
-    all_holdings.extend(data)
-    if len(data) < step:
-        break
-    start += step
-
-print(f"Fetched {len(all_holdings)} rows for fund.")
-
-# Analyze for dups
-seen = {}
+# Stream this fund's holdings in (symbol, report_period) order with keyset
+# pagination; only the current key group is kept in memory.
+meter = Throughput(label="Scanned ")
 duplicates = 0
-for h in all_holdings:
-    key = f"{h['symbol']}_{h['report_period']}"
-    if key in seen:
-        duplicates += 1
-    seen[key] = seen.get(key, 0) + 1
-
-print(f"Found {duplicates} duplicates out of {len(all_holdings)} rows.")
+groups = 0
+samples = []
+for group in dedup_utils.iter_holdings_duplicates(supabase, fund_id=target_fund_id, meter=meter):
+    groups += 1
+    duplicates += len(group) - 1
+    if len(samples) < 6:
+        samples.append((f"{group[0]['symbol']}_{group[0]['report_period']}", len(group)))
+
+stats = meter.summary()
+print(f"Fetched {stats['rows']} rows for fund in {stats['elapsed']}s ({stats['rows_per_s']:,} rows/s).")
+print(f"Found {duplicates} duplicates out of {stats['rows']} rows.")
 if duplicates > 0:
     print("Sample Duplicates:")
-    count = 0
-    for k, v in seen.items():
-        if v > 1:
-            print(f"  {k}: {v} times")
-            count += 1
-            if count > 5: break
+    for k, v in samples:
+        print(f"  {k}: {v} times")
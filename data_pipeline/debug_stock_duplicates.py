@@ -1,7 +1,9 @@
 
 import os
+import re
 from dotenv import load_dotenv
 from supabase import create_client
+from utils.pagination_utils import TableIterator
 
 # Load environment variables
 load_dotenv('../credentials.env')
@@ -20,40 +22,29 @@ print("Fetching total stock count...")
 res = supabase.table("stock_data").select("symbol", count="exact", head=True).execute()
 print(f"Total Stocks: {res.count}")
 
-# 2. Check for Duplicates in batches
+# 2. Check for Duplicates by natural key
+# symbol is the primary key, so exact repeats can't exist; a duplicate is
+# the same listing stored under different spellings (BRK.B / BRK-B / brk-b).
+# Rows are grouped by the normalized symbol in one keyset pass.
+def natural_key(symbol):
+    return re.sub(r'[./]', '-', symbol.strip().upper())
+
 print("\nChecking for duplicates in stock_data...")
-start = 0
-step = 1000
-seen_symbols = {}
-duplicates = 0
-sample_dupes = []
-
-while True:
-    print(f"Scanning {start}..{start+step} (Total so far: {len(seen_symbols)})")
-    res = supabase.table("stock_data").select("symbol").range(start, start+step-1).execute()
-    data = res.data
-    
-    if not data:
-        break
-        
-    for row in data:
-        sym = row['symbol']
-        if sym in seen_symbols:
-            duplicates += 1
-            if len(sample_dupes) < 10:
-                sample_dupes.append(sym)
-        seen_symbols[sym] = seen_symbols.get(sym, 0) + 1
-        
-    if len(data) < step:
-        break
-    start += step
+rows = TableIterator(supabase, "stock_data", "symbol", key_columns=("symbol",))
+groups = {}
+for row in rows:
+    groups.setdefault(natural_key(row['symbol']), []).append(row['symbol'])
+
+rows.print_stats("stock_data: ")
+dupes = {key: symbols for key, symbols in groups.items() if len(symbols) > 1}
+duplicates = sum(len(symbols) - 1 for symbols in dupes.values())
 
 print(f"\nAnalysis Complete.")
-print(f"Unique Symbols: {len(seen_symbols)}")
+print(f"Unique Symbols: {len(groups)}")
 print(f"Duplicate Entries: {duplicates}")
 
 if duplicates > 0:
-    print(f"Sample Duplicates: {sample_dupes}")
-    print("Example counts:")
-    for d in sample_dupes[:5]:
-        print(f"  {d}: {seen_symbols[d]}")
+    print(f"Sample Duplicates: {list(dupes)[:10]}")
+    print("Example spellings:")
+    for key, symbols in list(dupes.items())[:5]:
+        print(f"  {key}: {', '.join(symbols)}")
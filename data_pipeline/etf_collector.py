@@ -1,9 +1,9 @@
 import os
-import requests
 import json
 from datetime import datetime
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from utils.http_client_utils import get_client
 
 # Load environment variables
 load_dotenv(dotenv_path='../credentials.env')
@@ -19,11 +19,14 @@ else:
     print("Warning: Supabase credentials not found. Data will not be saved.")
     supabase = None
 
+# Shared keep-alive client (one TLS handshake for all FMP calls)
+http = get_client()
+
 def fetch_etf_holdings(symbol):
     """Fetch ETF holdings from FMP"""
     # Note: FMP endpoint for ETF holders might vary. Using a standard one.
     url = f"https://financialmodelingprep.com/api/v3/etf-holder/{symbol}?apikey={FMP_API_KEY}"
-    response = requests.get(url)
+    response = http.get(url)
     if response.status_code == 200:
         return response.json()
     else:
@@ -57,5 +60,7 @@ def update_etf_data():
             else:
                 print(f"Data for {symbol} fetched (Size: {len(holdings)}), but Supabase not configured.")
 
+    http.print_stats()
+
 if __name__ == "__main__":
     update_etf_data()
@@ -2,6 +2,8 @@
 import os
 from dotenv import load_dotenv
 from supabase import create_client
+from utils import fund_summary_utils
+from utils.pagination_utils import TableIterator
 
 load_dotenv('../credentials.env')
 supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
@@ -16,32 +18,21 @@ def fix_normalization():
         name = fund['name']
         print(f"\nEvaluating {name}...")
         
-        # Check latest total assets
-        res = supabase.table("fund_holdings").select("report_period").eq("fund_id", fid).order("report_period", desc=False).limit(1).execute()
-        if not res.data: continue
-        latest = res.data[0]['report_period'] # Earliest? 
-        # Wait, order desc=False is ASCENDING (oldest).
-        # verify_all_funds used desc=False (Ascending) for earliest.
-        # I want LATEST. desc=True.
-        
-        res_latest = supabase.table("fund_holdings").select("report_period").eq("fund_id", fid).order("report_period", desc=True).limit(1).execute()
-        if not res_latest.data: continue
-        latest = res_latest.data[0]['report_period']
-        
-        # Calculate Total for Latest
-        # Batch fetch
-        rows = []
-        start = 0
-        while True:
-            r = supabase.table("fund_holdings").select("value").eq("fund_id", fid).eq("report_period", latest).range(start, start+999).execute()
-            if not r.data: break
-            rows.extend(r.data)
-            if len(r.data) < 1000: break
-            start += 1000
-            
-        total = sum([x['value'] for x in rows])
+        # Check latest total assets (precomputed per quarter in fund_period_summary)
+        latest_summary = fund_summary_utils.get_fund_summaries(supabase, fid, latest_only=True)
+        if not latest_summary: continue
+        latest = latest_summary[0]['report_period']
+        total = latest_summary[0]['total_value'] or 0
         print(f"   Latest Assets ({latest}): ${total:,.0f}")
         
+        # Filings ingested with unit detection are already scaled correctly
+        detected = supabase.table("filing_manifest").select("value_unit, unit_confidence") \
+            .eq("fund_id", fid).eq("report_period", latest).not_.is_("value_unit", "null").limit(1).execute()
+        if detected.data:
+            d = detected.data[0]
+            print(f"   ✅ Unit detected at ingest ({d['value_unit']}, confidence {d['unit_confidence']}). Skipping.")
+            continue
+        
         multiplier = 1
         
         # Heuristics
@@ -73,15 +64,14 @@ def fix_normalization():
             # Optimization: 
             # Process in chunks of 1000.
             
-            all_start = 0
-            while True:
+            # Keyset pages by id: updating `value` can't shift later pages
+            pages = TableIterator(supabase, "fund_holdings", "id, fund_id, symbol, report_period, value",
+                                  key_columns=("id",), filters=lambda q: q.eq("fund_id", fid))
+            for chunk in pages.pages():
                 # Fetch chunk with all necessary columns for safe upsert
-                print(f"   Processing chunk {all_start}...")
-                chunk = supabase.table("fund_holdings").select("id, fund_id, symbol, report_period, value").eq("fund_id", fid).range(all_start, all_start+999).execute()
-                if not chunk.data: break
-                
+                print(f"   Processing chunk {pages.rows - len(chunk)}...")
                 updates = []
-                for row in chunk.data:
+                for row in chunk:
                     updates.append({
                         "id": row['id'],
                         "fund_id": row['fund_id'],
@@ -94,10 +84,10 @@ def fix_normalization():
                 # upsert works with ID.
                 if updates:
                     r = supabase.table("fund_holdings").upsert(updates).execute()
-                    
-                if len(chunk.data) < 1000: break
-                all_start += 1000
+            pages.print_stats(f"{name}: ")
                 
+            # Values changed for every quarter: rebuild the summaries
+            fund_summary_utils.refresh_fund_summaries(supabase, fid, label=f"{name}: ")
             print(f"   ✅ Normalized {name}.")
         else:
             print("   ✅ Looks reasonable (or skipped).")
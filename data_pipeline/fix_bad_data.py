@@ -1,20 +1,28 @@
 
-import os
+import sys
 from datetime import date
 from dotenv import load_dotenv
-from supabase import create_client
+from utils import maintenance_utils
 
 load_dotenv('../credentials.env')
-supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
+# Repair RPCs are granted to service_role only
+supabase = maintenance_utils.service_client()
 
-def fix_data():
+def fix_data(apply=False):
     print("🧹 Starting cleanup of bad data...")
 
-    # 1. Delete PENEUR=X (Trillion dollar ghost)
-    print("Deleting 'PENEUR=X'...")
-    res = supabase.table("fund_holdings").delete().eq("symbol", "PENEUR=X").execute()
-    # Note: delete() doesn't always return count in data, but we can assume it works if no error.
-    print(f"   Deleted PENEUR=X records.")
+    # 1. Delete PENEUR=X (Trillion dollar ghost) and every other bad symbol.
+    # This is the whole bad_symbols rule, not just PENEUR=X: all =F futures,
+    # =X currencies and foreign listings (maintenance_utils.BAD_SYMBOL_PATTERNS).
+    # Preview only unless --apply is given.
+    patterns = ', '.join(maintenance_utils.BAD_SYMBOL_PATTERNS)
+    print(f"{'Deleting' if apply else 'Previewing'} bad symbols matching {patterns}...")
+    result = maintenance_utils.run_rules(supabase, ['bad_symbols'], dry_run=not apply).get('bad_symbols', {})
+    if apply:
+        print(f"   Deleted {result.get('affected', 0)} records.")
+    else:
+        print(f"   {result.get('matched', 0)} records in {len(result.get('funds') or [])} funds would be deleted. "
+              f"Re-run with --apply to delete them.")
 
     # 2. Delete Future Dates (e.g. 2025)
     # Current date is 2026-01-21 in check metadata... wait, user says 2026?
@@ -45,4 +53,4 @@ def fix_data():
     print("✅ Cleanup finished.")
 
 if __name__ == "__main__":
-    fix_data()
+    fix_data(apply="--apply" in sys.argv)
@@ -1,10 +1,10 @@
 import os
-import requests
 import json
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from utils.retry_utils import retry
+from utils.http_client_utils import get_client
 
 # Load environment variables
 load_dotenv(dotenv_path='../credentials.env')
@@ -19,13 +19,16 @@ if not all([FMP_API_KEY, SUPABASE_URL, SUPABASE_KEY]):
 
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# Shared keep-alive client (one TLS handshake for all FMP calls)
+http = get_client()
+
 @retry(max_retries=3, initial_delay=2, backoff_factor=2)
 def fetch_insider_trading(page=0):
     """Fetch recent insider trading data (all companies)"""
     # FMP insider-trading endpoint returns latest trades. 
     # Can paginate or filtering by symbol. fetching general latest is good for a feed.
     url = f"https://financialmodelingprep.com/api/v4/insider-trading-rss-feed?page={page}&apikey={FMP_API_KEY}"
-    response = requests.get(url)
+    response = http.get(url)
     if response.status_code == 200:
         return response.json()
     response.raise_for_status() # Trigger retry on non-200
@@ -79,6 +82,7 @@ def update_insider_trading():
                 print(f"Error processing trade after retries for {trade.get('symbol')}: {e}")
 
         print(f"Successfully added {count} new insider trades.")
+        http.print_stats()
     except Exception as e:
         print(f"Critical error fetching trades: {e}")
 
@@ -4,6 +4,7 @@ import random
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from utils import stock_sink_utils
 
 # Load environment variables
 load_dotenv(dotenv_path='../credentials.env')
@@ -95,6 +96,7 @@ def generate_stock_data():
                 'price': round(random.uniform(50, 500), 2)
             })
 
+    rows = []
     for stock in all_stocks:
         # Randomize financials/valuation
         financials = {
@@ -123,10 +125,11 @@ def generate_stock_data():
             'updated_at': datetime.utcnow().isoformat()
         }
         
-        try:
-            supabase.table('stock_data').upsert(data).execute()
-        except Exception as e:
-            print(f"Failed to upsert {stock['symbol']}: {e}")
+        rows.append(data)
+
+    # One bulk upsert (content_hash included so the collector's sink sees these rows as published)
+    written = stock_sink_utils.upsert_stock_data(supabase, rows)
+    print(f"Upserted {written}/{len(rows)} stock_data rows.")
     print("Stock Data Done.")
 
 def generate_insider_trading():
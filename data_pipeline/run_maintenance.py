@@ -0,0 +1,16 @@
+import argparse
+from dotenv import load_dotenv
+from utils import maintenance_utils
+
+load_dotenv('../credentials.env')
+# Repair RPCs are granted to service_role only
+supabase = maintenance_utils.service_client()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Set-based fund_holdings repairs (dry run unless --apply)")
+    parser.add_argument("rules", nargs="*", help=f"Rules to run (default: all): {', '.join(r['name'] for r in maintenance_utils.RULES)}")
+    parser.add_argument("--apply", action="store_true", help="Actually modify data")
+    parser.add_argument("--sample", type=int, default=5, help="Sample rows to show per rule")
+    args = parser.parse_args()
+
+    maintenance_utils.run_rules(supabase, args.rules, dry_run=not args.apply, sample=args.sample)
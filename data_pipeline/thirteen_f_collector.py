@@ -1,11 +1,11 @@
 import os
-import requests
-import json
 import time
-from datetime import datetime
+import asyncio
+import heapq
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from supabase import create_client, Client
-from utils import thirteen_f_utils, market_data_utils
+from utils import thirteen_f_utils, market_data_utils, http_cache_utils, manifest_utils, cusip_utils, holdings_writer_utils, http_client_utils, async_pipeline_utils, position_diff_utils, fund_summary_utils, value_unit_utils, ownership_utils, fund_similarity_utils
 
 # Load environment variables
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'credentials.env')
@@ -21,149 +21,336 @@ if not all([FMP_API_KEY, SUPABASE_URL, SUPABASE_KEY]):
 
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# Ingest every infoTable row instead of the top 100 by value (THIRTEEN_F_FULL_BOOK=1)
+FULL_BOOK = os.getenv('THIRTEEN_F_FULL_BOOK', '0') == '1'
+
 class ThirteenFCollector:
-    def __init__(self):
+    def __init__(self, full_book=FULL_BOOK, max_holdings=100):
         self.base_url = "https://financialmodelingprep.com/api/v3"
+        # full_book=True ingests every infoTable row; otherwise the top `max_holdings` by value
+        self.full_book = full_book
+        self.max_holdings = max_holdings
+        # Shared across filings/funds so each CUSIP is searched at most once per run
+        self.cusip_resolver = cusip_utils.CusipResolver(supabase, self.resolve_ticker)
+        # Memoized quarter-average prices, filled in multi-ticker batches
+        self.price_book = market_data_utils.QuarterPriceBook()
+        # Buffered fund_holdings writes; remembers stock_data symbols seen this run
+        self.writer = holdings_writer_utils.HoldingsWriter(supabase)
+        # Quarters written by any fund this run (cross-fund similarity is refreshed once per quarter)
+        self.changed_periods = set()
 
     def resolve_ticker(self, name, cusip):
-        """Resolve Company Name/CUSIP to Ticker Symbol."""
+        """
+        Resolve Company Name/CUSIP to Ticker Symbol.
+        None means Yahoo found nothing; search failures raise SymbolSearchError
+        so the CUSIP is retried later instead of cached as unresolvable.
+        """
         if not name:
             return None
-            
-        try:
-            # Clean name for better search (e.g. "APPLE INC" -> "APPLE")
-            clean_name = name.replace(" INC", "").replace(" CORP", "").replace(" LTD", "").strip()
-            
-            # Try Yahoo Search via utils
-            symbol = market_data_utils.search_symbol_yahoo(clean_name)
+
+        # Clean name for better search (e.g. "APPLE INC" -> "APPLE")
+        clean_name = name.replace(" INC", "").replace(" CORP", "").replace(" LTD", "").strip()
+
+        # Try Yahoo Search via utils
+        symbol = market_data_utils.search_symbol_yahoo(clean_name)
+        if symbol:
+            return symbol
+
+        # Fallback: Try raw name
+        if clean_name != name:
+            symbol = market_data_utils.search_symbol_yahoo(name)
             if symbol:
                 return symbol
-            
-            # Fallback: Try raw name
-            if clean_name != name:
-                symbol = market_data_utils.search_symbol_yahoo(name)
-                if symbol:
-                    return symbol
-                    
-        except Exception as e:
-            print(f"⚠️ Error resolving ticker for {name}: {e}")
-            pass
-            
+
         print(f"⚠️ Could not resolve ticker for {name} ({cusip})")
         return None
 
-    def upsert_holding(self, fund_id, symbol, shares, value, price, date):
-        if not symbol:
-            return
+    # Workers per pipeline stage. SEC-bound stages are paced by the shared
+    # rate limiter; queue_size bounds how many parsed filings sit in memory.
+    STAGE_CONCURRENCY = {'locate': 4, 'parse': 4, 'resolve': 2, 'price': 2, 'write': 2}
+    STAGE_QUEUE_SIZE = 2
 
-        # 0. Ensure Stock Exists in stock_data (Fix FK Error)
-        try:
-             stock_record = {
-                "symbol": symbol,
-                "name": symbol,        # Basic name (will be enriched later hopefully)
-                "sector": "Unknown"    # Placeholder
-            }
-             supabase.table("stock_data").upsert(stock_record, on_conflict="symbol").execute()
-        except Exception as e:
-            pass
-
-        data = {
-            "fund_id": fund_id,
-            "symbol": symbol,
-            "shares": shares,
-            "value": value,
-            "report_period": date,
-            "avg_buy_price": float(price) if price else 0
-        }
-        
-        try:
-            # Using upsert to handle potential duplicates for same quarter
-            supabase.table("fund_holdings").upsert(data, on_conflict="fund_id, symbol, report_period").execute()
-            print(f"✅ Saved {symbol}: {shares:,.0f} shares")
-        except Exception as e:
-            print(f"❌ DB Save Error ({symbol}): {e}")
+    def run_for_cik(self, fund_id, cik, fund_name, historical=False, max_workers=None):
+        """Synchronous entry point; runs the async stage pipeline to completion."""
+        return run_async(self.run_for_cik_async(fund_id, cik, fund_name, historical=historical, sec_workers=max_workers))
 
-    def run_for_cik(self, fund_id, cik, fund_name, historical=False):
-        print(f"\n🚀 Processing {fund_name} (CIK: {cik})... Mode: {'Historical' if historical else 'Latest Only'}")
+    async def run_for_cik_async(self, fund_id, cik, fund_name, historical=False, sec_workers=None):
+        print(f"\n🚀 Processing {fund_name} (CIK: {cik})... Mode: {'Historical' if historical else 'Latest Only'}"
+              f"{', Full Book' if self.full_book else ''}")
         
-        # 1. Get List of Filings to Process
-        tasks = [] # List of (date, xml_url)
-        if historical:
-            tasks = thirteen_f_utils.get_all_13f_xml_urls(cik)
-        else:
-            url = thirteen_f_utils.get_latest_13f_xml_url(cik)
-            if url:
-                # We need the date for the latest one. get_latest_13f_xml_url doesn't return date.
-                # Use a default or fetch it? 
-                # For consistency, let's just use the historical finder but valid for 1 if not historical
-                # OR just fetch the latest date. 
-                # Let's trust the historical finder's first result is the latest.
-                all_urls = thirteen_f_utils.get_all_13f_xml_urls(cik)
-                if all_urls:
-                    tasks = [all_urls[0]]
+        # 1. Discover: submissions JSON only, no per-filing HTTP yet
+        filings = await asyncio.to_thread(thirteen_f_utils.list_13f_filings, cik)
+        if not historical:
+            filings = filings[:1] # Newest first
 
-        if not tasks:
+        if not filings:
             print("❌ No 13F filings found to process.")
             return
 
-        print(f"   📅 Found {len(tasks)} filings to process.")
+        # 2. Diff against the manifest: only new / failed accessions touch the network
+        manifest = await asyncio.to_thread(manifest_utils.FilingManifest, supabase, fund_id, cik)
+        tasks = manifest.pending(filings, full_book=self.full_book)
+
+        print(f"   📅 Found {len(filings)} filings, {len(filings) - len(tasks)} already loaded, {len(tasks)} to process.")
+        if not tasks:
+            return
+
+        # 3. locate (index fetch) -> parse (XML) -> resolve -> price -> write, overlapped
+        workers = dict(self.STAGE_CONCURRENCY)
+        if sec_workers:
+            workers['locate'] = workers['parse'] = sec_workers
+        stages = [
+            async_pipeline_utils.Stage(name, fn, concurrency=workers[name], queue_size=self.STAGE_QUEUE_SIZE)
+            for name, fn in (
+                ('locate', self._stage_locate),
+                ('parse', self._stage_parse),
+                ('resolve', self._stage_resolve),
+                ('price', self._stage_price),
+                ('write', self._stage_write),
+            )
+        ]
+        written_periods = set()
+        jobs = ({'fund_id': fund_id, 'cik': cik, 'filing': f, 'manifest': manifest, 'written_periods': written_periods}
+                for f in tasks)
+
+        def on_error(stage, job, e):
+            print(f"   ❌ Filing {job['filing']['report_date']} failed for {fund_name} at {stage.name}: {e}")
+            job['manifest'].mark(job['filing'], "failed", xml_url=job.get('xml_url'), error=str(e))
 
-        for report_date, xml_url in tasks:
-            print(f"   Start: {report_date}")
+        stats = await async_pipeline_utils.run_pipeline(jobs, stages, on_error=on_error)
+        summary = ", ".join(f"{name} {st['out']}/{st['in']} ({st['busy_s']:.1f}s)" for name, st in stats.items())
+        print(f"   📊 {fund_name} stages: {summary}")
 
-            # 2. Check for Resumption (Skip if already in DB)
+        self.changed_periods.update(written_periods)
+
+        # 4. Quarter-over-quarter diffs (newest quarter only when that is all that changed)
+        if written_periods:
             try:
-                # Check if we have holdings for this fund and date
-                res = supabase.table("fund_holdings") \
-                    .select("id", count="exact", head=True) \
-                    .eq("fund_id", fund_id) \
-                    .eq("report_period", report_date) \
-                    .execute()
-                
-                # If we have a significant number of records (e.g. > 5), assume complete.
-                # Adjust threshold as needed. 
-                if res.count and res.count > 5:
-                    print(f"   ⏭️  Skipping {report_date} (Found {res.count} records in DB)")
-                    continue
+                await asyncio.to_thread(position_diff_utils.update_fund_diffs, supabase, fund_id,
+                                        written_periods, f"{fund_name}: ")
             except Exception as e:
-                print(f"   ⚠️ Checkpoint check failed: {e}")
+                print(f"   ⚠️ Position diff update failed for {fund_name}: {e}")
+
+    def _stage_locate(self, job):
+        filing = job['filing']
+        report_date = filing['report_date']
+        print(f"   Start: {report_date} ({filing['accession']})")
+        job['started'] = time.time()
 
+        # Legacy resumption: periods loaded before the manifest existed.
+        # A DB count costs no SEC requests; record it so we never check again.
+        # Those loads were top-100 only, so a full-book run re-ingests them.
+        if not self.full_book and self._already_in_db(job):
+            return None
+
+        job['xml_url'] = thirteen_f_utils.find_13f_xml_url(job['cik'], filing)
+        # Cover-page schema version: the amended form (X0202+) reports <value> in dollars
+        try:
+            job['schema_version'] = thirteen_f_utils.get_13f_schema_version(job['cik'], filing)
+        except Exception as e:
+            print(f"   ⚠️ Schema version lookup failed ({filing['accession']}): {e}")
+            job['schema_version'] = None
+        return job
+
+    def _already_in_db(self, job):
+        report_date = job['filing']['report_date']
+        try:
+            res = supabase.table("fund_holdings") \
+                .select("id", count="exact", head=True) \
+                .eq("fund_id", job['fund_id']) \
+                .eq("report_period", report_date) \
+                .execute()
             
-            holdings = thirteen_f_utils.parse_13f_infotable(xml_url)
-            if not holdings:
-                print(f"   ❌ No holdings parsed for {report_date}")
+            # If we have a significant number of records (e.g. > 5), assume complete.
+            if res.count and res.count > 5:
+                print(f"   ⏭️  Skipping {report_date} (Found {res.count} records in DB)")
+                job['manifest'].mark(job['filing'], "loaded", row_count=res.count)
+                return True
+        except Exception as e:
+            print(f"   ⚠️ Checkpoint check failed: {e}")
+        return False
+
+    def _stage_parse(self, job):
+        report_date = job['filing']['report_date']
+        # Raw filed <value>; the unit (dollars vs thousands) is decided in the price stage
+        # Fetch failures and truncated XML raise -> on_error marks the filing "failed" (retried next run);
+        # only a document that was fetched and holds zero rows is recorded as "empty".
+        # Rows are consumed as they stream in: top-N mode keeps a bounded heap, full book keeps every row.
+        checksum = manifest_utils.HoldingsChecksum()
+        kept = []
+        for n, h in enumerate(thirteen_f_utils.iter_13f_infotable(job['xml_url'], value_multiplier=1)):
+            checksum.add(h)
+            entry = (h.get('value') or 0, -n, h)  # ties keep the earlier row
+            if self.full_book or len(kept) < self.max_holdings:
+                heapq.heappush(kept, entry)
+            else:
+                heapq.heappushpop(kept, entry)
+
+        if not checksum.count:
+            print(f"   ❌ No holdings in {report_date} information table")
+            job['manifest'].mark(job['filing'], "empty", xml_url=job['xml_url'], row_count=0)
+            return None
+
+        job['checksum'] = checksum.hexdigest()
+        job['parsed'] = checksum.count
+
+        # Largest value first (full book: every row, otherwise the top N)
+        job['holdings'] = [h for _, _, h in sorted(kept, key=lambda e: (-e[0], -e[1]))]
+
+        print(f"   Processing {len(job['holdings'])} holdings for {report_date}... (Source: {job['xml_url']})")
+        return job
+
+    def _stage_resolve(self, job):
+        # Resolve Tickers (bulk: cached CUSIPs skip the search entirely)
+        self.cusip_resolver.apply(job['holdings'])
+        return job
+
+    def _stage_price(self, job):
+        report_date = job['filing']['report_date']
+
+        # Price every (symbol, quarter) of this filing in batched downloads
+        self.price_book.prefetch((h['symbol'], report_date) for h in job['holdings'] if h.get('symbol'))
+
+        # Value unit: filing metadata prior, confirmed by implied vs market price per share
+        unit = value_unit_utils.detect_value_unit(
+            job['holdings'], filing_date=job['filing'].get('filing_date'),
+            schema_version=job.get('schema_version'),
+            price_fn=lambda symbol: self.price_book.get(symbol, report_date))
+        job['unit'] = unit
+        multiplier = unit['multiplier']
+        if unit['confidence'] < 0.5:
+            print(f"   ⚠️ {report_date}: uncertain value unit {unit['unit']} "
+                  f"(confidence {unit['confidence']}, {unit['method']})")
+
+        rows = []
+        for h in job['holdings']:
+            symbol = h.get('symbol')
+            if not symbol:
                 continue
 
-            # Process top 50 by value to save time/space if needed, 
-            # OR process ALL for full history? 
-            # User said "all data", let's do top 100 to be safe but not crazy slow
-            holdings.sort(key=lambda x: x.get('value', 0), reverse=True)
-            top_holdings = holdings[:100]
-            
-            print(f"   Processing {len(top_holdings)} holdings for {report_date}... (Source: {xml_url})")
-            
-            for h in top_holdings:
-                name = h.get('name')
-                cusip = h.get('cusip')
-                shares = h.get('shares')
-                value = h.get('value')
-                
-                # Resolve Ticker
-                symbol = self.resolve_ticker(name, cusip)
-                if not symbol:
-                    continue
-                
-                # Get Price (Quarter Average) - Optimization: Cache?
-                # market_data_utils.get_quarter_average_price might be slow if called 100 * 50 times.
-                # For now, rely on its internal caching/yfinance cache.
-                est_price = market_data_utils.get_quarter_average_price(symbol, report_date)
-                if est_price == 0:
-                    est_price = market_data_utils.get_current_price(symbol) # Fallback
-                
-                self.upsert_holding(fund_id, symbol, shares, value, est_price, report_date)
-            
-            # Be polite to SEC to avoid 429s even with retry logic
-            time.sleep(2)
+            # Get Price (Quarter Average, current price as fallback) - already prefetched
+            est_price = self.price_book.get(symbol, report_date)
+            rows.append({
+                "fund_id": job['fund_id'],
+                "symbol": symbol,
+                "shares": h.get('shares'),
+                "value": (h.get('value') or 0) * multiplier,
+                "report_period": report_date,
+                "avg_buy_price": float(est_price) if est_price else 0
+            })
+
+        job['rows'] = rows
+        job['unresolved'] = len(job['holdings']) - len(rows)
+        job['unresolved_value'] = sum(h.get('value') or 0 for h in job['holdings'] if not h.get('symbol')) * multiplier
+        job['holdings'] = None # Free memory before the write queue
+        return job
+
+    def _stage_write(self, job):
+        filing = job['filing']
+
+        # Whole filing in a few multi-row requests instead of 2 per position
+        result = self.writer.write(job['rows'], label=f"{filing['report_date']}: ")
+
+        # Any failed row leaves the accession retryable on the next run
+        status = "failed" if result['failed'] else "loaded"
+        job['manifest'].mark(filing, status, xml_url=job['xml_url'], row_count=result['written'], checksum=job['checksum'],
+                             error=f"{result['failed']} rows failed" if result['failed'] else None,
+                             full_book=self.full_book, value_unit=job['unit']['unit'],
+                             unit_confidence=job['unit']['confidence'])
+
+        if result['written']:
+            job['written_periods'].add(filing['report_date'])
+            # Rows as stored; reread from the DB if some rows failed
+            stored = fund_summary_utils.load_period_rows(supabase, job['fund_id'], filing['report_date']) \
+                if result['failed'] else holdings_writer_utils.HoldingsWriter.merge_rows(job['rows'])
+            # Per-period AUM / concentration / sector weights, then the symbol -> holders index
+            summary = fund_summary_utils.update_fund_period_summary(
+                supabase, job['fund_id'], filing['report_date'], rows=stored)
+            ownership_utils.update_ownership(supabase, job['fund_id'], filing['report_date'], stored,
+                                             total_value=summary['total_value'] if summary else None)
+
+        print(f"   📦 {filing['report_date']}: parsed {job['parsed']}, written {result['written']}, "
+              f"failed {result['failed']}, unresolved {job['unresolved']} (${job['unresolved_value']:,.0f}) "
+              f"[{job['unit']['unit']}, {job['unit']['confidence']:.0%} via {job['unit']['method']}] "
+              f"in {time.time() - job['started']:.1f}s")
+        return job
+
+
+def run_async(coro, max_threads=32):
+    """asyncio.run with a thread pool large enough for every stage's blocking calls."""
+    async def main():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=max_threads))
+        return await coro
+    return asyncio.run(main())
+
+
+def ensure_fund(fund_info):
+    """Return the hedge_funds.id for a fund, creating the row if it is missing."""
+    res = supabase.table("hedge_funds").select("id, name, cik").eq("cik", fund_info['cik']).execute()
+    if res.data:
+        fund_id = res.data[0]['id']
+        print(f"   ✅ Found in DB (ID: {fund_id})")
+        return fund_id
+
+    print(f"   ⚠️ Missing in DB. Creating...")
+    create_res = supabase.table("hedge_funds").insert(fund_info).execute()
+    if create_res.data:
+        fund_id = create_res.data[0]['id']
+        print(f"   ✅ Created (ID: {fund_id})")
+        return fund_id
+
+    print(f"   ❌ Failed to create {fund_info['name']}")
+    return None
+
+
+def run_backfill(funds, historical=True, fund_workers=4, filing_workers=None, full_book=FULL_BOOK):
+    """
+    Collect many funds concurrently.
+    Each fund runs its own stage pipeline (see run_for_cik_async).
+    SEC request pacing is global (rate_limit_utils.SEC_RATE_LIMITER), so the
+    worker counts only control how much network/DB latency we overlap.
+    """
+    # One collector for every fund so the in-run CUSIP cache is shared
+    collector = ThirteenFCollector(full_book=full_book)
+
+    async def backfill():
+        limit = asyncio.Semaphore(fund_workers)
+
+        async def run_one(fund_info):
+            async with limit:
+                print(f"\n🔹 Processing: {fund_info['name']}")
+                fund_id = await asyncio.to_thread(ensure_fund, fund_info)
+                if fund_id:
+                    await collector.run_for_cik_async(fund_id, fund_info['cik'], fund_info['name'],
+                                                      historical=historical, sec_workers=filing_workers)
+
+        results = await asyncio.gather(*(run_one(f) for f in funds), return_exceptions=True)
+        for fund_info, result in zip(funds, results):
+            if isinstance(result, Exception):
+                print(f"   ❌ Error processing {fund_info['name']}: {result}")
+
+    start = time.time()
+    run_async(backfill())
+
+    print(f"\n🏁 Backfill finished for {len(funds)} funds in {time.time() - start:.1f}s")
+    print(f"   🗄️  EDGAR cache: {http_cache_utils.get_cache().stats()}")
+    http_client_utils.get_client().print_stats()
+    print(f"   🔎 CUSIP resolution: {collector.cusip_resolver.stats}")
+    print(f"   💾 Writes: {collector.writer.totals}")
+    print(f"   💵 Pricing: {len(collector.price_book.averages)} quarter averages from {collector.price_book.downloads} batch downloads")
+
+    # Fund-pair cosine / overlap for every quarter that changed
+    for period in sorted(collector.changed_periods):
+        try:
+            fund_similarity_utils.update_period_similarity(supabase, period)
+        except Exception as e:
+            print(f"   ⚠️ Similarity update failed ({period}): {e}")
+
+    # Bucketed symbol -> holders files for the web app
+    try:
+        ownership_utils.export_ownership_index(supabase)
+    except Exception as e:
+        print(f"   ⚠️ Ownership export failed: {e}")
 
 
 if __name__ == "__main__":
@@ -176,17 +363,6 @@ if __name__ == "__main__":
     env_path = 'c:/Users/ysk144/.gemini/antigravity/playground/mblb-stock-database/credentials.env'
     load_dotenv(env_path)
     
-    # ... [Previous imports]
-    import httpx
-    from supabase import create_client, Client, ClientOptions
-    
-    # Custom Transport to bypass local DNS issues
-    # We manually resolve the hostname using a hardcoded valid IP or Google DNS logic if needed.
-    # Since we know the IP from the manual check (172.64.149.246), we can map it.
-    
-    # Better approach: Configure httpx to access via IP but correct Host header?
-    # Actually, Supabase Python client accepts 'options' with a custom http_client.
-    
     SUPABASE_URL = os.getenv("SUPABASE_URL")
     SUPABASE_KEY = os.getenv("SUPABASE_KEY")
     
@@ -224,37 +400,9 @@ if __name__ == "__main__":
 
     print(f"📋 Starting Collection for {len(FUNDS)} Funds...")
 
-    for fund_info in FUNDS:
-        print(f"\n🔹 Processing: {fund_info['name']}")
-        
-        # 1. Check/Create Fund in DB
-        try:
-             # Check existence by CIK
-            res = supabase.table("hedge_funds").select("id, name, cik").eq("cik", fund_info['cik']).execute()
-            
-            fund_id = None
-            if res.data:
-                fund_id = res.data[0]['id']
-                print(f"   ✅ Found in DB (ID: {fund_id})")
-            else:
-                print(f"   ⚠️ Missing in DB. Creating...")
-                create_res = supabase.table("hedge_funds").insert(fund_info).execute()
-                if create_res.data:
-                    fund_id = create_res.data[0]['id']
-                    print(f"   ✅ Created (ID: {fund_id})")
-                else:
-                    print(f"   ❌ Failed to create {fund_info['name']}")
-                    continue
-            
-            # 2. Run Collector
-            if fund_id:
-                collector = ThirteenFCollector()
-                # User requested FULL history backfill
-                collector.run_for_cik(fund_id, fund_info['cik'], fund_info['name'], historical=True)
-                
-        except Exception as e:
-            print(f"   ❌ Error processing {fund_info['name']}: {e}")
-            continue
+    # User requested FULL history backfill.
+    # Funds and filings run concurrently; SEC calls share one rate limiter.
+    run_backfill(FUNDS, historical=True, fund_workers=4)
 
     # ... end of block
 
@@ -0,0 +1,83 @@
+import asyncio
+import inspect
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+_DONE = object()
+
+
+class Stage:
+    """
+    One step of an async pipeline.
+
+    `fn(item)` may be a coroutine function or a plain blocking function
+    (run via asyncio.to_thread). Returning None drops the item; anything
+    else is passed to the next stage. `concurrency` workers run the stage
+    in parallel, and the queue in front of it holds at most `queue_size`
+    items, so a slow stage applies backpressure to everything upstream.
+    """
+
+    def __init__(self, name: str, fn: Callable[[Any], Any], concurrency: int = 1, queue_size: int = 2):
+        self.name = name
+        self.fn = fn
+        self.concurrency = max(1, concurrency)
+        self.queue_size = max(1, queue_size)
+        self.stats = {'in': 0, 'out': 0, 'dropped': 0, 'errors': 0, 'busy_s': 0.0}
+
+    async def call(self, item):
+        if inspect.iscoroutinefunction(self.fn):
+            return await self.fn(item)
+        return await asyncio.to_thread(self.fn, item)
+
+
+async def run_pipeline(items: Iterable[Any], stages: List[Stage],
+                       on_error: Optional[Callable[[Stage, Any, Exception], None]] = None) -> Dict[str, Dict]:
+    """
+    Push `items` through `stages` with bounded queues between them.
+    Errors are reported to `on_error(stage, item, exc)` and drop the item.
+    Returns per-stage stats (items in/out, dropped, errors, busy seconds).
+    """
+    queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in stages]
+
+    async def worker(index: int):
+        stage = stages[index]
+        inbox = queues[index]
+        outbox = queues[index + 1] if index + 1 < len(stages) else None
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+            stage.stats['in'] += 1
+            start = time.time()
+            try:
+                result = await stage.call(item)
+            except Exception as e:
+                stage.stats['errors'] += 1
+                if on_error:
+                    on_error(stage, item, e)
+                continue
+            finally:
+                stage.stats['busy_s'] += time.time() - start
+
+            if result is None:
+                stage.stats['dropped'] += 1
+                continue
+            stage.stats['out'] += 1
+            if outbox is not None:
+                await outbox.put(result)
+
+    async def run_stage(index: int):
+        await asyncio.gather(*(worker(index) for _ in range(stages[index].concurrency)))
+        # Every worker of this stage is done: release the next stage's workers
+        if index + 1 < len(stages):
+            for _ in range(stages[index + 1].concurrency):
+                await queues[index + 1].put(_DONE)
+
+    async def feed():
+        for item in items:
+            await queues[0].put(item)
+        for _ in range(stages[0].concurrency):
+            await queues[0].put(_DONE)
+
+    await asyncio.gather(feed(), *(run_stage(i) for i in range(len(stages))))
+    return {stage.name: stage.stats for stage in stages}
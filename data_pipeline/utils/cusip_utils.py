@@ -0,0 +1,141 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Failed lookups are retried after this many days; successful ones never expire
+NEGATIVE_TTL_DAYS = 30
+
+# Keep PostgREST `in.(...)` filters well under URL length limits
+LOOKUP_BATCH = 200
+
+# search result for a lookup that errored (never cached or persisted)
+SEARCH_FAILED = object()
+
+
+class CusipResolver:
+    """
+    CUSIP -> ticker resolution backed by the cusip_symbols table.
+
+    Resolution is a bulk step: collect the distinct CUSIPs of a filing (or a
+    whole run), look them up in memory and then in the table, search only
+    the misses concurrently with `search_fn(name, cusip)`, persist the new
+    answers in one upsert and join symbols back onto the holdings.
+    Misses (search_fn returned None) are stored as negative entries (symbol
+    NULL) with an expiry. If search_fn raises, the lookup failed rather than
+    came back empty: nothing is stored and the CUSIP is searched again by
+    the next filing that holds it.
+    """
+
+    def __init__(self, supabase, search_fn: Callable[[str, str], Optional[str]], max_workers: int = 8):
+        self.supabase = supabase
+        self.search_fn = search_fn
+        self.max_workers = max_workers
+        self.cache: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self.stats = {'memory': 0, 'db': 0, 'searched': 0, 'unresolved': 0, 'failed': 0}
+
+    def _load(self, cusips: List[str]) -> Dict[str, Optional[str]]:
+        found = {}
+        now = datetime.utcnow().isoformat()
+        for i in range(0, len(cusips), LOOKUP_BATCH):
+            batch = cusips[i:i + LOOKUP_BATCH]
+            try:
+                res = self.supabase.table("cusip_symbols") \
+                    .select("cusip, symbol, expires_at") \
+                    .in_("cusip", batch) \
+                    .execute()
+            except Exception as e:
+                print(f"   ⚠️ CUSIP lookup failed: {e}")
+                continue
+            for row in res.data or []:
+                if row['symbol'] or (row['expires_at'] and row['expires_at'] > now):
+                    found[row['cusip']] = row['symbol']
+        return found
+
+    def _search(self, cusip: str, name: str):
+        try:
+            return self.search_fn(name, cusip)
+        except Exception as e:
+            print(f"   ⚠️ CUSIP search failed for {cusip} ({name}): {e}")
+            return SEARCH_FAILED
+
+    def _save(self, resolved: Dict[str, Optional[str]], names: Dict[str, str]):
+        now = datetime.utcnow()
+        expires = (now + timedelta(days=NEGATIVE_TTL_DAYS)).isoformat()
+        records = [{
+            "cusip": cusip,
+            "symbol": symbol,
+            "name": names.get(cusip),
+            "resolved_at": now.isoformat(),
+            "expires_at": None if symbol else expires,
+        } for cusip, symbol in resolved.items()]
+        if not records:
+            return
+        try:
+            self.supabase.table("cusip_symbols").upsert(records, on_conflict="cusip").execute()
+        except Exception as e:
+            print(f"   ⚠️ CUSIP cache save failed: {e}")
+
+    def resolve_many(self, holdings: Iterable[Dict]) -> Dict[str, Optional[str]]:
+        """Resolve every distinct CUSIP in `holdings`. Returns cusip -> symbol (or None)."""
+        names = {}
+        for h in holdings:
+            cusip = h.get('cusip')
+            if cusip and cusip not in names:
+                names[cusip] = h.get('name')
+
+        with self._lock:
+            missing = [c for c in names if c not in self.cache]
+            self.stats['memory'] += len(names) - len(missing)
+
+        if missing:
+            from_db = self._load(missing)
+            with self._lock:
+                self.cache.update(from_db)
+                self.stats['db'] += len(from_db)
+            missing = [c for c in missing if c not in from_db]
+
+        if missing:
+            # Another filing may already be searching some of these (concurrent pipeline stages)
+            with self._lock:
+                waiting = {c: self._inflight[c] for c in missing if c in self._inflight}
+                mine = [c for c in missing if c not in waiting]
+                for c in mine:
+                    self._inflight[c] = Future()
+
+            if mine:
+                try:
+                    with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                        symbols = list(pool.map(lambda c: self._search(c, names[c]), mine))
+                except Exception as e:
+                    with self._lock:
+                        for c in mine:
+                            self._inflight.pop(c).set_exception(e)
+                    raise
+                resolved = {c: s for c, s in zip(mine, symbols) if s is not SEARCH_FAILED}
+                self._save(resolved, names)
+                with self._lock:
+                    self.cache.update(resolved)
+                    self.stats['searched'] += len(resolved)
+                    self.stats['unresolved'] += sum(1 for s in resolved.values() if not s)
+                    self.stats['failed'] += len(mine) - len(resolved)
+                    for c in mine:
+                        self._inflight.pop(c).set_result(resolved.get(c))
+
+            for c, future in waiting.items():
+                try:
+                    future.result()
+                except Exception:
+                    pass
+
+        with self._lock:
+            return {c: self.cache.get(c) for c in names}
+
+    def apply(self, holdings: List[Dict]) -> List[Dict]:
+        """Fill holding['symbol'] for every holding in one pass."""
+        symbols = self.resolve_many(holdings)
+        for h in holdings:
+            h['symbol'] = symbols.get(h.get('cusip'))
+        return holdings
@@ -0,0 +1,87 @@
+import json
+import os
+import shutil
+import tempfile
+import zlib
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from utils.pagination_utils import Throughput, iter_keyset
+
+# Natural key of fund_holdings (unique per fund, symbol and quarter)
+HOLDINGS_KEY = ('fund_id', 'symbol', 'report_period')
+
+
+def _key(row: Dict, key_columns: Sequence[str]) -> tuple:
+    return tuple(row.get(c) for c in key_columns)
+
+
+def iter_duplicate_groups(rows: Iterable[Dict], key_columns: Sequence[str] = HOLDINGS_KEY,
+                          meter: Optional[Throughput] = None) -> Iterator[List[Dict]]:
+    """
+    Yield groups (2+ rows) sharing a key from rows already sorted by that key.
+    Only the current group is held in memory.
+    """
+    def counted():
+        for row in rows:
+            if meter:
+                meter.add()
+            yield row
+
+    for _, group in groupby(counted(), key=lambda r: _key(r, key_columns)):
+        group = list(group)
+        if len(group) > 1:
+            yield group
+
+
+def iter_duplicate_groups_unordered(rows: Iterable[Dict], key_columns: Sequence[str] = HOLDINGS_KEY,
+                                    partitions: int = 64, tmp_dir: Optional[str] = None,
+                                    meter: Optional[Throughput] = None) -> Iterator[List[Dict]]:
+    """
+    Duplicate groups from rows in any order.
+
+    Rows are hash-partitioned by key into `partitions` JSON-lines spill
+    files, so every group lands in one file; each file is then grouped on
+    its own. Peak memory is about one partition (total / partitions).
+    """
+    spill_dir = tempfile.mkdtemp(prefix='dedup_', dir=tmp_dir)
+    try:
+        files = [open(os.path.join(spill_dir, f'{i:04d}.jsonl'), 'w', encoding='utf-8') for i in range(partitions)]
+        try:
+            for row in rows:
+                if meter:
+                    meter.add()
+                bucket = zlib.crc32(json.dumps(_key(row, key_columns), default=str).encode('utf-8')) % partitions
+                files[bucket].write(json.dumps(row, default=str) + '\n')
+        finally:
+            for f in files:
+                f.close()
+
+        for i in range(partitions):
+            groups: Dict[tuple, List[Dict]] = {}
+            with open(os.path.join(spill_dir, f'{i:04d}.jsonl'), encoding='utf-8') as f:
+                for line in f:
+                    row = json.loads(line)
+                    groups.setdefault(_key(row, key_columns), []).append(row)
+            for group in groups.values():
+                if len(group) > 1:
+                    yield group
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+def iter_holdings_duplicates(supabase, fund_id: Optional[str] = None, page_size: int = 1000,
+                             meter: Optional[Throughput] = None) -> Iterator[List[Dict]]:
+    """
+    Stream fund_holdings in (fund_id, symbol, report_period, id) order with
+    keyset pagination and yield duplicate groups, oldest row first.
+    """
+    def filters(query):
+        query = query.not_.is_("symbol", "null")
+        return query.eq("fund_id", fund_id) if fund_id else query
+
+    rows = iter_keyset(supabase, "fund_holdings", "id, fund_id, symbol, report_period, created_at",
+                       HOLDINGS_KEY + ('id',), filters=filters, page_size=page_size)
+    for group in iter_duplicate_groups(rows, HOLDINGS_KEY, meter=meter):
+        group.sort(key=lambda r: (r.get('created_at') or '', r['id']))
+        yield group
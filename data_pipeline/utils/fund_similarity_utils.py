@@ -0,0 +1,175 @@
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from utils.pagination_utils import TableIterator
+
+WRITE_CHUNK = 500
+
+# Stored pairs per quarter: each fund keeps its TOP_K most similar peers with
+# cosine >= MIN_COSINE (a pair is kept if it is in either fund's list). Pairs
+# that are dropped are not stored at all - overlap included - so the table
+# grows with funds x TOP_K instead of funds squared.
+TOP_K = 50
+MIN_COSINE = 0.05
+
+
+def build_weight_matrix(rows: Iterable[Dict]):
+    """
+    Sparse (fund x symbol) matrix of portfolio weights (value / fund total)
+    for one quarter. Returns (matrix, fund_ids, symbols).
+    """
+    fund_ids: Dict[str, int] = {}
+    symbols: Dict[str, int] = {}
+    r_idx, c_idx, values = [], [], []
+    for row in rows:
+        value = float(row.get('value') or 0)
+        if value <= 0 or not row.get('symbol'):
+            continue
+        r_idx.append(fund_ids.setdefault(row['fund_id'], len(fund_ids)))
+        c_idx.append(symbols.setdefault(row['symbol'], len(symbols)))
+        values.append(value)
+
+    # Duplicate (fund, symbol) entries are summed by the COO -> CSR conversion
+    matrix = sparse.coo_matrix((values, (r_idx, c_idx)), shape=(len(fund_ids), len(symbols))).tocsr()
+    totals = np.asarray(matrix.sum(axis=1)).ravel()
+    totals[totals == 0] = 1
+    matrix = sparse.diags(1 / totals) @ matrix
+    return matrix.tocsr(), list(fund_ids), list(symbols)
+
+
+def _top_k_pairs(cosine, top_k: int, min_cosine: float):
+    """(a, b) index arrays, a < b, of pairs in either fund's top_k peers at or above min_cosine."""
+    cosine = cosine.tocsr()
+    cosine.setdiag(0)
+    cosine.eliminate_zeros()
+    indptr, indices, data = cosine.indptr, cosine.indices, cosine.data
+
+    rows, cols = [], []
+    # One argpartition per fund (linear in funds, not pairs)
+    for r in range(cosine.shape[0]):
+        lo, hi = indptr[r], indptr[r + 1]
+        vals = data[lo:hi]
+        idx = np.nonzero(vals >= min_cosine)[0]
+        if len(idx) > top_k:
+            idx = idx[np.argpartition(vals[idx], -top_k)[-top_k:]]
+        rows.append(np.full(len(idx), r, dtype=np.int64))
+        cols.append(indices[lo:hi][idx].astype(np.int64))
+    if not rows:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+
+    r, c = np.concatenate(rows), np.concatenate(cols)
+    pairs = np.unique(np.stack([np.minimum(r, c), np.maximum(r, c)], axis=1), axis=0)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def compute_similarity(matrix, fund_ids: List[str], top_k: int = TOP_K,
+                       min_cosine: float = MIN_COSINE) -> pd.DataFrame:
+    """
+    Each fund's top_k most similar peers for one quarter.
+
+    cosine = Wn Wn^T (Wn: L2-normalized weight rows) is one sparse product;
+    only pairs that co-hold a name are non-zero. After the per-fund top-k cut,
+    overlap (share of A's value in names B holds, and the reverse) and the
+    shared-position count are computed for the kept pairs only, as row-wise
+    sparse products. Returns a DataFrame (fund_a < fund_b).
+    """
+    columns = ['fund_a', 'fund_b', 'cosine', 'overlap_a', 'overlap_b', 'shared_positions']
+    if matrix.shape[0] < 2:
+        return pd.DataFrame(columns=columns)
+
+    held = matrix.copy()
+    held.data[:] = 1
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    normalized = (sparse.diags(1 / norms) @ matrix).tocsr()
+
+    cosine = normalized @ normalized.T
+    ia, ib = _top_k_pairs(cosine, top_k, min_cosine)
+    if not len(ia):
+        return pd.DataFrame(columns=columns)
+
+    cos = np.asarray(normalized[ia].multiply(normalized[ib]).sum(axis=1)).ravel()
+    overlap_a = np.asarray(matrix[ia].multiply(held[ib]).sum(axis=1)).ravel()
+    overlap_b = np.asarray(matrix[ib].multiply(held[ia]).sum(axis=1)).ravel()
+    shared_n = np.asarray(held[ia].multiply(held[ib]).sum(axis=1)).ravel()
+
+    # Store each pair once with fund_a < fund_b
+    ids = np.asarray(fund_ids, dtype=object)
+    a_ids, b_ids = ids[ia], ids[ib]
+    swap = a_ids > b_ids
+    return pd.DataFrame({
+        'fund_a': np.where(swap, b_ids, a_ids),
+        'fund_b': np.where(swap, a_ids, b_ids),
+        'cosine': np.round(cos, 6),
+        'overlap_a': np.round(np.where(swap, overlap_b, overlap_a), 6),
+        'overlap_b': np.round(np.where(swap, overlap_a, overlap_b), 6),
+        'shared_positions': shared_n.astype(np.int64),
+    })
+
+
+def _previous_cosines(supabase, report_period: str) -> Dict[tuple, float]:
+    prev = supabase.table("fund_similarity").select("report_period") \
+        .lt("report_period", report_period).order("report_period", desc=True).limit(1).execute().data
+    if not prev:
+        return {}
+    rows = TableIterator(supabase, "fund_similarity", "fund_a, fund_b, cosine",
+                         key_columns=("fund_a", "fund_b"),
+                         filters=lambda q: q.eq("report_period", prev[0]['report_period']))
+    return {(r['fund_a'], r['fund_b']): float(r['cosine']) for r in rows}
+
+
+def update_period_similarity(supabase, report_period: str, top_k: int = TOP_K,
+                             min_cosine: float = MIN_COSINE) -> Dict:
+    """Recompute and persist each fund's top_k peers for one quarter."""
+    start = time.time()
+    rows = TableIterator(supabase, "fund_holdings", "id, fund_id, symbol, value", key_columns=("id",),
+                         filters=lambda q: q.eq("report_period", report_period))
+    matrix, fund_ids, symbols = build_weight_matrix(rows)
+    pairs = compute_similarity(matrix, fund_ids, top_k=top_k, min_cosine=min_cosine)
+
+    previous = _previous_cosines(supabase, report_period)
+    before = pd.Series([previous.get(k) for k in zip(pairs['fund_a'], pairs['fund_b'])],
+                       index=pairs.index, dtype=float)
+    pairs['cosine_change'] = (pairs['cosine'] - before).round(6).astype(object).where(before.notna(), None)
+    pairs['report_period'] = report_period
+    now = datetime.utcnow().isoformat()
+    pairs['updated_at'] = now
+
+    # Upsert the new pairs, then drop this quarter's rows the run did not
+    # touch; the quarter is never empty while the write is in progress.
+    written = 0
+    try:
+        for i in range(0, len(pairs), WRITE_CHUNK):
+            chunk = pairs.iloc[i:i + WRITE_CHUNK].to_dict('records')
+            supabase.table("fund_similarity").upsert(chunk, on_conflict="report_period, fund_a, fund_b").execute()
+            written += len(chunk)
+        if written == len(pairs):
+            supabase.table("fund_similarity").delete().eq("report_period", report_period) \
+                .lt("updated_at", now).execute()
+    except Exception as e:
+        print(f"   ⚠️ Similarity write failed ({report_period}): {e}")
+
+    elapsed = time.time() - start
+    print(f"   🧬 {report_period}: {len(fund_ids)} funds x {len(symbols)} symbols ({matrix.nnz} positions) "
+          f"-> {written} pairs in {elapsed:.2f}s")
+    return {'funds': len(fund_ids), 'symbols': len(symbols), 'pairs': written, 'elapsed': elapsed}
+
+
+def get_fund_similarity(supabase, fund_id: str, report_period: Optional[str] = None) -> List[Dict]:
+    """Pairs involving `fund_id` (latest stored quarter if omitted), most similar first."""
+    if report_period is None:
+        latest = supabase.table("fund_similarity").select("report_period") \
+            .or_(f"fund_a.eq.{fund_id},fund_b.eq.{fund_id}") \
+            .order("report_period", desc=True).limit(1).execute().data
+        if not latest:
+            return []
+        report_period = latest[0]['report_period']
+    return supabase.table("fund_similarity").select("*") \
+        .eq("report_period", report_period) \
+        .or_(f"fund_a.eq.{fund_id},fund_b.eq.{fund_id}") \
+        .order("cosine", desc=True).execute().data or []
@@ -0,0 +1,96 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from utils.pagination_utils import TableIterator
+
+# Keep PostgREST `in.(...)` filters well under URL length limits
+LOOKUP_BATCH = 200
+
+TOP_N = 10
+
+
+def summarize_holdings(rows: List[Dict], sectors: Dict[str, str], top_n: int = TOP_N) -> Dict:
+    """
+    Portfolio summary of one (fund, report_period) from its holdings rows
+    ({'symbol', 'value'}) and a symbol -> sector map.
+    """
+    values = sorted((float(r.get('value') or 0) for r in rows), reverse=True)
+    total = sum(values)
+
+    sector_values = {}
+    for r in rows:
+        sector = sectors.get(r.get('symbol')) or 'Unknown'
+        sector_values[sector] = sector_values.get(sector, 0) + float(r.get('value') or 0)
+
+    return {
+        "total_value": total,
+        "position_count": len(rows),
+        "max_position_value": values[0] if values else 0,
+        "top10_weight": round(sum(values[:top_n]) / total, 6) if total else 0,
+        "hhi": round(sum((v / total) ** 2 for v in values), 6) if total else 0,
+        "sector_weights": {s: round(v / total, 6) for s, v in sorted(sector_values.items(), key=lambda x: -x[1])} if total else {},
+    }
+
+
+def load_period_rows(supabase, fund_id: str, report_period: str) -> List[Dict]:
+    """fund_holdings rows (symbol, shares, value) of one fund and quarter."""
+    return list(TableIterator(supabase, "fund_holdings", "id, symbol, shares, value", key_columns=("id",),
+                              filters=lambda q: q.eq("fund_id", fund_id).eq("report_period", report_period)))
+
+
+def _load_sectors(supabase, symbols: Iterable[str]) -> Dict[str, str]:
+    symbols = sorted({s for s in symbols if s})
+    sectors = {}
+    for i in range(0, len(symbols), LOOKUP_BATCH):
+        batch = symbols[i:i + LOOKUP_BATCH]
+        try:
+            res = supabase.table("stock_data").select("symbol, sector").in_("symbol", batch).execute()
+            sectors.update({r['symbol']: r.get('sector') for r in res.data or []})
+        except Exception as e:
+            print(f"   ⚠️ Sector lookup failed: {e}")
+    return sectors
+
+
+def update_fund_period_summary(supabase, fund_id: str, report_period: str,
+                               rows: Optional[List[Dict]] = None) -> Optional[Dict]:
+    """
+    Recompute and upsert the fund_period_summary row for one filing.
+    Pass the rows just written to skip re-reading fund_holdings.
+    """
+    if rows is None:
+        rows = load_period_rows(supabase, fund_id, report_period)
+
+    summary = summarize_holdings(rows, _load_sectors(supabase, (r.get('symbol') for r in rows)))
+    record = dict(summary, fund_id=fund_id, report_period=report_period,
+                  updated_at=datetime.utcnow().isoformat())
+    try:
+        supabase.table("fund_period_summary").upsert(record, on_conflict="fund_id, report_period").execute()
+    except Exception as e:
+        print(f"   ⚠️ Summary update failed ({report_period}): {e}")
+        return None
+    return record
+
+
+def refresh_fund_summaries(supabase, fund_id: str, label: str = "") -> int:
+    """Rebuild every period's summary of a fund (after bulk fixes). Returns periods updated."""
+    periods = []
+    while True:
+        query = supabase.table("fund_holdings").select("report_period").eq("fund_id", fund_id)
+        if periods:
+            query = query.lt("report_period", periods[-1])
+        res = query.order("report_period", desc=True).limit(1).execute()
+        if not res.data:
+            break
+        periods.append(res.data[0]['report_period'])
+
+    updated = sum(1 for p in periods if update_fund_period_summary(supabase, fund_id, p))
+    print(f"   📈 {label}Rebuilt {updated}/{len(periods)} period summaries")
+    return updated
+
+
+def get_fund_summaries(supabase, fund_id: str, latest_only: bool = False) -> List[Dict]:
+    """Summary rows of a fund, newest period first."""
+    query = supabase.table("fund_period_summary").select("*").eq("fund_id", fund_id).order("report_period", desc=True)
+    if latest_only:
+        query = query.limit(1)
+    return query.execute().data or []
@@ -0,0 +1,125 @@
+import time
+import threading
+from typing import Dict, Iterable, List
+
+# Keep PostgREST `in.(...)` filters well under URL length limits
+LOOKUP_BATCH = 200
+
+
+class HoldingsWriter:
+    """
+    Buffered per-filing writer for fund_holdings.
+
+    A filing is written as: one stock_data existence check for symbols not
+    seen earlier in the run, one multi-row placeholder insert for the truly
+    missing ones (existing names/sectors are never overwritten), then
+    chunked multi-row upserts on (fund_id, symbol, report_period).
+    A failed chunk is retried row by row so bad rows are isolated and counted.
+    """
+
+    def __init__(self, supabase, chunk_size: int = 500):
+        self.supabase = supabase
+        self.chunk_size = chunk_size
+        self.known_symbols = set()
+        self._lock = threading.Lock()
+        self.totals = {'written': 0, 'failed': 0, 'requests': 0}
+
+    def _count_request(self, n: int = 1):
+        with self._lock:
+            self.totals['requests'] += n
+
+    def ensure_symbols(self, symbols: Iterable[str]):
+        """Make sure every symbol has a stock_data row (FK target for fund_holdings)."""
+        with self._lock:
+            unknown = sorted({s for s in symbols if s} - self.known_symbols)
+        if not unknown:
+            return
+
+        existing = set()
+        for i in range(0, len(unknown), LOOKUP_BATCH):
+            batch = unknown[i:i + LOOKUP_BATCH]
+            try:
+                res = self.supabase.table("stock_data").select("symbol").in_("symbol", batch).execute()
+                existing.update(r['symbol'] for r in res.data or [])
+            except Exception as e:
+                print(f"   ⚠️ stock_data lookup failed: {e}")
+            self._count_request()
+
+        missing = [s for s in unknown if s not in existing]
+        if missing:
+            stubs = [{
+                "symbol": s,
+                "name": s,             # Basic name (will be enriched later hopefully)
+                "sector": "Unknown"    # Placeholder
+            } for s in missing]
+            try:
+                self.supabase.table("stock_data") \
+                    .upsert(stubs, on_conflict="symbol", ignore_duplicates=True) \
+                    .execute()
+                print(f"   ➕ Added {len(stubs)} stock_data placeholders")
+            except Exception as e:
+                print(f"   ⚠️ stock_data placeholder insert failed: {e}")
+            self._count_request()
+
+        with self._lock:
+            self.known_symbols.update(unknown)
+
+    @staticmethod
+    def merge_rows(rows: List[Dict]) -> List[Dict]:
+        """
+        Collapse rows sharing (fund_id, symbol, report_period), e.g. two share
+        classes resolved to one ticker. Postgres rejects a multi-row upsert
+        that touches the same conflict key twice.
+        """
+        merged = {}
+        for row in rows:
+            key = (row['fund_id'], row['symbol'], row['report_period'])
+            if key in merged:
+                merged[key]['shares'] = (merged[key]['shares'] or 0) + (row['shares'] or 0)
+                merged[key]['value'] = (merged[key]['value'] or 0) + (row['value'] or 0)
+            else:
+                merged[key] = dict(row)
+        return list(merged.values())
+
+    def write(self, rows: List[Dict], label: str = "") -> Dict:
+        """Upsert fund_holdings rows. Returns {'written', 'failed', 'elapsed', 'rows_per_s'}."""
+        start = time.time()
+        rows = self.merge_rows([r for r in rows if r.get('symbol')])
+        self.ensure_symbols(r['symbol'] for r in rows)
+
+        written = failed = 0
+        for i in range(0, len(rows), self.chunk_size):
+            chunk = rows[i:i + self.chunk_size]
+            try:
+                self.supabase.table("fund_holdings") \
+                    .upsert(chunk, on_conflict="fund_id, symbol, report_period") \
+                    .execute()
+                self._count_request()
+                written += len(chunk)
+            except Exception as e:
+                self._count_request()
+                print(f"   ⚠️ Chunk upsert failed ({len(chunk)} rows), retrying row by row: {e}")
+                for row in chunk:
+                    try:
+                        self.supabase.table("fund_holdings") \
+                            .upsert(row, on_conflict="fund_id, symbol, report_period") \
+                            .execute()
+                        written += 1
+                    except Exception as row_error:
+                        failed += 1
+                        print(f"   ❌ DB Save Error ({row['symbol']}): {row_error}")
+                    self._count_request()
+
+        elapsed = time.time() - start
+        with self._lock:
+            self.totals['written'] += written
+            self.totals['failed'] += failed
+
+        stats = {
+            'written': written,
+            'failed': failed,
+            'elapsed': elapsed,
+            'rows_per_s': written / elapsed if elapsed > 0 else 0,
+        }
+        print(f"   💾 {label}Saved {written} rows ({failed} failed) in {elapsed:.2f}s ({stats['rows_per_s']:.0f} rows/s)")
+        return stats
@@ -0,0 +1,221 @@
+import os
+import re
+import gzip
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Optional, Dict
+
+# Filing documents under /Archives/edgar/data/<cik>/<accession>/ never change once published
+IMMUTABLE_URL_RE = re.compile(r'^https?://www\.sec\.gov/Archives/edgar/data/\d+/\d{18}/', re.IGNORECASE)
+
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.getenv('EDGAR_CACHE_DIR', os.path.join(script_dir, '.cache', 'edgar'))
+DEFAULT_MAX_BYTES = int(os.getenv('EDGAR_CACHE_MAX_BYTES', 2 * 1024 ** 3))  # 2 GB compressed
+
+
+def is_immutable_url(url: str) -> bool:
+    return bool(IMMUTABLE_URL_RE.match(url))
+
+
+class HttpCache:
+    """
+    Content-addressed on-disk HTTP response cache.
+
+    Bodies are stored once per SHA-256 of their content as gzip blobs
+    (blobs/ab/abcdef....gz); a SQLite index maps URL -> blob plus the
+    validators (ETag / Last-Modified) needed to revalidate mutable entries.
+    When the compressed total exceeds `max_bytes`, least recently used
+    blobs are evicted together with every URL pointing at them.
+    """
+
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(root, 'blobs'), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, 'index.sqlite'), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                blob TEXT NOT NULL REFERENCES blobs(hash),
+                etag TEXT,
+                last_modified TEXT,
+                immutable INTEGER NOT NULL DEFAULT 1
+            );
+            CREATE INDEX IF NOT EXISTS idx_blobs_lru ON blobs(last_access);
+        """)
+        self._db.commit()
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, 'blobs', digest[:2], f"{digest}.gz")
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Return {'content', 'etag', 'last_modified', 'immutable'} or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT blob, etag, last_modified, immutable FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+            if not row:
+                self.misses += 1
+                return None
+
+            digest, etag, last_modified, immutable = row
+            try:
+                with gzip.open(self._blob_path(digest), 'rb') as f:
+                    content = f.read()
+            except (OSError, EOFError):
+                # Blob lost or truncated on disk: drop the entry and refetch
+                self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+                self._db.commit()
+                self.misses += 1
+                return None
+
+            self._db.execute("UPDATE blobs SET last_access = ? WHERE hash = ?", (time.time(), digest))
+            self._db.commit()
+            self.hits += 1
+
+        return {'content': content, 'etag': etag, 'last_modified': last_modified, 'immutable': bool(immutable)}
+
+    def open(self, url: str):
+        """Open a cached body as a binary stream (caller closes), or None on a miss."""
+        with self._lock:
+            row = self._db.execute("SELECT blob FROM entries WHERE url = ?", (url,)).fetchone()
+            if not row or not os.path.exists(self._blob_path(row[0])):
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE blobs SET last_access = ? WHERE hash = ?", (time.time(), row[0]))
+            self._db.commit()
+            self.hits += 1
+        return gzip.open(self._blob_path(row[0]), 'rb')
+
+    def writer(self, url: str, immutable: bool = True) -> 'CacheWriter':
+        """Incremental writer for streamed bodies; the entry is committed on commit()."""
+        return CacheWriter(self, url, immutable)
+
+    def _commit_file(self, url: str, tmp_path: str, digest: str, etag: str, last_modified: str, immutable: bool):
+        path = self._blob_path(digest)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+            self._db.execute(
+                "INSERT OR REPLACE INTO blobs (hash, size, last_access) VALUES (?, ?, ?)",
+                (digest, size, time.time())
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (url, blob, etag, last_modified, immutable) VALUES (?, ?, ?, ?, ?)",
+                (url, digest, etag, last_modified, int(immutable))
+            )
+            self._db.commit()
+            self._evict_locked()
+
+    def put(self, url: str, content: bytes, etag: str = None, last_modified: str = None, immutable: bool = True):
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest)
+
+        with self._lock:
+            exists = self._db.execute("SELECT size FROM blobs WHERE hash = ?", (digest,)).fetchone()
+            if exists and os.path.exists(path):
+                size = exists[0]
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+                size = os.path.getsize(path)
+
+            self._db.execute(
+                "INSERT OR REPLACE INTO blobs (hash, size, last_access) VALUES (?, ?, ?)",
+                (digest, size, time.time())
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (url, blob, etag, last_modified, immutable) VALUES (?, ?, ?, ?, ?)",
+                (url, digest, etag, last_modified, int(immutable))
+            )
+            self._db.commit()
+            self._evict_locked()
+
+    def _evict_locked(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Evict down to 90% so we don't evict on every put once the cache is full
+        target = self.max_bytes * 0.9
+        for digest, size in self._db.execute("SELECT hash, size FROM blobs ORDER BY last_access ASC").fetchall():
+            if total <= target:
+                break
+            self._db.execute("DELETE FROM entries WHERE blob = ?", (digest,))
+            self._db.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+            try:
+                os.remove(self._blob_path(digest))
+            except OSError:
+                pass
+            total -= size
+        self._db.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            blobs, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidated': self.revalidated,
+            'blobs': blobs,
+            'bytes': size,
+        }
+
+
+class CacheWriter:
+    """Streams a body into a temp gzip file while hashing it; nothing is visible until commit()."""
+
+    def __init__(self, cache: HttpCache, url: str, immutable: bool = True):
+        self.cache = cache
+        self.url = url
+        self.immutable = immutable
+        self._hash = hashlib.sha256()
+        self._tmp_path = os.path.join(cache.root, 'blobs', f".{threading.get_ident()}.{time.time_ns()}.tmp")
+        self._file = gzip.open(self._tmp_path, 'wb', compresslevel=6)
+
+    def write(self, chunk: bytes):
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def commit(self, etag: str = None, last_modified: str = None):
+        self._file.close()
+        self.cache._commit_file(self.url, self._tmp_path, self._hash.hexdigest(), etag, last_modified, self.immutable)
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> HttpCache:
+    """Process-wide cache instance (created lazily)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpCache()
+        return _cache
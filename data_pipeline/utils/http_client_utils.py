@@ -0,0 +1,81 @@
+import os
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Pool sizing / timeouts (overridable per environment)
+DEFAULT_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', 20))  # Hosts kept warm
+DEFAULT_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 16))          # Keep-alive sockets per host
+DEFAULT_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', 15))
+
+
+class HttpClient:
+    """
+    Shared keep-alive HTTP client for all collectors.
+
+    One requests.Session with per-host urllib3 connection pools, so repeated
+    calls to the same host reuse TCP/TLS connections instead of paying a
+    handshake each time. Default headers are registered per host, which keeps
+    SEC's User-Agent off Yahoo/FMP requests and vice versa.
+    stats() reports new connections (handshakes) vs requests per host.
+    """
+
+    def __init__(self, pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize: int = DEFAULT_POOL_MAXSIZE, timeout: float = DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self.host_headers: Dict[str, Dict[str, str]] = {}
+        self.session = requests.Session()
+        self._adapters = []
+        for scheme in ('https://', 'http://'):
+            adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=False)
+            self.session.mount(scheme, adapter)
+            self._adapters.append(adapter)
+        self._lock = threading.Lock()
+
+    def set_host_headers(self, host: str, headers: Dict[str, str]):
+        with self._lock:
+            self.host_headers[host] = dict(headers)
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        host = urlparse(url).netloc
+        merged = dict(self.host_headers.get(host, {}))
+        if headers:
+            merged.update(headers)
+        return self.session.get(url, headers=merged, timeout=timeout or self.timeout, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per host: connections opened (handshakes), requests sent, and requests that reused a connection."""
+        result = {}
+        for adapter in self._adapters:
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host = pool.host
+                entry = result.setdefault(host, {'connections': 0, 'requests': 0, 'reused': 0})
+                entry['connections'] += pool.num_connections
+                entry['requests'] += pool.num_requests
+        for entry in result.values():
+            entry['reused'] = max(entry['requests'] - entry['connections'], 0)
+        return result
+
+    def print_stats(self):
+        for host, s in sorted(self.stats().items()):
+            print(f"   🔗 {host}: {s['requests']} requests, {s['connections']} handshakes, {s['reused']} reused")
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """Process-wide client instance (created lazily)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -0,0 +1,77 @@
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterable, Iterator, Optional
+
+
+def _local_name(tag: str) -> str:
+    return tag.split('}', 1)[1] if '}' in tag else tag
+
+
+def _to_float(text: Optional[str]) -> float:
+    try:
+        return float(text.replace(',', '').strip())
+    except (AttributeError, ValueError):
+        return 0
+
+
+class _InfoTableTags:
+    """Fully-qualified tag names for one document, computed once from its namespace."""
+
+    def __init__(self, ns: str):
+        self.info_table = f"{ns}infoTable"
+        self.name = f"{ns}nameOfIssuer"
+        self.cusip = f"{ns}cusip"
+        self.value = f"{ns}value"
+        self.shares = f"{ns}shrsOrPrnAmt/{ns}sshPrnamt"
+
+
+def iter_infotable_holdings(chunks: Iterable[bytes], value_multiplier: float = 1000) -> Iterator[Dict]:
+    """
+    Incrementally parse a 13F information table.
+
+    Bytes are fed to an XMLPullParser as they arrive and every <infoTable>
+    is yielded as a holding dict as soon as its end tag is seen; the
+    subtree is then dropped from the root, so memory stays bounded by the
+    chunk size rather than the document size.
+    The namespace is taken from the first infoTable element, after which
+    tags are matched by plain string equality.
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    stack = []
+    tags = None
+
+    def drain():
+        nonlocal tags
+        for event, elem in parser.read_events():
+            if event == 'start':
+                stack.append(elem)
+                if tags is None and _local_name(elem.tag).lower() == 'infotable':
+                    tags = _InfoTableTags(elem.tag[:-len(_local_name(elem.tag))])
+                continue
+
+            stack.pop()
+            if tags is None or elem.tag != tags.info_table:
+                continue
+
+            name = elem.findtext(tags.name)
+            if name is not None:
+                yield {
+                    'name': name,
+                    'cusip': elem.findtext(tags.cusip) or "",
+                    'value': _to_float(elem.findtext(tags.value)) * value_multiplier,
+                    'shares': _to_float(elem.findtext(tags.shares)),
+                    'symbol': None,
+                }
+
+            # Detach the finished subtree so the in-memory tree never grows
+            if stack:
+                stack[-1].remove(elem)
+            else:
+                elem.clear()
+
+    for chunk in chunks:
+        if chunk:
+            parser.feed(chunk)
+            yield from drain()
+
+    parser.close()
+    yield from drain()
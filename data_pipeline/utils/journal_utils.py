@@ -0,0 +1,81 @@
+import json
+import os
+import time
+from typing import Dict, Iterable, Optional
+
+
+def write_json_atomic(path: str, data, **dump_kwargs):
+    """Write JSON to a temp file next to `path`, fsync, then rename over it (readers never see a partial file)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class RecordJournal:
+    """
+    Append-only JSON-lines journal of finished records, keyed by `key`.
+
+    Each append writes one compact line per record and fsyncs, so a crash
+    loses at most the line being written. load() replays the journal (later
+    lines win), dropping a torn final line. A journal older than
+    `max_age_hours` is treated as abandoned and discarded rather than resumed.
+    """
+
+    def __init__(self, path: str, key: str = 'symbol', max_age_hours: Optional[float] = None):
+        self.path = path
+        self.key = key
+        self.max_age_hours = max_age_hours
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self) -> Dict[str, Dict]:
+        if not self.exists():
+            return {}
+        if self.max_age_hours is not None and time.time() - os.path.getmtime(self.path) > self.max_age_hours * 3600:
+            print(f"⚠️ Journal {self.path} is older than {self.max_age_hours}h. Starting a fresh run.")
+            self.discard()
+            return {}
+
+        records = {}
+        good_bytes = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                records[record[self.key]] = record
+                good_bytes += len(line)
+
+        # Cut a torn tail so the next append starts on a clean line
+        if good_bytes < os.path.getsize(self.path):
+            print(f"⚠️ Dropping torn journal tail ({os.path.getsize(self.path) - good_bytes} bytes).")
+            with open(self.path, 'r+b') as f:
+                f.truncate(good_bytes)
+        return records
+
+    def append(self, records: Iterable[Dict]) -> int:
+        lines = [json.dumps(r, ensure_ascii=False, separators=(',', ':')) + '\n' for r in records]
+        if not lines:
+            return 0
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        return len(lines)
+
+    def discard(self):
+        if self.exists():
+            os.remove(self.path)
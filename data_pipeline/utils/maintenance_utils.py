@@ -0,0 +1,134 @@
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils import fund_summary_utils, ownership_utils, position_diff_utils, fund_similarity_utils
+
+# Yahoo search noise that is never a US 13F position:
+# =F futures, =X currencies, and foreign listings (.BA Buenos Aires, .SA Sao Paulo,
+# .MX Mexico, .T Tokyo, .L London, .HK Hong Kong, .KS Korea, .TWO Taiwan OTC)
+BAD_SYMBOL_PATTERNS = ['%=%', '%.BA', '%.SA', '%.MX', '%.T', '%.L', '%.HK', '%.KS', '%.TWO']
+
+# The repair RPCs are granted to service_role only
+SERVICE_KEY_ENV = 'SUPABASE_SERVICE_ROLE_KEY'
+
+# fund_holdings repair rules, executed server-side (see
+# database/migrations/20261018_holdings_maintenance_functions.sql).
+# Each rule is one RPC = one set-based statement, whatever the table size.
+RULES = [
+    {
+        'name': 'bad_symbols',
+        'description': 'Delete futures/FX/foreign-listing symbols',
+        'rpc': 'holdings_delete_symbols',
+        'params': {'p_patterns': BAD_SYMBOL_PATTERNS},
+    },
+    {
+        'name': 'inflated_values',
+        'description': 'Scale positions above $500B down 1000x (thousands applied twice)',
+        'rpc': 'holdings_scale_values',
+        'params': {'p_min_value': 500_000_000_000, 'p_factor': 0.001},
+    },
+    {
+        'name': 'duplicate_keys',
+        'description': 'Delete duplicate (fund_id, symbol, report_period) rows, keeping the oldest',
+        'rpc': 'holdings_delete_duplicates',
+        'params': {},
+    },
+]
+
+
+def service_client():
+    """Supabase client with the service-role key (required by the maintenance RPCs)."""
+    from supabase import create_client
+    url, key = os.getenv('SUPABASE_URL'), os.getenv(SERVICE_KEY_ENV)
+    if not url or not key:
+        print(f"❌ Error: SUPABASE_URL and {SERVICE_KEY_ENV} are required for maintenance rules")
+        exit(1)
+    return create_client(url, key)
+
+
+def get_rules(names: Optional[Iterable[str]] = None) -> List[Dict]:
+    if not names:
+        return list(RULES)
+    by_name = {r['name']: r for r in RULES}
+    unknown = [n for n in names if n not in by_name]
+    if unknown:
+        raise ValueError(f"Unknown maintenance rule(s): {', '.join(unknown)} (known: {', '.join(by_name)})")
+    return [by_name[n] for n in names]
+
+
+def refresh_derived(supabase, fund_periods: Iterable[Tuple[str, str]]) -> Dict:
+    """
+    Rebuild everything derived from fund_holdings for the touched
+    (fund_id, report_period) pairs after a repair:
+      * fund_period_summary and symbol_ownership for each pair
+      * position diffs for each touched fund (whole history: removing a row
+        changes the next quarter's change_from_prev / first_added)
+      * fund_similarity for each touched quarter (cross-fund)
+    """
+    by_fund: Dict[str, set] = {}
+    for fund_id, period in fund_periods:
+        by_fund.setdefault(fund_id, set()).add(period)
+    periods = sorted({p for ps in by_fund.values() for p in ps})
+    print(f"   🔄 Refreshing derived tables: {len(by_fund)} funds, {len(periods)} quarters")
+
+    for fund_id, quarters in sorted(by_fund.items()):
+        for period in sorted(quarters):
+            try:
+                rows = fund_summary_utils.load_period_rows(supabase, fund_id, period)
+                summary = fund_summary_utils.update_fund_period_summary(supabase, fund_id, period, rows=rows)
+                ownership_utils.update_ownership(supabase, fund_id, period, rows,
+                                                 total_value=summary['total_value'] if summary else None)
+            except Exception as e:
+                print(f"   ⚠️ {fund_id} {period}: summary/ownership refresh failed: {e}")
+        try:
+            position_diff_utils.update_fund_diffs(supabase, fund_id, label=f"{fund_id}: ")
+        except Exception as e:
+            print(f"   ⚠️ {fund_id}: position diff refresh failed: {e}")
+
+    for period in periods:
+        try:
+            fund_similarity_utils.update_period_similarity(supabase, period)
+        except Exception as e:
+            print(f"   ⚠️ Similarity update failed ({period}): {e}")
+
+    return {'funds': len(by_fund), 'periods': len(periods)}
+
+
+def run_rules(supabase, names: Optional[Iterable[str]] = None, dry_run: bool = True,
+              sample: int = 5, refresh: bool = True) -> Dict[str, Dict]:
+    """
+    Run maintenance rules in order and print a report (counts and samples only).
+    With dry_run=True nothing is modified. After real changes, every table
+    derived from fund_holdings is rebuilt for the touched funds and quarters
+    (summaries, symbol_ownership, position diffs, fund_similarity; see
+    refresh_derived).
+    """
+    print(f"🧹 Maintenance ({'DRY RUN' if dry_run else 'APPLY'})")
+    results = {}
+    touched = set()
+
+    for rule in get_rules(names):
+        start = time.time()
+        params = dict(rule['params'], p_dry_run=dry_run, p_sample=sample)
+        try:
+            result = supabase.rpc(rule['rpc'], params).execute().data or {}
+        except Exception as e:
+            print(f"   ❌ {rule['name']}: {e}")
+            results[rule['name']] = {'error': str(e)}
+            continue
+
+        results[rule['name']] = result
+        if result.get('affected'):
+            touched.update((fp['fund_id'], fp['report_period']) for fp in result.get('fund_periods') or [])
+
+        print(f"   🔹 {rule['name']}: {rule['description']}")
+        print(f"      matched {result.get('matched', 0):,}, affected {result.get('affected', 0):,} "
+              f"in {time.time() - start:.2f}s")
+        for row in result.get('sample') or []:
+            print(f"      · {row}")
+
+    if touched and refresh:
+        refresh_derived(supabase, touched)
+
+    return results
@@ -0,0 +1,101 @@
+import hashlib
+import threading
+from datetime import datetime
+from typing import List, Dict, Optional
+
+# Accessions in these states are never fetched again. 'empty' means the
+# information table was fetched and has zero rows; fetch/parse errors are
+# recorded as 'failed' and retried.
+DONE_STATUSES = ('loaded', 'empty')
+
+
+class HoldingsChecksum:
+    """
+    Order-independent SHA-256 over the parsed (cusip, shares, value) rows of a
+    filing, accumulated one row at a time (sum of per-row digests mod 2^256,
+    bound to the row count) so a streamed filing never has to be held in memory.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.count = 0
+
+    def add(self, h: Dict):
+        line = f"{h.get('cusip') or ''}|{h.get('shares') or 0:.0f}|{h.get('value') or 0:.0f}"
+        self.total = (self.total + int.from_bytes(hashlib.sha256(line.encode('utf-8')).digest(), 'big')) % (1 << 256)
+        self.count += 1
+
+    def hexdigest(self) -> str:
+        return hashlib.sha256(f"{self.count}:{self.total:064x}".encode('utf-8')).hexdigest()
+
+
+def holdings_checksum(holdings: List[Dict]) -> str:
+    checksum = HoldingsChecksum()
+    for h in holdings:
+        checksum.add(h)
+    return checksum.hexdigest()
+
+
+class FilingManifest:
+    """
+    Per-fund view of the filing_manifest table (one row per 13F accession).
+
+    Discovery diffs the submissions list against it so only new or failed
+    accessions cost any SEC requests; a daily run on an up-to-date fund
+    makes one submissions call and one manifest query.
+    """
+
+    def __init__(self, supabase, fund_id: str, cik: str):
+        self.supabase = supabase
+        self.fund_id = fund_id
+        self.cik = cik
+        self._lock = threading.Lock()
+        self.entries = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            res = self.supabase.table("filing_manifest") \
+                .select("accession_number, status, row_count, checksum, report_period, full_book") \
+                .eq("fund_id", self.fund_id) \
+                .execute()
+            return {r['accession_number']: r for r in (res.data or [])}
+        except Exception as e:
+            print(f"   ⚠️ Manifest load failed (processing everything): {e}")
+            return {}
+
+    def is_done(self, accession: str, full_book: bool = False) -> bool:
+        entry = self.entries.get(accession)
+        if not entry or entry.get('status') not in DONE_STATUSES:
+            return False
+        # A top-N load does not satisfy a full-book run
+        return entry.get('status') == 'empty' or not full_book or bool(entry.get('full_book'))
+
+    def pending(self, filings: List[Dict], full_book: bool = False) -> List[Dict]:
+        """Filings (from thirteen_f_utils.list_13f_filings) that still need work."""
+        return [f for f in filings if not self.is_done(f['accession'], full_book)]
+
+    def mark(self, filing: Dict, status: str, xml_url: Optional[str] = None,
+             row_count: Optional[int] = None, checksum: Optional[str] = None, error: Optional[str] = None,
+             full_book: bool = False, value_unit: Optional[str] = None, unit_confidence: Optional[float] = None):
+        record = {
+            "accession_number": filing['accession'],
+            "fund_id": self.fund_id,
+            "cik": self.cik,
+            "report_period": filing['report_date'],
+            "filing_date": filing.get('filing_date'),
+            "xml_url": xml_url,
+            "status": status,
+            "row_count": row_count,
+            "checksum": checksum,
+            "error": error[:500] if error else None,
+            "full_book": full_book,
+            "value_unit": value_unit,
+            "unit_confidence": unit_confidence,
+            "updated_at": datetime.utcnow().isoformat(),
+        }
+        with self._lock:
+            self.entries[filing['accession']] = record
+        try:
+            self.supabase.table("filing_manifest").upsert(record, on_conflict="accession_number").execute()
+        except Exception as e:
+            print(f"   ⚠️ Manifest update failed ({filing['accession']}): {e}")
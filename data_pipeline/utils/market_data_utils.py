@@ -1,8 +1,28 @@
 import yfinance as yf
 from datetime import datetime, timedelta
 import pandas as pd
-import requests
-from typing import Optional, Dict
+import numpy as np
+import threading
+from typing import Optional, Dict, Iterable, List, Tuple
+from utils import http_client_utils
+from utils.rate_limit_utils import YAHOO_RATE_LIMITER
+
+# Shared keep-alive client; Yahoo needs a browser-like User-Agent
+YAHOO_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+http = http_client_utils.get_client()
+http.set_host_headers('query2.finance.yahoo.com', YAHOO_HEADERS)
+
+# yf.download collects results in module-global state (yfinance.shared._DFS),
+# so concurrent calls from different threads can swap or clobber each other's
+# frames. Every download in the process goes through this lock.
+_DOWNLOAD_LOCK = threading.Lock()
+
+def download(tickers, **kwargs) -> pd.DataFrame:
+    """yf.download, serialized process-wide (threads=True still parallelizes within one call)."""
+    with _DOWNLOAD_LOCK:
+        return yf.download(tickers, **kwargs)
 
 def get_current_price(symbol: str) -> float:
     """Get the latest market price for a symbol."""
@@ -35,7 +55,7 @@ def get_quarter_average_price(symbol: str, quarter_end_date: str) -> float:
         end_str = (end_date + timedelta(days=1)).strftime("%Y-%m-%d")
         
         # Suppress progress bar
-        df = yf.download(symbol, start=start_str, end=end_str, progress=False, actions=False)
+        df = download(symbol, start=start_str, end=end_str, progress=False, actions=False)
         
         if df.empty:
             return 0.0
@@ -50,6 +70,152 @@ def get_quarter_average_price(symbol: str, quarter_end_date: str) -> float:
         print(f"⚠️ Error fetching historical price for {symbol}: {e}")
         return 0.0
 
+def _close_frame(df: pd.DataFrame, symbols: List[str]) -> pd.DataFrame:
+    """Wide (date x symbol) close prices from a yf.download result, single or multi ticker."""
+    if df is None or df.empty:
+        return pd.DataFrame()
+    if isinstance(df.columns, pd.MultiIndex):
+        fields = df.columns.get_level_values(0)
+        col = 'Adj Close' if 'Adj Close' in fields else 'Close'
+        return df[col]
+    col = 'Adj Close' if 'Adj Close' in df.columns else 'Close'
+    return df[[col]].rename(columns={col: symbols[0]})
+
+
+class QuarterPriceBook:
+    """
+    Batched, memoized quarter-average prices.
+
+    prefetch() takes every (symbol, quarter_end) pair needed by a filing or a
+    whole backfill, downloads each symbol's full date span once in
+    multi-ticker yf.download batches, and computes all 90-day window averages
+    in one vectorized pass (cumulative sums + searchsorted over the stacked
+    price series). get() then answers from memory, matching
+    get_quarter_average_price() for the same window.
+    """
+
+    def __init__(self, batch_size: int = 50):
+        self.batch_size = batch_size
+        self.averages: Dict[Tuple[str, str], float] = {}
+        self.current: Dict[str, float] = {}
+        self.downloads = 0
+        self._lock = threading.Lock()
+
+    def prefetch(self, pairs: Iterable[Tuple[str, str]]):
+        with self._lock:
+            todo = pd.DataFrame(
+                sorted({(s, q) for s, q in pairs if s and (s, q) not in self.averages}),
+                columns=['symbol', 'quarter_end']
+            )
+        if todo.empty:
+            return
+
+        todo['end'] = pd.to_datetime(todo['quarter_end'])
+        todo['start'] = todo['end'] - pd.Timedelta(days=90)
+
+        # Full span per symbol; batch symbols with similar spans together
+        spans = todo.groupby('symbol').agg(start=('start', 'min'), end=('end', 'max')).sort_values('start')
+        frames = []
+        symbols = list(spans.index)
+        for i in range(0, len(symbols), self.batch_size):
+            batch = symbols[i:i + self.batch_size]
+            start = spans.loc[batch, 'start'].min().strftime("%Y-%m-%d")
+            # end date in yfinance is exclusive, so +1 day
+            end = (spans.loc[batch, 'end'].max() + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+            try:
+                df = download(batch, start=start, end=end, progress=False, actions=False, threads=True)
+                self.downloads += 1
+            except Exception as e:
+                print(f"⚠️ Error fetching historical prices for {len(batch)} symbols: {e}")
+                continue
+            wide = _close_frame(df, batch)
+            if not wide.empty:
+                frames.append(wide.stack().rename('price').rename_axis(['date', 'symbol']).reset_index())
+
+        averages = pd.Series(0.0, index=pd.MultiIndex.from_frame(todo[['symbol', 'quarter_end']]))
+        if frames:
+            prices = pd.concat(frames, ignore_index=True).dropna().drop_duplicates(['symbol', 'date'])
+            prices = prices.sort_values(['symbol', 'date'])
+
+            # One sorted key space: (symbol code, day number)
+            codes = {sym: n for n, sym in enumerate(prices['symbol'].unique())}
+            span = 1 << 20
+            keys = prices['symbol'].map(codes).to_numpy(np.int64) * span \
+                + prices['date'].to_numpy('datetime64[D]').astype(np.int64)
+            csum = np.concatenate([[0.0], np.cumsum(prices['price'].to_numpy(float))])
+
+            known = todo[todo['symbol'].isin(codes)]
+            sym_codes = known['symbol'].map(codes).to_numpy(np.int64) * span
+            lo = np.searchsorted(keys, sym_codes + known['start'].to_numpy('datetime64[D]').astype(np.int64), 'left')
+            hi = np.searchsorted(keys, sym_codes + known['end'].to_numpy('datetime64[D]').astype(np.int64), 'right')
+            counts = hi - lo
+            means = np.divide(csum[hi] - csum[lo], counts, out=np.zeros(len(counts)), where=counts > 0)
+            averages.loc[list(zip(known['symbol'], known['quarter_end']))] = means
+
+        with self._lock:
+            self.averages.update(averages.to_dict())
+
+        # Batch the current-price fallback for anything without history
+        missing = sorted({s for (s, q), v in averages.items() if v == 0 and s not in self.current})
+        if missing:
+            self._prefetch_current(missing)
+
+    def _prefetch_current(self, symbols: List[str]):
+        found = {}
+        for i in range(0, len(symbols), self.batch_size):
+            batch = symbols[i:i + self.batch_size]
+            try:
+                df = download(batch, period='5d', progress=False, actions=False, threads=True)
+                self.downloads += 1
+            except Exception as e:
+                print(f"⚠️ Error fetching current prices for {len(batch)} symbols: {e}")
+                continue
+            wide = _close_frame(df, batch)
+            if not wide.empty:
+                last = wide.ffill().iloc[-1]
+                found.update({sym: float(v) for sym, v in last.items() if pd.notna(v)})
+        with self._lock:
+            for sym in symbols:
+                self.current[sym] = found.get(sym, 0.0)
+
+    def get(self, symbol: str, quarter_end_date: str) -> float:
+        """Quarter average, falling back to the latest price; 0.0 if neither is known."""
+        with self._lock:
+            cached = (symbol, quarter_end_date) in self.averages
+        if not cached:
+            self.prefetch([(symbol, quarter_end_date)])
+        with self._lock:
+            avg = self.averages.get((symbol, quarter_end_date), 0.0)
+            return avg if avg else self.current.get(symbol, 0.0)
+
+def get_batch_quotes(symbols: List[str], batch_size: int = 100) -> Dict[str, Dict]:
+    """
+    Latest close and daily change % for many symbols via multi-ticker
+    yf.download batches (one request per `batch_size` symbols instead of a
+    quote call per symbol). Symbols without data are left out.
+    """
+    quotes = {}
+    for i in range(0, len(symbols), batch_size):
+        batch = symbols[i:i + batch_size]
+        try:
+            df = download(batch, period='5d', progress=False, actions=False, threads=True)
+        except Exception as e:
+            print(f"⚠️ Error fetching quotes for {len(batch)} symbols: {e}")
+            continue
+        wide = _close_frame(df, batch)
+        for sym in wide.columns:
+            closes = wide[sym].dropna()
+            if closes.empty:
+                continue
+            price = float(closes.iloc[-1])
+            prev = float(closes.iloc[-2]) if len(closes) > 1 else None
+            quotes[sym] = {
+                'price': price,
+                'previous_close': prev,
+                'changes_percentage': (price - prev) / prev * 100 if prev else 0.0
+            }
+    return quotes
+
 def get_dcf_metrics(symbol: str) -> Dict:
     """
     Fetch basic metrics needed for a quick DCF or valuation check.
@@ -76,34 +242,42 @@ def get_dcf_metrics(symbol: str) -> Dict:
     except Exception as e:
         return {}
 
+class SymbolSearchError(Exception):
+    """The symbol search could not be completed (transport error, non-200, bad body)."""
+
+
 def search_symbol_yahoo(query: str) -> Optional[str]:
     """
     Search for a stock symbol using Yahoo Finance Auto-Complete API.
     Useful for resolving 'Apple Inc' -> 'AAPL'.
+
+    Returns None only when Yahoo answered and found nothing; raises
+    SymbolSearchError when there was no usable answer (timeouts, 429/5xx).
     """
+    url = "https://query2.finance.yahoo.com/v1/finance/search"
+    params = {
+        'q': query,
+        'quotesCount': 1,
+        'newsCount': 0,
+        'enableFuzzyQuery': 'true',
+        'quotesQueryId': 'tss_match_phrase_query'
+    }
+
+    YAHOO_RATE_LIMITER.acquire()
     try:
-        url = "https://query2.finance.yahoo.com/v1/finance/search"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        params = {
-            'q': query,
-            'quotesCount': 1,
-            'newsCount': 0,
-            'enableFuzzyQuery': 'true',
-            'quotesQueryId': 'tss_match_phrase_query'
-        }
-        
-        resp = requests.get(url, params=params, headers=headers, timeout=5)
-        if resp.status_code == 200:
-            data = resp.json()
-            if 'quotes' in data and len(data['quotes']) > 0:
-                quote = data['quotes'][0]
-                symbol = quote['symbol']
-                # Preference for US listings (avoiding .DE, .L, etc if possible, unless query suggests it)
-                # But for now, take the top hit.
-                return symbol
+        resp = http.get(url, params=params, timeout=5)
     except Exception as e:
-        print(f"⚠️ Yahoo Search Error for {query}: {e}")
-    
+        raise SymbolSearchError(f"Yahoo search failed for {query}: {e}") from e
+    if resp.status_code != 200:
+        raise SymbolSearchError(f"Yahoo search returned HTTP {resp.status_code} for {query}")
+    try:
+        data = resp.json()
+    except ValueError as e:
+        raise SymbolSearchError(f"Yahoo search returned invalid JSON for {query}") from e
+
+    quotes = data.get('quotes') or []
+    if quotes:
+        # Preference for US listings (avoiding .DE, .L, etc if possible, unless query suggests it)
+        # But for now, take the top hit.
+        return quotes[0].get('symbol')
     return None
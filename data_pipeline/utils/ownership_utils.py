@@ -0,0 +1,157 @@
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from utils import static_artifact_utils
+from utils.pagination_utils import TableIterator
+
+WRITE_CHUNK = 500
+
+# Quarters kept in the exported web files (the table keeps everything)
+EXPORT_PERIODS = 8
+
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PUBLIC_DIR = os.path.join(script_dir, '..', 'web-app', 'public')
+
+
+def ownership_rows(fund_id: str, report_period: str, rows: List[Dict], total_value: Optional[float]) -> List[Dict]:
+    """
+    symbol_ownership records for one filing from its fund_holdings rows.
+    A filing can hold a symbol in several rows (share classes, CUSIPs that
+    resolve to the same ticker); they are summed into one record per symbol
+    so an upsert chunk never repeats a (symbol, report_period, fund_id) key.
+    """
+    now = datetime.utcnow().isoformat()
+    positions: Dict[str, Dict] = {}
+    for r in rows:
+        if not r.get('symbol'):
+            continue
+        p = positions.setdefault(r['symbol'], {'shares': None, 'value': None})
+        for field in ('shares', 'value'):
+            if r.get(field) is not None:
+                p[field] = (p[field] or 0) + r[field]
+
+    return [{
+        "symbol": symbol,
+        "report_period": report_period,
+        "fund_id": fund_id,
+        "shares": p['shares'],
+        "value": p['value'],
+        "weight": round((p['value'] or 0) / total_value, 6) if total_value else None,
+        "updated_at": now,
+    } for symbol, p in positions.items()]
+
+
+def update_ownership(supabase, fund_id: str, report_period: str, rows: List[Dict],
+                     total_value: Optional[float] = None) -> int:
+    """
+    Replace one filing's slice of the index: delete (fund, period), insert the
+    current positions. Positions dropped on re-ingest don't linger.
+    """
+    if total_value is None:
+        total_value = sum(r.get('value') or 0 for r in rows)
+    records = ownership_rows(fund_id, report_period, rows, total_value)
+
+    try:
+        supabase.table("symbol_ownership").delete().eq("fund_id", fund_id).eq("report_period", report_period).execute()
+    except Exception as e:
+        print(f"   ⚠️ Ownership index clear failed ({report_period}): {e}")
+        return 0
+
+    written = 0
+    for i in range(0, len(records), WRITE_CHUNK):
+        chunk = records[i:i + WRITE_CHUNK]
+        try:
+            supabase.table("symbol_ownership").upsert(chunk, on_conflict="symbol, report_period, fund_id").execute()
+            written += len(chunk)
+        except Exception as e:
+            print(f"   ⚠️ Ownership index write failed ({report_period}, {len(chunk)} rows): {e}")
+    return written
+
+
+def rebuild_ownership(supabase, fund_id: str, label: str = "") -> int:
+    """Rebuild a fund's whole slice of the index from fund_holdings (backfill / after repairs)."""
+    totals = {s['report_period']: s['total_value'] for s in
+              (supabase.table("fund_period_summary").select("report_period, total_value")
+               .eq("fund_id", fund_id).execute().data or [])}
+
+    rows = TableIterator(supabase, "fund_holdings", "id, symbol, report_period, shares, value",
+                         key_columns=("report_period", "id"), filters=lambda q: q.eq("fund_id", fund_id))
+
+    # Rows arrive in period order: flush each period as soon as the next one starts
+    written = 0
+    period, period_rows = None, []
+    for row in rows:
+        if row['report_period'] != period:
+            if period_rows:
+                written += update_ownership(supabase, fund_id, period, period_rows, totals.get(period))
+            period, period_rows = row['report_period'], []
+        period_rows.append(row)
+    if period_rows:
+        written += update_ownership(supabase, fund_id, period, period_rows, totals.get(period))
+
+    rows.print_stats(f"{label}ownership ")
+    return written
+
+
+def get_holders(supabase, symbol: str, report_period: Optional[str] = None) -> List[Dict]:
+    """Tracked funds holding `symbol` in a quarter (latest available if omitted), largest first."""
+    if report_period is None:
+        latest = supabase.table("symbol_ownership").select("report_period").eq("symbol", symbol) \
+            .order("report_period", desc=True).limit(1).execute().data
+        if not latest:
+            return []
+        report_period = latest[0]['report_period']
+    return supabase.table("symbol_ownership") \
+        .select("fund_id, shares, value, weight, report_period, hedge_funds(name)") \
+        .eq("symbol", symbol).eq("report_period", report_period) \
+        .order("value", desc=True).execute().data or []
+
+
+def get_holder_history(supabase, symbol: str) -> List[Dict]:
+    """Holder count and aggregate tracked-fund shares/value per quarter, oldest first."""
+    return supabase.table("symbol_ownership_summary").select("*").eq("symbol", symbol) \
+        .order("report_period").execute().data or []
+
+
+def export_ownership_index(supabase, public_dir: str = DEFAULT_PUBLIC_DIR, periods: int = EXPORT_PERIODS) -> Dict:
+    """
+    Publish the recent quarters of the index for the web app as FNV-1a
+    bucketed, content-hashed files (static_artifact_utils.publish_ownership_artifacts),
+    so a stock page loads only its symbol's bucket.
+    """
+    funds = {f['id']: f['name'] for f in supabase.table("hedge_funds").select("id, name").execute().data or []}
+
+    recent = []
+    while len(recent) < periods:
+        query = supabase.table("symbol_ownership").select("report_period")
+        if recent:
+            query = query.lt("report_period", recent[-1])
+        res = query.order("report_period", desc=True).limit(1).execute().data
+        if not res:
+            break
+        recent.append(res[0]['report_period'])
+    recent.sort()
+    period_index = {p: i for i, p in enumerate(recent)}
+
+    symbols: Dict[str, List] = {}
+    if recent:
+        rows = TableIterator(supabase, "symbol_ownership", "symbol, report_period, fund_id, shares, value, weight",
+                             key_columns=("symbol", "report_period", "fund_id"),
+                             filters=lambda q: q.gte("report_period", recent[0]))
+        for row in rows:
+            if row['fund_id'] not in funds:
+                continue
+            symbols.setdefault(row['symbol'], []).append([
+                row['fund_id'],
+                period_index[row['report_period']],
+                row['shares'],
+                row['value'],
+                row['weight'],
+            ])
+        rows.print_stats("ownership export: ")
+
+    stats = static_artifact_utils.publish_ownership_artifacts(funds, recent, symbols, public_dir)
+    print(f"   💾 Ownership index: {len(symbols)} symbols, {len(recent)} quarters -> {stats['buckets']} buckets "
+          f"({stats['written']} written, {stats['reused']} unchanged, {stats['removed']} pruned)")
+    return dict(stats, symbols=len(symbols), periods=len(recent))
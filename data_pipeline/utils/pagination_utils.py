@@ -0,0 +1,200 @@
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+# PostgREST returns at most 1000 rows per request by default
+PAGE_SIZE = 1000
+
+
+def _quote(value) -> str:
+    """PostgREST logical-filter literal: always double-quoted so '.', ',' and ':' in symbols are safe."""
+    text = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{text}"'
+
+
+def keyset_filter(key_columns: Sequence[str], last_row: Dict) -> str:
+    """
+    `or=(...)` expression selecting rows strictly after `last_row` in
+    (key_columns...) order, e.g. for (a, b):  a > x  OR  (a = x AND b > y).
+    Key columns must be non-null: a NULL boundary would compare against the
+    literal "None" and skip or repeat rows, so it raises instead.
+    """
+    nulls = [c for c in key_columns if last_row.get(c) is None]
+    if nulls:
+        raise ValueError(f"Keyset pagination hit NULL in key column(s) {', '.join(nulls)}; page on non-null columns")
+    clauses = []
+    for i, column in enumerate(key_columns):
+        equal = [f"{c}.eq.{_quote(last_row[c])}" for c in key_columns[:i]]
+        greater = f"{column}.gt.{_quote(last_row[column])}"
+        clauses.append(f"and({','.join(equal + [greater])})" if equal else greater)
+    return ",".join(clauses)
+
+
+_END = object()
+
+
+class TableIterator:
+    """
+    Keyset-paginated reader over any table and filter set.
+
+    Pages are "rows after the last key seen" ordered by `key_columns` (an
+    indexed, unique, non-null key - add the primary key last as a
+    tiebreaker), so a page costs the same at row 10 million as at row 0 and
+    concurrent writers can't make rows skip or repeat the way OFFSET does.
+    With prefetch=True the next page is requested on a background thread
+    while the caller works on the current one.
+
+    Iterate for rows, or use .pages() / .column_batches() for batches.
+    .stats() reports rows, pages, rows/s and page latency.
+
+    `filters(query)` may add extra conditions (eq, in_, gt ...) to every page.
+    """
+
+    def __init__(self, supabase, table: str, columns: str, key_columns: Sequence[str] = ('id',),
+                 filters: Optional[Callable] = None, page_size: int = PAGE_SIZE, prefetch: bool = True):
+        self.supabase = supabase
+        self.table = table
+        self.columns = columns
+        self.key_columns = tuple(key_columns)
+        self.filters = filters
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.rows = 0
+        self.page_count = 0
+        self.latencies: List[float] = []
+        self.start = None
+        self.elapsed = 0.0
+
+    def _fetch(self, last: Optional[Dict]) -> List[Dict]:
+        started = time.time()
+        query = self.supabase.table(self.table).select(self.columns)
+        if self.filters:
+            query = self.filters(query)
+        if last is not None:
+            query = query.or_(keyset_filter(self.key_columns, last))
+        for column in self.key_columns:
+            query = query.order(column)
+        rows = query.limit(self.page_size).execute().data or []
+        self.latencies.append(time.time() - started)
+        return rows
+
+    def _pages_sync(self) -> Iterator[List[Dict]]:
+        last = None
+        while True:
+            rows = self._fetch(last)
+            if rows:
+                yield rows
+            if len(rows) < self.page_size:
+                return
+            last = rows[-1]
+
+    def _pages_prefetched(self) -> Iterator[List[Dict]]:
+        pages: queue.Queue = queue.Queue(maxsize=1)
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            # Bounded put that gives up once the consumer has gone away
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def producer():
+            try:
+                for page in self._pages_sync():
+                    if not put(page):
+                        return
+                put(_END)
+            except Exception as e:
+                put(e)
+
+        thread = threading.Thread(target=producer, name=f"prefetch-{self.table}", daemon=True)
+        thread.start()
+        try:
+            while True:
+                page = pages.get()
+                if page is _END:
+                    return
+                if isinstance(page, Exception):
+                    raise page
+                yield page
+        finally:
+            # Consumer stopped early (break / error): let the producer exit
+            stop.set()
+
+    def pages(self) -> Iterator[List[Dict]]:
+        """Yield one list of rows per page."""
+        self.start = time.time()
+        source = self._pages_prefetched() if self.prefetch else self._pages_sync()
+        try:
+            for page in source:
+                self.rows += len(page)
+                self.page_count += 1
+                yield page
+        finally:
+            self.elapsed = time.time() - self.start
+
+    def column_batches(self) -> Iterator[Dict[str, List]]:
+        """Yield one {column: [values...]} dict per page."""
+        for page in self.pages():
+            yield {column: [row.get(column) for row in page] for column in page[0]}
+
+    def __iter__(self) -> Iterator[Dict]:
+        for page in self.pages():
+            yield from page
+
+    def stats(self) -> Dict:
+        elapsed = self.elapsed or (time.time() - self.start if self.start else 0)
+        return {
+            'rows': self.rows,
+            'pages': self.page_count,
+            'elapsed': round(elapsed, 2),
+            'rows_per_s': round(self.rows / elapsed) if elapsed > 0 else 0,
+            'page_ms_avg': round(1000 * sum(self.latencies) / len(self.latencies), 1) if self.latencies else 0,
+            'page_ms_max': round(1000 * max(self.latencies), 1) if self.latencies else 0,
+        }
+
+    def print_stats(self, label: str = ""):
+        s = self.stats()
+        print(f"   📄 {label}{s['rows']:,} rows in {s['pages']} pages, {s['elapsed']}s "
+              f"({s['rows_per_s']:,} rows/s, page avg {s['page_ms_avg']}ms / max {s['page_ms_max']}ms)")
+
+
+def iter_keyset(supabase, table: str, columns: str, key_columns: Sequence[str],
+                filters: Optional[Callable] = None, page_size: int = PAGE_SIZE,
+                prefetch: bool = True) -> Iterator[Dict]:
+    """Yield every row of `table` in key order (see TableIterator)."""
+    return iter(TableIterator(supabase, table, columns, key_columns, filters=filters,
+                              page_size=page_size, prefetch=prefetch))
+
+
+class Throughput:
+    """Rows/s meter with a progress line every `every` rows."""
+
+    def __init__(self, label: str = "", every: int = 50_000):
+        self.label = label
+        self.every = every
+        self.rows = 0
+        self.start = time.time()
+        self._next = every
+
+    def add(self, n: int = 1):
+        self.rows += n
+        if self.every and self.rows >= self._next:
+            self._next += self.every
+            print(f"   ⏱️ {self.label}{self.rows:,} rows ({self.rate:,.0f} rows/s)")
+
+    @property
+    def elapsed(self) -> float:
+        return time.time() - self.start
+
+    @property
+    def rate(self) -> float:
+        return self.rows / self.elapsed if self.elapsed > 0 else 0
+
+    def summary(self) -> Dict:
+        return {'rows': self.rows, 'elapsed': round(self.elapsed, 2), 'rows_per_s': round(self.rate)}
@@ -0,0 +1,181 @@
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.pagination_utils import TableIterator
+
+WRITE_CHUNK = 500
+
+HISTORY_COLUMNS = "symbol, report_period, shares, avg_buy_price, first_added, estimated_entry_price"
+
+
+def load_fund_history(supabase, fund_id: str, periods: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """
+    fund_holdings rows of one fund (optionally only `periods`) as a DataFrame.
+    Unresolved rows (symbol NULL) can't be diffed and are skipped; pages are
+    keyed on the unique, non-null id (row order doesn't matter to the pivot).
+    """
+    def filters(query):
+        query = query.eq("fund_id", fund_id).not_.is_("symbol", "null")
+        return query.in_("report_period", list(periods)) if periods is not None else query
+
+    rows = list(TableIterator(supabase, "fund_holdings", f"id, {HISTORY_COLUMNS}",
+                              key_columns=("id",), filters=filters))
+
+    df = pd.DataFrame(rows, columns=[c.strip() for c in HISTORY_COLUMNS.split(',')])
+    for col in ('shares', 'avg_buy_price', 'estimated_entry_price'):
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def _matrix(df: pd.DataFrame, column: str) -> pd.DataFrame:
+    """(period x symbol) matrix of `column`; missing positions are NaN."""
+    return df.pivot_table(index='report_period', columns='symbol', values=column, aggfunc='sum').sort_index()
+
+
+def compute_position_diffs(df: pd.DataFrame, seed: Optional[pd.DataFrame] = None) -> Dict:
+    """
+    Quarter-over-quarter diffs for one fund's holdings.
+
+    The history is pivoted into (period x symbol) matrices and every position
+    of a period is computed at once:
+
+    * change_from_prev: share change % vs the previous period (NULL for new positions)
+    * first_added: first period of the current unbroken holding run
+    * estimated_entry_price: average cost, adding each quarter's share
+      increase at that quarter's avg_buy_price (reductions keep the average)
+
+    `seed` holds the stored state (shares, first_added, estimated_entry_price)
+    of the period just before `df`, so the newest quarter can be computed
+    incrementally without reloading the whole history.
+
+    Returns {'rows': [...], 'new': n, 'exited': n, 'periods': n}.
+    """
+    if df.empty:
+        return {'rows': [], 'new': 0, 'exited': 0, 'periods': 0}
+
+    shares = _matrix(df, 'shares')
+    prices = _matrix(df, 'avg_buy_price').reindex_like(shares)
+    symbols = shares.columns
+    periods = list(shares.index)
+
+    held = shares.fillna(0).to_numpy()
+    px = prices.fillna(0).to_numpy()
+
+    if seed is not None and not seed.empty:
+        seed = seed.groupby('symbol').agg({'shares': 'sum', 'first_added': 'first', 'estimated_entry_price': 'first'})
+        seed = seed.reindex(symbols.union(seed.index))
+        symbols = seed.index
+        shares = shares.reindex(columns=symbols)
+        held = shares.fillna(0).to_numpy()
+        px = prices.reindex(columns=symbols).fillna(0).to_numpy()
+        prev_shares = seed['shares'].fillna(0).to_numpy()
+        cost = prev_shares * seed['estimated_entry_price'].fillna(0).to_numpy()
+        first = seed['first_added'].where(prev_shares > 0).to_numpy(dtype=object)
+    else:
+        prev_shares = np.zeros(len(symbols))
+        cost = np.zeros(len(symbols))
+        first = np.full(len(symbols), None, dtype=object)
+
+    n_periods, n_symbols = held.shape
+    change = np.full(held.shape, np.nan)
+    entry = np.full(held.shape, np.nan)
+    first_added = np.full(held.shape, None, dtype=object)
+    new_count = exited_count = 0
+
+    # Walk periods in order; each step is vectorized across every symbol
+    for t in range(n_periods):
+        cur = held[t]
+        holding = cur > 0
+        had = prev_shares > 0
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change[t] = np.where(had & holding, (cur - prev_shares) / prev_shares * 100, np.nan)
+            # Average cost: buys add at this quarter's price, sells keep the average
+            added = np.clip(cur - prev_shares, 0, None)
+            cost = np.where(holding, np.where(cur >= prev_shares, cost + added * px[t],
+                                              cost * cur / np.where(had, prev_shares, 1)), 0)
+            entry[t] = np.where(holding, cost / np.where(holding, cur, 1), np.nan)
+
+        opened = holding & ~had
+        first = np.where(opened, periods[t], np.where(holding, first, None))
+        first_added[t] = first
+        new_count += int(opened.sum())
+        exited_count += int((had & ~holding).sum())
+        prev_shares = cur
+
+    rows = []
+    ti, si = np.nonzero(held > 0)
+    for t, s in zip(ti, si):
+        rows.append({
+            "symbol": symbols[s],
+            "report_period": periods[t],
+            "change_from_prev": None if np.isnan(change[t, s]) else round(float(change[t, s]), 4),
+            "first_added": first_added[t, s],
+            "estimated_entry_price": None if np.isnan(entry[t, s]) else round(float(entry[t, s]), 4),
+        })
+    return {'rows': rows, 'new': new_count, 'exited': exited_count, 'periods': n_periods}
+
+
+def write_position_diffs(supabase, fund_id: str, rows: List[Dict], chunk_size: int = WRITE_CHUNK) -> int:
+    """Bulk upsert the diff columns on (fund_id, symbol, report_period). Returns rows written."""
+    written = 0
+    for i in range(0, len(rows), chunk_size):
+        chunk = [dict(r, fund_id=fund_id) for r in rows[i:i + chunk_size]]
+        try:
+            supabase.table("fund_holdings") \
+                .upsert(chunk, on_conflict="fund_id, symbol, report_period") \
+                .execute()
+            written += len(chunk)
+        except Exception as e:
+            print(f"   ⚠️ Diff write failed ({len(chunk)} rows): {e}")
+    return written
+
+
+def _latest_periods(supabase, fund_id: str) -> List[str]:
+    """The fund's two newest stored report periods, oldest first (one index probe each)."""
+    periods = []
+    for _ in range(2):
+        query = supabase.table("fund_holdings").select("report_period").eq("fund_id", fund_id)
+        if periods:
+            query = query.lt("report_period", periods[0])
+        res = query.order("report_period", desc=True).limit(1).execute()
+        if not res.data:
+            break
+        periods.insert(0, res.data[0]['report_period'])
+    return periods
+
+
+def update_fund_diffs(supabase, fund_id: str, changed_periods: Optional[Iterable[str]] = None,
+                      label: str = "") -> Dict:
+    """
+    Refresh change_from_prev / first_added / estimated_entry_price for a fund.
+
+    If the only changed period is the fund's newest one and the period before
+    it already has diff state, only the newest quarter is recomputed (two
+    periods loaded). Anything else - backfills, gaps, first run - recomputes
+    the whole history in one pass.
+    """
+    start = time.time()
+    changed = sorted(set(changed_periods or []))
+    mode = 'full'
+    seed = None
+
+    if len(changed) == 1:
+        recent = _latest_periods(supabase, fund_id)
+        if len(recent) == 2 and recent[-1] == changed[0]:
+            prev = load_fund_history(supabase, fund_id, periods=[recent[-2]])
+            if not prev.empty and prev['first_added'].notna().all():
+                seed = prev
+                mode = 'incremental'
+
+    df = load_fund_history(supabase, fund_id, periods=changed if mode == 'incremental' else None)
+    result = compute_position_diffs(df, seed=seed)
+    written = write_position_diffs(supabase, fund_id, result['rows'])
+
+    elapsed = time.time() - start
+    print(f"   🔁 {label}Position diffs ({mode}): {result['periods']} periods, {written} rows, "
+          f"{result['new']} new, {result['exited']} exited in {elapsed:.2f}s")
+    return dict(result, mode=mode, written=written, elapsed=elapsed, rows=None)
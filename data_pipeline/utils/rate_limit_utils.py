@@ -0,0 +1,48 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    In any 1 second window at most `rate + capacity` calls can pass.
+
+    :param rate: Sustained requests per second.
+    :param capacity: Maximum burst size.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1) -> float:
+        """Block until `tokens` are available. Returns the time spent waiting (seconds)."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+
+                wait = (tokens - self._tokens) / self.rate
+
+            time.sleep(wait)
+            waited += wait
+
+
+# SEC fair-access policy is 10 req/s per client.
+# 8/s sustained + burst of 2 keeps every 1s window at or below 10.
+SEC_RATE_LIMITER = TokenBucket(rate=8, capacity=2)
+
+# Yahoo has no published limit; full-book runs search thousands of CUSIPs,
+# so keep the autocomplete endpoint at a steady pace to avoid bans.
+YAHOO_RATE_LIMITER = TokenBucket(rate=5, capacity=5)
@@ -0,0 +1,238 @@
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+from datetime import datetime
+from typing import Dict, List, Set
+
+# Fixed-name entry point (revalidated on every load); everything it points to
+# is content-hashed under data/ and can be cached forever.
+MANIFEST_NAME = 'stock_manifest.json'
+OWNERSHIP_MANIFEST_NAME = 'ownership_manifest.json'
+DATA_DIR = 'data'
+
+# data/ folders owned by each manifest ('' = files directly in data/); a
+# publish only prunes its own folders
+STOCK_FOLDERS = ('', 'stocks', 'stock_buckets')
+OWNERSHIP_FOLDERS = ('ownership',)
+
+# Fields the list views need, stored column-wise (one array per field)
+INDEX_COLUMNS = ('symbol', 'name', 'sector', 'market_cap', 'price', 'changes_percentage', 'div_yield', 'dcf')
+
+# Symbols per detail bucket (symbol -> detail file lookups for the detail page)
+BUCKET_TARGET = 256
+
+SAFE_NAME_RE = re.compile(r'[^A-Za-z0-9._-]')
+
+
+def fnv1a_32(text: str) -> int:
+    """32-bit FNV-1a over UTF-8 bytes; lib/stock-data.ts computes the same bucket."""
+    h = 0x811c9dc5
+    for b in text.encode('utf-8'):
+        h = ((h ^ b) * 0x01000193) & 0xffffffff
+    return h
+
+
+def minify(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _write_bytes_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_hashed(public_dir: str, subdir: str, stem: str, data: bytes, stats: Dict) -> str:
+    """
+    Write `data` as <subdir>/<stem>.<hash>.json.
+    Content-addressed: an existing file with the same hash is left alone.
+    Returns the public path (relative to public_dir, '/'-separated).
+    """
+    folder = f"{DATA_DIR}/{subdir}" if subdir else DATA_DIR
+    rel = f"{folder}/{SAFE_NAME_RE.sub('_', stem)}.{content_hash(data)}.json"
+    path = os.path.join(public_dir, *rel.split('/'))
+    if os.path.exists(path):
+        stats['reused'] += 1
+        return rel
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write_bytes_atomic(path, data)
+    stats['written'] += 1
+    return rel
+
+
+def _round(value, digits):
+    return round(value, digits) if isinstance(value, float) else value
+
+
+def build_index(records: List[Dict]) -> Dict:
+    """Columnar index: {'columns': [...], 'data': {column: [values...]}} sorted by market cap."""
+    rows = sorted(records, key=lambda r: r.get('market_cap') or 0, reverse=True)
+    data = {c: [] for c in INDEX_COLUMNS}
+    for r in rows:
+        vm = r.get('valuation_metrics') or {}
+        data['symbol'].append(r['symbol'])
+        data['name'].append(r.get('name'))
+        data['sector'].append(r.get('sector'))
+        data['market_cap'].append(r.get('market_cap'))
+        data['price'].append(_round(r.get('price'), 4))
+        data['changes_percentage'].append(_round(r.get('changes_percentage'), 3))
+        data['div_yield'].append(_round(vm.get('div_yield_ttm'), 4))
+        data['dcf'].append(_round(vm.get('dcf'), 4))
+    return {'columns': list(INDEX_COLUMNS), 'count': len(rows), 'data': data}
+
+
+def bucket_count(n: int) -> int:
+    """Power of two keeping buckets at or below BUCKET_TARGET symbols."""
+    return 1 << max(0, math.ceil(math.log2(max(1, math.ceil(n / BUCKET_TARGET)))))
+
+
+def _referenced(public_dir: str, manifest: Dict) -> Set[str]:
+    """Every data/ file a manifest points at (index, buckets, details)."""
+    refs = {manifest.get('index')}
+    for rel in manifest.get('buckets', []):
+        refs.add(rel)
+        try:
+            with open(os.path.join(public_dir, *rel.split('/')), 'r', encoding='utf-8') as f:
+                refs.update(json.load(f).values())
+        except (OSError, ValueError):
+            pass
+    return {r for r in refs if r}
+
+
+def _prune(public_dir: str, keep: Set[str], folders=STOCK_FOLDERS) -> int:
+    removed = 0
+    for folder in folders:
+        rel_dir = f"{DATA_DIR}/{folder}" if folder else DATA_DIR
+        root = os.path.join(public_dir, *rel_dir.split('/'))
+        if not os.path.isdir(root):
+            continue
+        for name in os.listdir(root):
+            full = os.path.join(root, name)
+            # Also clears .gz/.br siblings left by older pipeline versions
+            if os.path.isfile(full) and f"{rel_dir}/{name}" not in keep:
+                os.remove(full)
+                removed += 1
+    return removed
+
+
+def load_manifest(public_dir: str, name: str = MANIFEST_NAME) -> Dict:
+    """The published manifest, or {} if it is missing or unreadable."""
+    try:
+        with open(os.path.join(public_dir, name), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def source_hash(records: List[Dict]) -> str:
+    """Hash of the records a manifest was built from."""
+    return content_hash(minify(records))
+
+
+def artifacts_current(records: List[Dict], public_dir: str) -> bool:
+    """
+    True if the manifest was built from exactly `records` and the index and
+    bucket files it points at exist. False after a failed or missing export.
+    """
+    manifest = load_manifest(public_dir)
+    if not manifest.get('index') or manifest.get('source') != source_hash(records):
+        return False
+    return all(os.path.exists(os.path.join(public_dir, *rel.split('/')))
+               for rel in [manifest['index'], *manifest.get('buckets', [])])
+
+
+def publish_static_artifacts(records: List[Dict], public_dir: str) -> Dict:
+    """
+    Emit the web app's stock artifacts:
+
+    * data/stock_index.<hash>.json - columnar list-view fields for every symbol
+    * data/stocks/<SYMBOL>.<hash>.json - one full record per symbol
+    * data/stock_buckets/<n>.<hash>.json - symbol -> detail path, bucketed by FNV-1a
+    * stock_manifest.json - points at the above; written last, atomically
+
+    All files are minified; response compression is left to the host
+    (Next.js / the CDN). Files from the previous manifest are kept for
+    clients that loaded it just before the swap; older generations are pruned.
+    """
+    stats = {'written': 0, 'reused': 0}
+    manifest_path = os.path.join(public_dir, MANIFEST_NAME)
+    previous = load_manifest(public_dir)
+
+    index_bytes = minify(build_index(records))
+    index_rel = write_hashed(public_dir, '', 'stock_index', index_bytes, stats)
+
+    n_buckets = bucket_count(len(records))
+    buckets = [{} for _ in range(n_buckets)]
+    for r in records:
+        rel = write_hashed(public_dir, 'stocks', r['symbol'], minify(r), stats)
+        buckets[fnv1a_32(r['symbol']) % n_buckets][r['symbol']] = rel
+    bucket_rels = [write_hashed(public_dir, 'stock_buckets', str(i), minify(b), stats) for i, b in enumerate(buckets)]
+
+    manifest = {
+        'version': 1,
+        'generated_at': datetime.utcnow().isoformat(),
+        'source': source_hash(records),
+        'count': len(records),
+        'index': index_rel,
+        'buckets': bucket_rels
+    }
+    _write_bytes_atomic(manifest_path, minify(manifest))
+
+    removed = _prune(public_dir, _referenced(public_dir, manifest) | _referenced(public_dir, previous))
+    return dict(stats, removed=removed, buckets=n_buckets, index_bytes=len(index_bytes),
+                index_gzip_bytes=len(gzip.compress(index_bytes, compresslevel=9, mtime=0)))
+
+
+def publish_ownership_artifacts(funds: Dict[str, str], periods: List[str],
+                                symbols: Dict[str, List[List]], public_dir: str) -> Dict:
+    """
+    Emit the stock page's 13F holder data, bucketed like the detail lookups:
+
+    * data/ownership/<n>.<hash>.json - {"funds": [[id, name], ...],
+      "symbols": {"KO": [[fund_idx, period_idx, shares, value, weight], ...]}}
+      for the symbols in FNV-1a bucket n (fund_idx indexes that file's funds)
+    * ownership_manifest.json - {"periods": [...], "buckets": [...]}
+
+    `symbols` rows are [fund_id, period_idx, shares, value, weight]. A page
+    fetches the manifest and one bucket instead of every symbol's holders.
+    """
+    stats = {'written': 0, 'reused': 0}
+    manifest_path = os.path.join(public_dir, OWNERSHIP_MANIFEST_NAME)
+    previous = load_manifest(public_dir, OWNERSHIP_MANIFEST_NAME)
+
+    n_buckets = bucket_count(len(symbols))
+    buckets = [{'funds': [], 'symbols': {}} for _ in range(n_buckets)]
+    fund_slots = [{} for _ in range(n_buckets)]
+    for symbol in sorted(symbols):
+        n = fnv1a_32(symbol) % n_buckets
+        slots = fund_slots[n]
+        rows = []
+        for fund_id, *rest in symbols[symbol]:
+            if fund_id not in slots:
+                slots[fund_id] = len(slots)
+                buckets[n]['funds'].append([fund_id, funds.get(fund_id)])
+            rows.append([slots[fund_id], *rest])
+        buckets[n]['symbols'][symbol] = rows
+    bucket_rels = [write_hashed(public_dir, 'ownership', str(i), minify(b), stats) for i, b in enumerate(buckets)]
+
+    manifest = {
+        'version': 1,
+        'generated_at': datetime.utcnow().isoformat(),
+        'periods': periods,
+        'symbols': len(symbols),
+        'buckets': bucket_rels
+    }
+    _write_bytes_atomic(manifest_path, minify(manifest))
+
+    keep = set(bucket_rels) | set(previous.get('buckets', []))
+    removed = _prune(public_dir, keep, OWNERSHIP_FOLDERS)
+    return dict(stats, removed=removed, buckets=n_buckets)
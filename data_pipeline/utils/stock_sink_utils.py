@@ -0,0 +1,132 @@
+import hashlib
+import json
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# stock_data columns written by the sink (anything else in a record is dropped)
+STOCK_DATA_COLUMNS = ('symbol', 'name', 'sector', 'industry', 'market_cap', 'price',
+                      'changes_percentage', 'financials', 'valuation_metrics', 'updated_at')
+
+# Bulk write RPC (database/migrations/20261018_stock_data_merge_upsert.sql).
+# valuation_metrics is merged into the stored jsonb rather than replaced, so
+# keys written by enrich_stock_analysis.py (ai_analysis, pe_ratio,
+# dividend_yield, dps) survive every sink run.
+UPSERT_RPC = 'upsert_stock_data'
+ENRICHMENT_KEYS = ('ai_analysis', 'pe_ratio', 'dividend_yield', 'dps')
+
+# Fields that change on every fetch without the data changing
+VOLATILE_FIELDS = ('updated_at', 'content_hash')
+
+UPSERT_CHUNK = 1000
+# Symbols per content_hash lookup (keeps the in.(...) filter URL short)
+LOOKUP_BATCH = 200
+
+
+def _normalize(value):
+    if isinstance(value, float):
+        # Float jitter below 4 decimals is not a change; NaN/inf are not valid JSON
+        return round(value, 4) if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def normalize_record(record: Dict) -> Dict:
+    return {k: _normalize(v) for k, v in record.items() if k not in VOLATILE_FIELDS}
+
+
+def record_hash(record: Optional[Dict]) -> Optional[str]:
+    """
+    Stable hash of a record's normalized content (key order and volatile
+    fields ignored). Covers only what the collector writes; enrichment keys
+    merged into valuation_metrics server-side are not part of it.
+    """
+    if not record:
+        return None
+    canonical = json.dumps(normalize_record(record), sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def split_changed(records: Iterable[Dict], published: Dict[str, Optional[str]]) -> Tuple[List[Dict], List[Dict]]:
+    """(changed, unchanged) against `published` symbol -> last published hash."""
+    changed, unchanged = [], []
+    for r in records:
+        (unchanged if published.get(r['symbol']) == record_hash(r) else changed).append(r)
+    return changed, unchanged
+
+
+def load_db_hashes(supabase, symbols: List[str]) -> Dict[str, Optional[str]]:
+    """symbol -> stored content_hash for `symbols` (missing rows are simply absent)."""
+    hashes = {}
+    for i in range(0, len(symbols), LOOKUP_BATCH):
+        batch = symbols[i:i + LOOKUP_BATCH]
+        res = supabase.table("stock_data").select("symbol, content_hash").in_("symbol", batch).execute()
+        hashes.update({r['symbol']: r.get('content_hash') for r in res.data or []})
+    return hashes
+
+
+def to_row(record: Dict) -> Dict:
+    row = {k: record.get(k) for k in STOCK_DATA_COLUMNS if k in record}
+    row['content_hash'] = record_hash(record)
+    return row
+
+
+def upsert_stock_data(supabase, records: List[Dict], chunk_size: int = UPSERT_CHUNK) -> int:
+    """
+    Bulk upsert records (with their content_hash) on symbol through the
+    merge RPC: plain columns are replaced, valuation_metrics keys are merged
+    into the stored ones. Returns rows written.
+    """
+    rows = [to_row(r) for r in records]
+    written = 0
+    for i in range(0, len(rows), chunk_size):
+        chunk = rows[i:i + chunk_size]
+        try:
+            supabase.rpc(UPSERT_RPC, {"p_rows": chunk}).execute()
+            written += len(chunk)
+        except Exception as e:
+            print(f"   ⚠️ stock_data upsert failed ({len(chunk)} rows): {e}")
+    return written
+
+
+def check_enrichment_survives(supabase, symbol: Optional[str] = None) -> bool:
+    """
+    Round-trip check for the merge: re-sink one enriched row as the collector
+    would (its own columns, valuation_metrics without the enrichment keys)
+    and confirm ai_analysis is still stored afterwards. The row's content is
+    unchanged when the merge works; if it doesn't, the original is restored.
+    """
+    query = supabase.table("stock_data").select("*").not_.is_("valuation_metrics->>ai_analysis", "null")
+    if symbol:
+        query = query.eq("symbol", symbol)
+    found = query.limit(1).execute().data
+    if not found:
+        print("   ⚠️ No enriched stock_data row (valuation_metrics.ai_analysis) to check against.")
+        return False
+
+    original = found[0]
+    record = {k: original.get(k) for k in STOCK_DATA_COLUMNS}
+    record['valuation_metrics'] = {k: v for k, v in (original.get('valuation_metrics') or {}).items()
+                                   if k not in ENRICHMENT_KEYS}
+    upsert_stock_data(supabase, [record])
+
+    after = supabase.table("stock_data").select("valuation_metrics").eq("symbol", original['symbol']).execute().data
+    metrics = (after[0].get('valuation_metrics') or {}) if after else {}
+    if metrics.get('ai_analysis') == original['valuation_metrics'].get('ai_analysis'):
+        print(f"   ✅ {original['symbol']}: ai_analysis survived a sink write.")
+        return True
+
+    print(f"   ❌ {original['symbol']}: sink write dropped ai_analysis; restoring the original row.")
+    supabase.table("stock_data").update({'valuation_metrics': original['valuation_metrics']}) \
+        .eq("symbol", original['symbol']).execute()
+    return False
+
+
+def sink_to_db(supabase, records: List[Dict]) -> Dict:
+    """Write only records whose hash differs from stock_data.content_hash."""
+    changed, unchanged = split_changed(records, load_db_hashes(supabase, [r['symbol'] for r in records]))
+    written = upsert_stock_data(supabase, changed) if changed else 0
+    return {'changed': len(changed), 'skipped': len(unchanged), 'written': written}
@@ -1,31 +1,88 @@
 import requests
 import xml.etree.ElementTree as ET
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator
 from sec_edgar_api import EdgarClient
 import re
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from utils.rate_limit_utils import SEC_RATE_LIMITER
+from utils import http_cache_utils, http_client_utils, infotable_utils, value_unit_utils
 
 # Initialize EdgarClient with compliant User-Agent
 client = EdgarClient(user_agent="MBLB Stock Analysis <ysk144@example.com>")
 
-# Use the EXACT same UA for reliable requests, but 'Host' differs for archives
+# Use the EXACT same UA for reliable requests.
+# No 'Host' header: requests derives it per URL (www.sec.gov archives vs data.sec.gov JSON)
 SEC_HEADERS = {
     'User-Agent': 'MBLB Stock Analysis <ysk144@example.com>',
     'Accept-Encoding': 'gzip, deflate',
-    'Host': 'www.sec.gov' # Archives are on www.sec.gov, not data.sec.gov
 }
 
+# Registered per host on the shared pooled client, so SEC headers never leak to other hosts
+http = http_client_utils.get_client()
+for _sec_host in ('www.sec.gov', 'data.sec.gov'):
+    http.set_host_headers(_sec_host, SEC_HEADERS)
+
 import time
 
-def request_with_retry(url, retries=5, backoff=2):
-    """Fetch URL with retry logic for 429 rate limits."""
+
+class SecFetchError(Exception):
+    """A SEC document could not be fetched (HTTP error, exhausted retries, transport failure).
+
+    Distinct from a document that was fetched and holds zero rows, so callers
+    can leave the filing retryable instead of recording it as empty.
+    """
+
+
+def _cached_response(url: str, content: bytes) -> requests.Response:
+    """Build a Response object from a cached body so callers can't tell the difference."""
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.url = url
+    resp.encoding = 'utf-8'
+    resp._content = content
+    return resp
+
+def request_with_retry(url, retries=5, backoff=2, revalidate=False):
+    """
+    Fetch URL with retry logic for 429 rate limits.
+    Archive documents are served from the on-disk cache forever once fetched.
+    With revalidate=True (mutable documents) a cached copy is reused only after
+    the server answers 304 to a conditional request.
+    """
+    cache = http_cache_utils.get_cache()
+    immutable = http_cache_utils.is_immutable_url(url)
+    cached = cache.get(url) if (immutable or revalidate) else None
+
+    if cached and immutable:
+        return _cached_response(url, cached['content'])
+
+    headers = {}
+    if cached:
+        if cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+
     for i in range(retries):
         try:
-            resp = requests.get(url, headers=get_sec_headers(), timeout=15)
+            # Shared across threads: keeps all SEC traffic under the fair-access limit
+            SEC_RATE_LIMITER.acquire()
+            resp = http.get(url, headers=headers, timeout=15)
             if resp.status_code == 429:
                 sleep_time = backoff * (i + 1)
                 print(f"   ⏳ 429 Rate Limit. Sleeping {sleep_time}s...")
                 time.sleep(sleep_time)
                 continue
+            if resp.status_code == 304 and cached:
+                cache.revalidated += 1
+                return _cached_response(url, cached['content'])
+            if resp.status_code == 200 and (immutable or revalidate):
+                cache.put(url, resp.content,
+                          etag=resp.headers.get('ETag'),
+                          last_modified=resp.headers.get('Last-Modified'),
+                          immutable=immutable)
             return resp
         except Exception as e:
             print(f"   ⚠️ Request Error: {e}")
@@ -38,8 +95,21 @@ def get_sec_headers() -> Dict[str, str]:
 
 
 def get_company_filings(cik: str) -> dict:
-    """Fetch recent submissions for a company/fund using sec-edgar-api."""
+    """
+    Fetch submissions for a company/fund.
+    The submissions JSON is mutable, so it is revalidated (ETag / Last-Modified)
+    against the cached copy on every call; sec-edgar-api is kept as a fallback.
+    """
+    url = f"https://data.sec.gov/submissions/CIK{int(cik):010d}.json"
+    resp = request_with_retry(url, revalidate=True)
+    if resp is not None and resp.status_code == 200:
+        try:
+            return resp.json()
+        except ValueError as e:
+            print(f"⚠️ Bad submissions JSON for CIK {cik}: {e}")
+
     try:
+        SEC_RATE_LIMITER.acquire()
         submissions = client.get_submissions(cik=cik)
         return submissions
     except Exception as e:
@@ -133,120 +203,233 @@ def _find_xml_url(cik: str, accession_number: str, primary_doc: str) -> Optional
     
     # 1. Try index.html
     index_url = f"{base_url}/{accession_number}-index.html"
-    try:
-        resp = request_with_retry(index_url)
-        if resp and resp.status_code == 200:
+    resp = request_with_retry(index_url)
+    if resp is None or resp.status_code != 200:
+        # Guessing infotable.xml here would turn an outage into a bogus "empty" filing
+        raise SecFetchError(f"index fetch failed ({resp.status_code if resp is not None else 'no response'}): {index_url}")
 
-            xml_files = re.findall(r'href=["\']([^"\']+\.xml)["\']', resp.text, re.IGNORECASE)
-            
-            for xml_file in xml_files:
-                full_xml_url = f"https://www.sec.gov{xml_file}" if xml_file.startswith('/') else f"{base_url}/{xml_file}"
-                
-                # Exclude XSL/HTML
-                if 'xsl' in xml_file.lower() or 'html' in xml_file.lower():
-                    continue
-
-                if 'table' in xml_file.lower() or 'info' in xml_file.lower():
-                    return full_xml_url
-            
-            # Fallback
-            for xml_file in xml_files:
-                if 'primary_doc' not in xml_file.lower() and 'xsl' not in xml_file.lower():
-                     return f"https://www.sec.gov{xml_file}" if xml_file.startswith('/') else f"{base_url}/{xml_file}"
-    except:
-        pass
-
-    # 2. Fallbacks
+    xml_files = re.findall(r'href=["\']([^"\']+\.xml)["\']', resp.text, re.IGNORECASE)
+
+    for xml_file in xml_files:
+        full_xml_url = f"https://www.sec.gov{xml_file}" if xml_file.startswith('/') else f"{base_url}/{xml_file}"
+
+        # Exclude XSL/HTML
+        if 'xsl' in xml_file.lower() or 'html' in xml_file.lower():
+            continue
+
+        if 'table' in xml_file.lower() or 'info' in xml_file.lower():
+            return full_xml_url
+
+    # Fallback
+    for xml_file in xml_files:
+        if 'primary_doc' not in xml_file.lower() and 'xsl' not in xml_file.lower():
+             return f"https://www.sec.gov{xml_file}" if xml_file.startswith('/') else f"{base_url}/{xml_file}"
+
+    # 2. Fallbacks (index listed no table document)
     if primary_doc.endswith('.xml') and ('table' in primary_doc.lower()):
          return f"{base_url}/{primary_doc}"
     return f"{base_url}/infotable.xml"
 
-def get_all_13f_xml_urls(cik: str) -> List[tuple]:
-    """Find ALL 13F-HR XML URLs for historical backfill. Returns list of (report_date, xml_url)."""
+def get_13f_schema_version(cik: str, filing: Dict) -> Optional[str]:
+    """
+    <schemaVersion> of a filing's cover page (primary_doc.xml).
+    submissions lists the XSL-rendered path (xslForm13F_X02/primary_doc.xml);
+    the raw XML sits at the accession root. Archive URLs are cached forever.
+    """
+    doc = (filing.get('primary_doc') or 'primary_doc.xml').rsplit('/', 1)[-1]
+    if not doc.lower().endswith('.xml'):
+        return None
+    url = f"https://www.sec.gov/Archives/edgar/data/{int(cik)}/{filing['accession'].replace('-', '')}/{doc}"
+    resp = request_with_retry(url)
+    if resp is None or resp.status_code != 200:
+        return None
+    return value_unit_utils.parse_schema_version(resp.content)
+
+SUBMISSIONS_BASE = "https://data.sec.gov/submissions/"
+
+def _filing_rows(block: Dict, form: str = '13F-HR') -> List[Dict]:
+    """Rows of one columnar submissions block (`filings.recent` or a `filings.files` page)."""
+    rows = []
+    report_dates = block.get('reportDate', [])
+    for i, form_type in enumerate(block.get('form', [])):
+        if form_type == form:
+            report_date = report_dates[i] if i < len(report_dates) else None
+            if not report_date:
+                report_date = block['filingDate'][i] # Fallback
+            rows.append({
+                'accession': block['accessionNumber'][i],
+                'primary_doc': block['primaryDocument'][i],
+                'report_date': report_date,
+                'filing_date': block['filingDate'][i],
+            })
+    return rows
+
+def _fetch_submission_page(name: str) -> Dict:
+    resp = request_with_retry(SUBMISSIONS_BASE + name, revalidate=True)
+    if resp is None or resp.status_code != 200:
+        raise RuntimeError(f"submissions page {name} unavailable")
+    return resp.json()
+
+def _submissions_fingerprint(filings: Dict) -> str:
+    """Changes whenever the `recent` block or the list of archive pages changes."""
+    recent = filings.get('recent', {})
+    key = {
+        'recent': recent.get('accessionNumber', []),
+        'files': [f.get('name') for f in filings.get('files', [])],
+    }
+    return hashlib.sha256(json.dumps(key).encode('utf-8')).hexdigest()
+
+def list_13f_filings(cik: str, max_workers: int = 4) -> List[Dict]:
+    """
+    List 13F-HR filings from the submissions JSON only (no per-filing HTTP).
+    Returns newest-first dicts: accession, primary_doc, report_date, filing_date.
+
+    `filings.recent` only holds the latest ~1000 filings of any form; older
+    ones live in the `filings.files` pages, which are fetched concurrently and
+    merged. The merged list is cached per CIK and rebuilt only when the
+    submissions fingerprint (recent accessions + page names) changes.
+    """
     data = get_company_filings(cik)
     if not data or 'filings' not in data:
         return []
-    
-    recent = data['filings']['recent']
-    results = []
-    
-    # Iterate all filings
-    for i, form_type in enumerate(recent.get('form', [])):
-        if form_type == '13F-HR':
-            accession = recent['accessionNumber'][i]
-            primary_doc = recent['primaryDocument'][i]
-            report_date = recent['reportDate'][i] # YYYY-MM-DD
-            if not report_date:
-                report_date = recent['filingDate'][i] # Fallback
-            
-            print(f"   PLEASE WAIT... Analyzing history: {report_date}")
-            xml_url = _find_xml_url(cik, accession, primary_doc)
-            if xml_url:
-                results.append((report_date, xml_url))
-                
-    return results
-
-def parse_13f_infotable(xml_url: str) -> List[Dict]:
-    """Parse the 13F Information Table XML."""
-    print(f"📥 Fetching XML from: {xml_url}")
-    
+
+    filings_json = data['filings']
+    pages = [f['name'] for f in filings_json.get('files', []) if f.get('name')]
+    if not pages:
+        return _filing_rows(filings_json.get('recent', {}))
+
+    cache = http_cache_utils.get_cache()
+    cache_key = f"{SUBMISSIONS_BASE}CIK{int(cik):010d}.13f-merged.json"
+    fingerprint = _submissions_fingerprint(filings_json)
+    cached = cache.get(cache_key)
+    if cached and cached['etag'] == fingerprint:
+        return json.loads(cached['content'])
+
+    rows = _filing_rows(filings_json.get('recent', {}))
     try:
-        response = request_with_retry(xml_url)
-        
-        if response.status_code != 200:
-            print(f"❌ Error fetching XML: {response.status_code}")
-            return []
-            
-        root = ET.fromstring(response.content)
-        
-        def strip_ns(tag):
-             if '}' in tag: return tag.split('}', 1)[1]
-             return tag
-            
-        holdings = []
-        count = 0
-        
-        # Determine if we have <informationTable> root or if it's the 13F-HR main form
-        # The Info Table XML usually has root like <informationTable ...>
-        # Check root tag
-        
-        items_to_iter = root
-        # If root is 'edgarSubmission', we are in the wrong file (main form).
-        # If root is 'informationTable', we iterate children.
-        
-        # But wait, sometimes we get <xml>...<informationTable>...</xml>?
-        # No, usually standard XML.
-        
-        for info in items_to_iter:
-            tag_name = strip_ns(info.tag)
-            # We look for 'infoTable' nodes
-            if 'infoTable' not in tag_name and 'InfoTable' not in tag_name:
-                 continue
-                 
-            holding = {}
-            for child in info:
-                tag = strip_ns(child.tag)
-                text = child.text if child.text else ""
-                
-                if tag == 'nameOfIssuer': holding['name'] = text
-                elif tag == 'cusip': holding['cusip'] = text
-                elif tag == 'value':
-                    try: holding['value'] = float(text) * 1000 
-                    except: holding['value'] = 0
-                elif tag == 'shrsOrPrnAmt':
-                    for sub in child:
-                         if strip_ns(sub.tag) == 'sshPrnamt':
-                            try: holding['shares'] = float(sub.text)
-                            except: holding['shares'] = 0
-
-            if 'name' in holding:
-                holding['symbol'] = None
-                holdings.append(holding)
-                count += 1
-                
-        print(f"✅ Parsed {count} holdings from XML.")
-        return holdings
-        
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for page in pool.map(_fetch_submission_page, pages):
+                rows.extend(_filing_rows(page))
     except Exception as e:
-        print(f"❌ Error parsing XML: {e}")
-        return []
+        # Don't cache a partial history; the next run retries the pages
+        print(f"   ⚠️ Archive submissions pages failed for CIK {cik} (recent filings only): {e}")
+        return _filing_rows(filings_json.get('recent', {}))
+
+    # Pages can overlap the recent block when it rolls over; keep one row per accession
+    merged = {}
+    for row in rows:
+        merged.setdefault(row['accession'], row)
+    filings = sorted(merged.values(), key=lambda f: (f['filing_date'], f['accession']), reverse=True)
+
+    print(f"   📚 CIK {cik}: {len(filings)} 13F-HR filings across recent + {len(pages)} archive pages")
+    cache.put(cache_key, json.dumps(filings).encode('utf-8'), etag=fingerprint, immutable=False)
+    return filings
+
+def find_13f_xml_url(cik: str, filing: Dict) -> Optional[str]:
+    """Resolve the INFOTABLE XML URL for one entry of list_13f_filings(). Raises SecFetchError."""
+    return _find_xml_url(cik, filing['accession'], filing['primary_doc'])
+
+def get_all_13f_xml_urls(cik: str, max_workers: int = 4) -> List[tuple]:
+    """Find ALL 13F-HR XML URLs for historical backfill. Returns list of (report_date, xml_url)."""
+    filings = list_13f_filings(cik)
+
+    print(f"   PLEASE WAIT... Analyzing history: {len(filings)} filings")
+
+    def lookup(filing):
+        try:
+            return find_13f_xml_url(cik, filing)
+        except SecFetchError as e:
+            print(f"   ⚠️ {filing['report_date']}: {e}")
+            return None
+
+    # Index lookups are independent; pool.map keeps the newest-first order
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        xml_urls = list(pool.map(lookup, filings))
+
+    return [(f['report_date'], xml_url) for f, xml_url in zip(filings, xml_urls) if xml_url]
+
+def stream_sec_document(url: str, chunk_size: int = 64 * 1024, retries: int = 5, backoff: int = 2) -> Iterator[bytes]:
+    """
+    Yield a SEC document chunk by chunk without buffering the whole body.
+    Archive documents come from the on-disk cache when present; otherwise the
+    streamed bytes are written through to the cache as they arrive.
+    Raises SecFetchError on a non-200 answer or once retries are exhausted;
+    errors mid-body propagate unchanged.
+    """
+    cache = http_cache_utils.get_cache()
+    immutable = http_cache_utils.is_immutable_url(url)
+
+    cached = cache.open(url) if immutable else None
+    if cached:
+        with cached:
+            while True:
+                chunk = cached.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    last_error = None
+    for i in range(retries):
+        try:
+            SEC_RATE_LIMITER.acquire()
+            resp = http.get(url, timeout=15, stream=True)
+        except Exception as e:
+            last_error = e
+            print(f"   ⚠️ Request Error: {e}")
+            if i < retries - 1:
+                time.sleep(backoff)
+            continue
+
+        with resp:
+            if resp.status_code == 429:
+                sleep_time = backoff * (i + 1)
+                print(f"   ⏳ 429 Rate Limit. Sleeping {sleep_time}s...")
+                time.sleep(sleep_time)
+                last_error = "429 Rate Limit"
+                continue
+            if resp.status_code != 200:
+                raise SecFetchError(f"HTTP {resp.status_code}: {url}")
+
+            writer = cache.writer(url) if immutable else None
+            try:
+                for chunk in resp.iter_content(chunk_size=chunk_size):
+                    if writer:
+                        writer.write(chunk)
+                    yield chunk
+            except BaseException:
+                # Includes GeneratorExit: a partially read body must never be cached
+                if writer:
+                    writer.abort()
+                raise
+            if writer:
+                writer.commit(etag=resp.headers.get('ETag'), last_modified=resp.headers.get('Last-Modified'))
+            return
+
+    raise SecFetchError(f"gave up after {retries} attempts ({last_error}): {url}")
+
+def iter_13f_infotable(xml_url: str, value_multiplier: float = 1000) -> Iterator[Dict]:
+    """
+    Stream holdings out of a 13F Information Table XML as the bytes arrive.
+    value_multiplier=1 yields the raw filed <value> (see value_unit_utils).
+    """
+    print(f"📥 Fetching XML from: {xml_url}")
+
+    count = 0
+    try:
+        for holding in infotable_utils.iter_infotable_holdings(stream_sec_document(xml_url), value_multiplier):
+            count += 1
+            yield holding
+    except ET.ParseError as e:
+        # A truncated/corrupt document must fail the filing, never yield a partial book
+        print(f"❌ Error parsing XML after {count} holdings: {e}")
+        raise
+
+    print(f"✅ Parsed {count} holdings from XML.")
+
+def parse_13f_infotable(xml_url: str, value_multiplier: float = 1000) -> List[Dict]:
+    """
+    Parse the 13F Information Table XML.
+    An empty list means the document was fetched and holds no rows; fetch
+    failures raise SecFetchError so they are never mistaken for that.
+    """
+    return list(iter_13f_infotable(xml_url, value_multiplier))
@@ -0,0 +1,51 @@
+import hashlib
+import os
+import zlib
+from typing import List, Tuple
+
+from utils.pagination_utils import TableIterator
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+UNIVERSE_FILE = os.path.join(script_dir, '..', 'universe', 'stock_universe.txt')
+
+
+def load_symbol_file(path: str = UNIVERSE_FILE) -> List[str]:
+    """Symbols from a plain-text universe file (one per line, '#' comments), deduped in file order."""
+    symbols = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            sym = line.split('#', 1)[0].strip().upper()
+            if sym and sym not in symbols:
+                symbols.append(sym)
+    return symbols
+
+
+def load_symbols_from_db(supabase) -> List[str]:
+    """Every symbol already in stock_data (keyset scan by primary key)."""
+    rows = TableIterator(supabase, "stock_data", "symbol", key_columns=("symbol",))
+    return [r['symbol'] for r in rows if r.get('symbol')]
+
+
+def universe_version(symbols: List[str]) -> str:
+    """Short content hash of the universe; shards built from different lists don't merge."""
+    return hashlib.sha1('\n'.join(sorted(symbols)).encode('utf-8')).hexdigest()[:12]
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """'i/N' -> (i, N) with 0 <= i < N."""
+    try:
+        index, count = (int(p) for p in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/N (e.g. 0/4), got {spec!r}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must be in [0, {count}), got {spec!r}")
+    return index, count
+
+
+def shard_of(symbol: str, count: int) -> int:
+    """Stable shard for a symbol (crc32, identical on every machine and Python run)."""
+    return zlib.crc32(symbol.encode('utf-8')) % count
+
+
+def select_shard(symbols: List[str], index: int, count: int) -> List[str]:
+    return [s for s in symbols if shard_of(s, count) == index]
@@ -0,0 +1,106 @@
+import math
+import re
+from typing import Callable, Dict, List, Optional
+
+# Amended Form 13F (SEC Release 34-95148): filings made on or after this date
+# report <value> rounded to the nearest dollar instead of in thousands.
+DOLLARS_CUTOVER = '2023-01-03'
+
+# Cover-page schema versions introduced with the amended form (X0202+)
+DOLLARS_MIN_SCHEMA = 'X0202'
+
+MULTIPLIERS = {'dollars': 1, 'thousands': 1000}
+
+# Price evidence: log10(implied price / market price) of the value-weighted median.
+# Dollars land near 0 (quarter-average vs quarter-end, split adjustments can push
+# it toward +1.5); thousands land near -3. The midpoint separates them.
+LOG_RATIO_BOUNDARY = -1.5
+
+# Positions needed before the price evidence is trusted on its own
+MIN_PRICED_POSITIONS = 5
+
+SCHEMA_VERSION_RE = re.compile(rb'<(?:\w+:)?schemaVersion>\s*([^<\s]+)\s*<', re.IGNORECASE)
+
+
+def parse_schema_version(cover_xml: bytes) -> Optional[str]:
+    """<schemaVersion> of a 13F cover page (primary_doc.xml), e.g. 'X0202'."""
+    match = SCHEMA_VERSION_RE.search(cover_xml or b'')
+    return match.group(1).decode('ascii', 'ignore').upper() if match else None
+
+
+def unit_from_filing(filing_date: Optional[str], schema_version: Optional[str]) -> Dict:
+    """Prior guess from the filing metadata alone."""
+    if schema_version:
+        unit = 'dollars' if schema_version >= DOLLARS_MIN_SCHEMA else 'thousands'
+        return {'unit': unit, 'confidence': 0.9, 'method': f'schema {schema_version}'}
+    if filing_date:
+        unit = 'dollars' if filing_date >= DOLLARS_CUTOVER else 'thousands'
+        # Late filers around the cutover can go either way
+        return {'unit': unit, 'confidence': 0.7, 'method': 'filing date'}
+    return {'unit': 'thousands', 'confidence': 0.3, 'method': 'default'}
+
+
+def implied_price_log_ratio(holdings: List[Dict], price_fn: Callable[[str], Optional[float]]) -> Optional[Dict]:
+    """
+    Value-weighted median of log10((raw value / shares) / market price) over
+    resolved holdings. `holdings` carry the raw filed <value>; `price_fn(symbol)`
+    returns a market price or None.
+    """
+    points = []
+    for h in holdings:
+        symbol, shares, value = h.get('symbol'), h.get('shares') or 0, h.get('value') or 0
+        if not symbol or shares <= 0 or value <= 0:
+            continue
+        price = price_fn(symbol)
+        if not price or price <= 0:
+            continue
+        points.append((math.log10(value / shares / price), value))
+
+    if len(points) < MIN_PRICED_POSITIONS:
+        return None
+
+    points.sort()
+    half = sum(w for _, w in points) / 2
+    running = 0
+    for log_ratio, weight in points:
+        running += weight
+        if running >= half:
+            return {'log_ratio': log_ratio, 'positions': len(points)}
+    return {'log_ratio': points[-1][0], 'positions': len(points)}
+
+
+def detect_value_unit(holdings: List[Dict], filing_date: Optional[str] = None,
+                      schema_version: Optional[str] = None,
+                      price_fn: Optional[Callable[[str], Optional[float]]] = None) -> Dict:
+    """
+    Decide whether a filing's raw <value> column is in dollars or thousands.
+
+    The filing metadata (schema version, else filing date) gives the prior;
+    the implied price per share checked against market prices confirms or
+    overrides it. Returns {'unit', 'multiplier', 'confidence', 'method', 'log_ratio'}.
+    """
+    result = unit_from_filing(filing_date, schema_version)
+    result['log_ratio'] = None
+
+    evidence = implied_price_log_ratio(holdings, price_fn) if price_fn else None
+    if evidence:
+        log_ratio = evidence['log_ratio']
+        price_unit = 'dollars' if log_ratio > LOG_RATIO_BOUNDARY else 'thousands'
+        # Distance from the boundary (1.5 = dead on the expected cluster)
+        strength = min(abs(log_ratio - LOG_RATIO_BOUNDARY) / 1.5, 1.0)
+        result['log_ratio'] = round(log_ratio, 3)
+
+        if price_unit == result['unit']:
+            result['confidence'] = round(1 - (1 - result['confidence']) * (1 - 0.9 * strength), 3)
+            result['method'] += ' + price'
+        elif strength >= 0.5:
+            # Prices are unambiguous: a mislabeled filing (common around the cutover)
+            result['unit'] = price_unit
+            result['confidence'] = round(0.6 + 0.3 * strength, 3)
+            result['method'] = f"price (overrides {result['method']})"
+        else:
+            result['confidence'] = round(result['confidence'] * 0.6, 3)
+            result['method'] += ' (price disagrees)'
+
+    result['multiplier'] = MULTIPLIERS[result['unit']]
+    return result
@@ -1,4 +1,3 @@
-
 import os
 from dotenv import load_dotenv
 from supabase import create_client
@@ -6,74 +5,51 @@ from supabase import create_client
 load_dotenv('../credentials.env')
 supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
 
+# Individual positions above this are flagged (likely a units error)
+HUGE_POSITION_VALUE = 200_000_000_000
+
 def verify_all():
     print("📋 Verifying ALL Funds Data...\n")
     
-    # 1. Fetch all funds
-    funds = supabase.table("hedge_funds").select("id, name").execute().data
+    # 1. One RPC for all funds: counts, range, latest-quarter sum and anomaly
+    # counts are aggregated in Postgres (fund_audit) and returned as one jsonb
+    # array, so the API row cap can't truncate the fund list.
+    funds = supabase.rpc("fund_audit", {"p_huge_value": HUGE_POSITION_VALUE}).execute().data or []
     
     print(f"{'Fund Name':<30} | {'Rows':<6} | {'Range':<22} | {'Latest Assets':<15} | {'Issues'}")
     print("-" * 110)
     
     for fund in funds:
-        fid = fund['id']
         name = fund['name'][:28]
+        count = fund['row_count']
         
         # A. Basic Stats (Rows, Date Range)
-        # We can't use aggregations easily in standard REST, so we fetch 'report_period' only.
-        # Ensure we fetch enough to get min/max.
-        # For efficiency, we just order desc and limit to check latest, and count.
-        
-        # Count
-        res_count = supabase.table("fund_holdings").select("id", count="exact", head=True).eq("fund_id", fid).execute()
-        count = res_count.count
-        
-        # Latest Date
-        res_latest = supabase.table("fund_holdings").select("report_period").eq("fund_id", fid).order("report_period", desc=True).limit(1).execute()
-        latest_date = res_latest.data[0]['report_period'] if res_latest.data else "N/A"
-        
-        # Earliest Date
-        res_earliest = supabase.table("fund_holdings").select("report_period").eq("fund_id", fid).order("report_period", desc=False).limit(1).execute()
-        earliest_date = res_earliest.data[0]['report_period'] if res_earliest.data else "N/A"
-        
+        latest_date = fund['newest_period'] or "N/A"
+        earliest_date = fund['oldest_period'] or "N/A"
         date_range = f"{earliest_date} ~ {latest_date}"
         
         # B. Asset Check (Latest Quarter Inflation)
-        latest_assets = 0
+        latest_assets = fund['latest_total'] or 0
         issues = []
-        if latest_date != "N/A":
-            # Fetch sums manually (no SUM aggregation in client)
-            # Batch fetch rows for latest period
-            rows = []
-            start = 0
-            while True:
-                r = supabase.table("fund_holdings").select("value, symbol").eq("fund_id", fid).eq("report_period", latest_date).range(start, start+999).execute()
-                if not r.data: break
-                rows.extend(r.data)
-                if len(r.data) < 1000: break
-                start += 1000
-                
-            latest_assets = sum([x['value'] for x in rows])
-            
-            # Check for Bad Symbols or Huge Values in this batch
-            bad_syms = [x['symbol'] for x in rows if '=' in x['symbol'] or '.BA' in x['symbol']]
-            if bad_syms:
-                issues.append(f"{len(bad_syms)} Bad Syms")
-                
-            # Check for individual huge assets (> $200B) - except known
-            # If Fund is NOT Berkshire, chances of >$200B position are low?
-            # Citadel/Bridgewater have huge AUM but diversified.
-            huge_pos = [x for x in rows if x['value'] > 200_000_000_000]
-            if huge_pos:
-                # Filter out likely valid ones? NO, assuming user wants anomalous check.
-                # Just report count
-                issues.append(f"{len(huge_pos)} >$200B")
         
-        # C. Duplicates Check (Sample)
-        # Hard to check without fetching all.
-        # But if 'count' is massive compared to reasonable (e.g. > 10,000 for one fund?), might be dups.
+        # Bad Symbols (FX pairs / foreign listings) in the latest quarter
+        if fund['bad_symbol_count']:
+            issues.append(f"{fund['bad_symbol_count']} Bad Syms")
+            
+        # Individual huge assets (> $200B)
+        # Citadel/Bridgewater have huge AUM but diversified.
+        if fund['huge_position_count']:
+            issues.append(f"{fund['huge_position_count']} >$200B")
+        
+        # Precomputed summary out of date (or missing) for the latest quarter
+        if count and fund['summary_total'] is None:
+            issues.append("No Summary")
+        elif count and abs((fund['summary_total'] or 0) - latest_assets) > max(1, latest_assets * 1e-6):
+            issues.append("Stale Summary")
+        
+        # C. Row count sanity
         # Typical 13F: 100-2000 holdings * 40 quarters = 80,000 max.
-        # If count > 100,000, suspicious?
+        # If count > 50,000, suspicious?
         if count > 50000:
             issues.append("High Row Count")
 
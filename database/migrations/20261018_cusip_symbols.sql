@@ -0,0 +1,17 @@
+-- Persistent CUSIP -> ticker resolution cache for 13F holdings
+-- symbol NULL = negative entry (lookup failed), retried after expires_at.
+create table if not exists public.cusip_symbols (
+  cusip text primary key,
+  symbol text,                    -- Resolved ticker (NULL if unresolved)
+  name text,                      -- nameOfIssuer as filed
+  resolved_at timestamp with time zone default timezone('utc'::text, now()),
+  expires_at timestamp with time zone  -- Only set for negative entries
+);
+
+create index if not exists idx_cusip_symbols_symbol on public.cusip_symbols(symbol);
+
+-- RLS for CUSIP Symbols
+-- Written by the collector with the anon key (same workaround as fix_rls_allow_write.sql)
+alter table public.cusip_symbols enable row level security;
+drop policy if exists "Allow public all access" on public.cusip_symbols;
+create policy "Allow public all access" on public.cusip_symbols for all using (true) with check (true);
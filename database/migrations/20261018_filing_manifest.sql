@@ -0,0 +1,24 @@
+-- Accession-level ingestion manifest for 13F filings
+-- One row per SEC accession; the collector diffs submissions against it
+-- so already-loaded filings cost no index/XML requests on re-runs.
+create table if not exists public.filing_manifest (
+  accession_number text primary key,       -- e.g. 0000950123-24-011775
+  fund_id uuid references public.hedge_funds(id) on delete cascade,
+  cik text,
+  report_period date,
+  filing_date date,
+  xml_url text,                             -- Resolved information table URL
+  status text not null default 'pending',   -- 'loaded', 'empty', 'failed'
+  row_count integer,                        -- Rows written to fund_holdings
+  checksum text,                            -- SHA-256 of parsed (cusip, shares, value) rows
+  error text,
+  updated_at timestamp with time zone default timezone('utc'::text, now())
+);
+
+create index if not exists idx_filing_manifest_fund on public.filing_manifest(fund_id);
+
+-- RLS for Filing Manifest
+-- Written by the collector with the anon key (same workaround as fix_rls_allow_write.sql)
+alter table public.filing_manifest enable row level security;
+drop policy if exists "Allow public all access" on public.filing_manifest;
+create policy "Allow public all access" on public.filing_manifest for all using (true) with check (true);
@@ -0,0 +1,4 @@
+-- Track whether an accession was ingested in full-book mode (every infoTable row)
+-- or truncated to the top holdings by value. Full-book runs re-ingest truncated loads.
+ALTER TABLE public.filing_manifest
+ADD COLUMN IF NOT EXISTS full_book BOOLEAN NOT NULL DEFAULT FALSE;
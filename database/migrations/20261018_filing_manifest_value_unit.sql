@@ -0,0 +1,7 @@
+-- Unit of the filed <value> column detected at ingest time.
+-- 'dollars' (amended Form 13F, filed on/after 2023-01-03) or 'thousands' (older filings).
+-- unit_confidence combines the cover-page schema version / filing date prior with the
+-- implied price per share checked against market prices (0-1).
+ALTER TABLE public.filing_manifest
+ADD COLUMN IF NOT EXISTS value_unit TEXT,
+ADD COLUMN IF NOT EXISTS unit_confidence NUMERIC;
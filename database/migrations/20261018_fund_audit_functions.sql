@@ -0,0 +1,76 @@
+-- Server-side aggregates for the audit scripts (called via PostgREST RPC)
+-- One call returns stats for every fund, so audits cost a single round trip
+-- instead of paging fund_holdings through the 1000-row API cap.
+-- Each function returns a single jsonb array (one element per fund) rather
+-- than a set of rows: PostgREST applies max-rows to set-returning functions,
+-- so a table result would be silently truncated past the cap.
+
+-- Latest-period lookups per fund (the unique key leads with symbol, not period)
+create index if not exists idx_fund_holdings_fund_period on public.fund_holdings(fund_id, report_period);
+
+-- Earlier drafts of this migration returned tables (and added an unused fund_period_stats)
+drop function if exists public.fund_period_stats(uuid);
+drop function if exists public.fund_collection_status();
+drop function if exists public.fund_audit(numeric);
+
+-- 1. Per fund: row / period counts and collected range
+--    [{fund_id, name, row_count, period_count, oldest_period, newest_period}, ...] by name
+create or replace function public.fund_collection_status()
+returns jsonb as $$
+  with status as (
+    select f.id as fund_id, f.name,
+           count(h.id) as row_count,
+           count(distinct h.report_period) as period_count,
+           min(h.report_period) as oldest_period,
+           max(h.report_period) as newest_period
+    from public.hedge_funds f
+    left join public.fund_holdings h on h.fund_id = f.id
+    group by f.id, f.name
+  )
+  select coalesce(jsonb_agg(to_jsonb(s) order by s.name), '[]'::jsonb)
+  from status s;
+$$ language sql stable;
+
+-- 2. Per fund: collection status plus latest-quarter totals and anomaly counts
+--    bad_symbol_count: symbols containing '=' or '.BA' (FX / foreign listings)
+--    huge_position_count: single positions above p_huge_value
+--    summary_total: fund_period_summary.total_value for the latest quarter (NULL if missing)
+create or replace function public.fund_audit(p_huge_value numeric default 200000000000)
+returns jsonb as $$
+  with status as (
+    select f.id as fund_id, f.name,
+           count(h.id) as row_count,
+           count(distinct h.report_period) as period_count,
+           min(h.report_period) as oldest_period,
+           max(h.report_period) as newest_period
+    from public.hedge_funds f
+    left join public.fund_holdings h on h.fund_id = f.id
+    group by f.id, f.name
+  ),
+  latest as (
+    select h.fund_id,
+           coalesce(sum(h.value), 0) as latest_total,
+           count(*) as latest_positions,
+           count(*) filter (where h.symbol like '%=%' or h.symbol like '%.BA%') as bad_symbol_count,
+           count(*) filter (where h.value > p_huge_value) as huge_position_count
+    from public.fund_holdings h
+    join status s on s.fund_id = h.fund_id and s.newest_period = h.report_period
+    group by h.fund_id
+  ),
+  audit as (
+    select s.fund_id, s.name, s.row_count, s.period_count, s.oldest_period, s.newest_period,
+           coalesce(l.latest_total, 0) as latest_total,
+           coalesce(l.latest_positions, 0) as latest_positions,
+           coalesce(l.bad_symbol_count, 0) as bad_symbol_count,
+           coalesce(l.huge_position_count, 0) as huge_position_count,
+           ps.total_value as summary_total
+    from status s
+    left join latest l on l.fund_id = s.fund_id
+    left join public.fund_period_summary ps on ps.fund_id = s.fund_id and ps.report_period = s.newest_period
+  )
+  select coalesce(jsonb_agg(to_jsonb(a) order by a.name), '[]'::jsonb)
+  from audit a;
+$$ language sql stable;
+
+grant execute on function public.fund_collection_status() to anon, authenticated;
+grant execute on function public.fund_audit(numeric) to anon, authenticated;
@@ -0,0 +1,23 @@
+-- Precomputed per-fund, per-quarter portfolio summary
+-- Maintained by the 13F collector after each filing is written, so pages and
+-- checks read one row instead of summing every fund_holdings row.
+create table if not exists public.fund_period_summary (
+  fund_id uuid references public.hedge_funds(id) on delete cascade,
+  report_period date not null,
+  total_value numeric,            -- Sum of position values (AUM reported in the 13F)
+  position_count integer,         -- Number of stored positions
+  max_position_value numeric,     -- Largest single position
+  top10_weight numeric,           -- Share of total_value in the 10 largest positions (0-1)
+  hhi numeric,                    -- Herfindahl concentration index: sum of squared weights (0-1)
+  sector_weights jsonb,           -- {"Technology": 0.42, ...} by value
+  updated_at timestamp with time zone default timezone('utc'::text, now()),
+  primary key (fund_id, report_period)
+);
+
+create index if not exists idx_fund_period_summary_period on public.fund_period_summary(report_period);
+
+-- RLS for Fund Period Summary
+-- Written by the collector with the anon key (same workaround as fix_rls_allow_write.sql)
+alter table public.fund_period_summary enable row level security;
+drop policy if exists "Allow public all access" on public.fund_period_summary;
+create policy "Allow public all access" on public.fund_period_summary for all using (true) with check (true);
@@ -0,0 +1,27 @@
+-- Pairwise fund similarity per quarter (computed by data_pipeline/utils/fund_similarity_utils.py)
+-- Each fund's most similar peers (TOP_K above MIN_COSINE there) are kept; each
+-- unordered pair is stored once with fund_a < fund_b.
+create table if not exists public.fund_similarity (
+  report_period date not null,
+  fund_a uuid references public.hedge_funds(id) on delete cascade,
+  fund_b uuid references public.hedge_funds(id) on delete cascade,
+  cosine numeric,                 -- Cosine similarity of portfolio weight vectors (0-1)
+  overlap_a numeric,              -- Share of fund_a's value in names fund_b also holds (0-1)
+  overlap_b numeric,              -- Share of fund_b's value in names fund_a also holds (0-1)
+  shared_positions integer,       -- Number of symbols held by both
+  cosine_change numeric,          -- Cosine vs the previous quarter (NULL if the pair was not stored then)
+  updated_at timestamp with time zone default timezone('utc'::text, now()),
+  primary key (report_period, fund_a, fund_b)
+);
+
+create index if not exists idx_fund_similarity_a on public.fund_similarity(fund_a, report_period);
+create index if not exists idx_fund_similarity_b on public.fund_similarity(fund_b, report_period);
+
+-- Loading one quarter across every fund
+create index if not exists idx_fund_holdings_period on public.fund_holdings(report_period);
+
+-- RLS for Fund Similarity
+-- Written by the collector with the anon key (same workaround as fix_rls_allow_write.sql)
+alter table public.fund_similarity enable row level security;
+drop policy if exists "Allow public all access" on public.fund_similarity;
+create policy "Allow public all access" on public.fund_similarity for all using (true) with check (true);
@@ -0,0 +1,114 @@
+-- Set-based fund_holdings repairs (called via PostgREST RPC from run_maintenance.py)
+-- Each function runs as one statement on the server and returns only
+--   {"matched": n, "affected": n, "funds": [fund_id, ...],
+--    "fund_periods": [{"fund_id": ..., "report_period": ...}, ...], "sample": [{...}, ...]}
+-- fund_periods lets the caller rebuild the tables derived from fund_holdings.
+-- With p_dry_run = true nothing is changed (affected = 0).
+
+-- 1. Delete rows whose symbol matches any LIKE pattern (e.g. '%=%', '%.BA')
+create or replace function public.holdings_delete_symbols(
+  p_patterns text[], p_dry_run boolean default true, p_sample integer default 5)
+returns jsonb as $$
+declare
+  result jsonb;
+  affected bigint := 0;
+begin
+  select jsonb_build_object(
+           'matched', count(*),
+           'funds', coalesce(jsonb_agg(distinct h.fund_id), '[]'::jsonb),
+           'fund_periods', coalesce(jsonb_agg(distinct jsonb_build_object(
+             'fund_id', h.fund_id, 'report_period', h.report_period)), '[]'::jsonb),
+           'sample', coalesce((
+             select jsonb_agg(s) from (
+               select x.symbol, x.report_period, x.value from public.fund_holdings x
+               where x.symbol like any(p_patterns) limit p_sample) s), '[]'::jsonb))
+    into result
+    from public.fund_holdings h
+   where h.symbol like any(p_patterns);
+
+  if not p_dry_run then
+    delete from public.fund_holdings where symbol like any(p_patterns);
+    get diagnostics affected = row_count;
+  end if;
+  return result || jsonb_build_object('affected', affected);
+end;
+$$ language plpgsql;
+
+-- 2. Multiply value by p_factor for rows above p_min_value (e.g. thousands-scaled dollars)
+create or replace function public.holdings_scale_values(
+  p_min_value numeric, p_factor numeric, p_dry_run boolean default true, p_sample integer default 5)
+returns jsonb as $$
+declare
+  result jsonb;
+  affected bigint := 0;
+begin
+  select jsonb_build_object(
+           'matched', count(*),
+           'funds', coalesce(jsonb_agg(distinct h.fund_id), '[]'::jsonb),
+           'fund_periods', coalesce(jsonb_agg(distinct jsonb_build_object(
+             'fund_id', h.fund_id, 'report_period', h.report_period)), '[]'::jsonb),
+           'sample', coalesce((
+             select jsonb_agg(s) from (
+               select x.symbol, x.report_period, x.value, x.value * p_factor as new_value
+               from public.fund_holdings x
+               where x.value > p_min_value order by x.value desc limit p_sample) s), '[]'::jsonb))
+    into result
+    from public.fund_holdings h
+   where h.value > p_min_value;
+
+  if not p_dry_run then
+    update public.fund_holdings set value = value * p_factor where value > p_min_value;
+    get diagnostics affected = row_count;
+  end if;
+  return result || jsonb_build_object('affected', affected);
+end;
+$$ language plpgsql;
+
+-- 3. Delete duplicate (fund_id, symbol, report_period) rows, keeping the oldest
+--    Unresolved rows (symbol NULL) are distinct positions, not duplicates; they
+--    are skipped, as in dedup_utils.iter_holdings_duplicates.
+create or replace function public.holdings_delete_duplicates(
+  p_dry_run boolean default true, p_sample integer default 5)
+returns jsonb as $$
+declare
+  result jsonb;
+  affected bigint := 0;
+begin
+  create temporary table if not exists _holdings_dupes (id uuid, fund_id uuid, symbol text, report_period date) on commit drop;
+  truncate _holdings_dupes;
+
+  insert into _holdings_dupes
+  select id, fund_id, symbol, report_period from (
+    select id, fund_id, symbol, report_period,
+           row_number() over (partition by fund_id, symbol, report_period order by created_at, id) as rn
+    from public.fund_holdings
+    where symbol is not null
+  ) ranked
+  where rn > 1;
+
+  select jsonb_build_object(
+           'matched', count(*),
+           'funds', coalesce(jsonb_agg(distinct d.fund_id), '[]'::jsonb),
+           'fund_periods', coalesce(jsonb_agg(distinct jsonb_build_object(
+             'fund_id', d.fund_id, 'report_period', d.report_period)), '[]'::jsonb),
+           'sample', coalesce((
+             select jsonb_agg(s) from (
+               select x.symbol, x.report_period from _holdings_dupes x limit p_sample) s), '[]'::jsonb))
+    into result
+    from _holdings_dupes d;
+
+  if not p_dry_run then
+    delete from public.fund_holdings h using _holdings_dupes d where h.id = d.id;
+    get diagnostics affected = row_count;
+  end if;
+  return result || jsonb_build_object('affected', affected);
+end;
+$$ language plpgsql;
+
+-- Destructive: callable with the service-role key only (the anon key ships in the web bundle)
+revoke execute on function public.holdings_delete_symbols(text[], boolean, integer) from public, anon, authenticated;
+revoke execute on function public.holdings_scale_values(numeric, numeric, boolean, integer) from public, anon, authenticated;
+revoke execute on function public.holdings_delete_duplicates(boolean, integer) from public, anon, authenticated;
+grant execute on function public.holdings_delete_symbols(text[], boolean, integer) to service_role;
+grant execute on function public.holdings_scale_values(numeric, numeric, boolean, integer) to service_role;
+grant execute on function public.holdings_delete_duplicates(boolean, integer) to service_role;
@@ -0,0 +1,5 @@
+-- Hash of each stock_data row's normalized content (volatile fields such as
+-- updated_at excluded). The collector's sink compares it before writing, so
+-- only rows whose content actually changed are upserted.
+ALTER TABLE public.stock_data
+ADD COLUMN IF NOT EXISTS content_hash TEXT;
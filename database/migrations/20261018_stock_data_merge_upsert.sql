@@ -0,0 +1,46 @@
+-- Bulk stock_data upsert for the collector's sink (data_pipeline/utils/stock_sink_utils.py).
+-- valuation_metrics is shared: the collector writes dcf / div_yield_ttm / ...,
+-- enrich_stock_analysis.py adds ai_analysis, pe_ratio, dividend_yield and dps.
+-- A plain PostgREST upsert replaces the whole jsonb and drops the enrichment
+-- keys, so existing keys are merged here (incoming keys win).
+-- Runs as the caller (security invoker), so stock_data's RLS still applies.
+create or replace function public.upsert_stock_data(p_rows jsonb)
+returns integer as $$
+  with incoming as (
+    select * from jsonb_to_recordset(p_rows) as r(
+      symbol text,
+      name text,
+      sector text,
+      industry text,
+      market_cap numeric,
+      price numeric,
+      changes_percentage numeric,
+      financials jsonb,
+      valuation_metrics jsonb,
+      updated_at timestamp with time zone,
+      content_hash text
+    )
+  ),
+  written as (
+    insert into public.stock_data as s (symbol, name, sector, industry, market_cap, price, changes_percentage,
+                                        financials, valuation_metrics, updated_at, content_hash)
+    select symbol, name, sector, industry, round(market_cap)::bigint, price, changes_percentage,
+           financials, valuation_metrics, coalesce(updated_at, timezone('utc'::text, now())), content_hash
+    from incoming
+    on conflict (symbol) do update set
+      name = excluded.name,
+      sector = excluded.sector,
+      industry = excluded.industry,
+      market_cap = excluded.market_cap,
+      price = excluded.price,
+      changes_percentage = excluded.changes_percentage,
+      financials = excluded.financials,
+      valuation_metrics = coalesce(s.valuation_metrics, '{}'::jsonb) || coalesce(excluded.valuation_metrics, '{}'::jsonb),
+      updated_at = excluded.updated_at,
+      content_hash = excluded.content_hash
+    returning 1
+  )
+  select count(*)::integer from written;
+$$ language sql volatile;
+
+grant execute on function public.upsert_stock_data(jsonb) to anon, authenticated, service_role;
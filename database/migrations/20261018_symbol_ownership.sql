@@ -0,0 +1,32 @@
+-- Inverted ownership index: symbol -> (fund, quarter) positions
+-- Maintained by the 13F collector per filing; answers "who holds KO" and
+-- "how many tracked funds held KO each quarter" from one index range scan.
+create table if not exists public.symbol_ownership (
+  symbol text not null,
+  report_period date not null,
+  fund_id uuid references public.hedge_funds(id) on delete cascade,
+  shares numeric,
+  value numeric,
+  weight numeric,                 -- value / fund total_value for the quarter (0-1)
+  updated_at timestamp with time zone default timezone('utc'::text, now()),
+  primary key (symbol, report_period, fund_id)
+);
+
+-- Replacing one filing's slice (delete by fund + period)
+create index if not exists idx_symbol_ownership_fund_period on public.symbol_ownership(fund_id, report_period);
+
+-- Holder count and aggregate tracked-fund ownership per symbol and quarter
+create or replace view public.symbol_ownership_summary as
+select symbol,
+       report_period,
+       count(*) as holder_count,
+       sum(shares) as total_shares,
+       sum(value) as total_value
+from public.symbol_ownership
+group by symbol, report_period;
+
+-- RLS for Symbol Ownership
+-- Written by the collector with the anon key (same workaround as fix_rls_allow_write.sql)
+alter table public.symbol_ownership enable row level security;
+drop policy if exists "Allow public all access" on public.symbol_ownership;
+create policy "Allow public all access" on public.symbol_ownership for all using (true) with check (true);
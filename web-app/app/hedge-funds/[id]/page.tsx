@@ -26,15 +26,27 @@ export default async function HedgeFundDetailPage({ params }: { params: { id: st
         return <div className="container mx-auto p-10 text-center">Fund not found.</div>
     }
 
-    // 2. Fetch Latest Report Period
-    const { data: periods } = await supabase
-        .from('fund_holdings')
-        .select('report_period')
+    // 2. Fetch Latest Period Summary (precomputed by the 13F pipeline)
+    const { data: summaries } = await supabase
+        .from('fund_period_summary')
+        .select('*')
         .eq('fund_id', id)
         .order('report_period', { ascending: false })
         .limit(1)
 
-    const latestPeriod = periods?.[0]?.report_period
+    const summary = summaries?.[0]
+    let latestPeriod = summary?.report_period
+
+    if (!latestPeriod) {
+        // Fallback: funds without a summary row yet
+        const { data: periods } = await supabase
+            .from('fund_holdings')
+            .select('report_period')
+            .eq('fund_id', id)
+            .order('report_period', { ascending: false })
+            .limit(1)
+        latestPeriod = periods?.[0]?.report_period
+    }
 
     // 3. Fetch Holdings from DB (Filtered by Latest Period)
     const { data: dbHoldings, error: holdingsError } = await supabase
@@ -56,7 +68,9 @@ export default async function HedgeFundDetailPage({ params }: { params: { id: st
         value: h.value,
         avg_buy_price: h.avg_buy_price,
         report_period: h.report_period,
-        first_added: h.created_at,
+        first_added: h.first_added || h.report_period,
+        change_from_prev: h.change_from_prev,
+        estimated_entry_price: h.estimated_entry_price,
 
         // Pass through analysis fields
         ai_analysis: h.stock_data?.valuation_metrics?.ai_analysis,
@@ -68,17 +82,20 @@ export default async function HedgeFundDetailPage({ params }: { params: { id: st
         stock_data: h.stock_data
     })) || []
 
-    // Calculate Stats
-    const totalValue = holdings.reduce((sum, h) => sum + (h.value || 0), 0)
+    // Stats: read from the summary row, computed from holdings only as a fallback
+    const totalValue = summary?.total_value ?? holdings.reduce((sum, h) => sum + (h.value || 0), 0)
 
-    const sectors: Record<string, number> = {}
-    holdings.forEach(h => {
-        const s = h.sector || "Unknown"
-        sectors[s] = (sectors[s] || 0) + h.value
-    })
+    let sectors: Record<string, number> = summary?.sector_weights || {}
+    if (!summary) {
+        sectors = {}
+        holdings.forEach(h => {
+            const s = h.sector || "Unknown"
+            sectors[s] = (sectors[s] || 0) + h.value
+        })
+    }
     const topSector = Object.entries(sectors).sort((a, b) => b[1] - a[1])[0]?.[0] || "Diversified"
 
-    const holdingCount = holdings.length
+    const holdingCount = summary?.position_count ?? holdings.length
 
     // Formatter
     const formatCurrency = (val: number) =>
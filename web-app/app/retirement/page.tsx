@@ -15,6 +15,7 @@ import { ReportHeader } from "@/components/retirement/ReportHeader"
 import { ReportSummary } from "@/components/retirement/ReportSummary"
 import { ReportAnalysis } from "@/components/retirement/ReportAnalysis"
 import Link from "next/link"
+import { loadStockIndex, loadStockDetails } from "@/lib/stock-data"
 import { Crown, Shield, TrendingUp, Scale, Sparkles, FileText, Lock, Printer, Search, ArrowRight, Wand2, Download } from "lucide-react"
 
 export default function RetirementPage() {
@@ -45,8 +46,7 @@ export default function RetirementPage() {
 
     useEffect(() => {
         // Load data for curation
-        fetch('/stock_data.json')
-            .then(res => res.json())
+        loadStockIndex()
             .then(data => {
                 setStocks(data || [])
                 setLoading(false)
@@ -94,8 +94,14 @@ export default function RetirementPage() {
         }
 
         // Pick top 5 matching
-        setPortfolio(matchedStocks.slice(0, 5))
+        const picks = matchedStocks.slice(0, 5)
+        setPortfolio(picks)
         setIsGenerated(true)
+
+        // The index only carries list fields; the report needs the full records (financials etc.)
+        loadStockDetails(picks.map(s => s.symbol))
+            .then(details => { if (details.length) setPortfolio(details) })
+            .catch(err => console.error(err))
     }
 
     if (loading) return <div className="min-h-screen flex items-center justify-center text-slate-400">Loading Data...</div>
@@ -3,6 +3,8 @@
 import { useState, useEffect } from 'react'
 import { useRouter } from 'next/navigation'
 import { supabase } from '@/lib/supabase'
+import { loadStockDetail } from '@/lib/stock-data'
+import { loadSymbolOwnership, SymbolOwnership } from '@/lib/ownership-data'
 import { Button } from "@/components/ui/button"
 import { Badge } from "@/components/ui/badge"
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card"
@@ -94,6 +96,16 @@ const generateOwnershipData = (symbol: string) => {
     ]
 }
 
+// Tracked hedge fund holders from the pipeline's bucketed ownership files
+const loadFundHolders = async (symbol: string): Promise<SymbolOwnership> => {
+    try {
+        return await loadSymbolOwnership(symbol)
+    } catch (e) {
+        console.error("Failed to load ownership index", e)
+        return { period: null, holders: [], counts: [] }
+    }
+}
+
 export default function StockDetailClient({ symbol }: { symbol: string }) {
     const router = useRouter()
 
@@ -101,6 +113,7 @@ export default function StockDetailClient({ symbol }: { symbol: string }) {
     const [history, setHistory] = useState<any[]>([])
     const [news, setNews] = useState<any[]>([])
     const [ownership, setOwnership] = useState<any[]>([])
+    const [fundHolders, setFundHolders] = useState<SymbolOwnership>({ period: null, holders: [], counts: [] })
     const [media, setMedia] = useState<any[]>([])
     const [social, setSocial] = useState<any[]>([])
     const [loading, setLoading] = useState(true)
@@ -109,15 +122,14 @@ export default function StockDetailClient({ symbol }: { symbol: string }) {
         if (!symbol) return
         async function fetchStock() {
             try {
-                const res = await fetch('/stock_data.json');
-                const allStocks = await res.json();
-                const data = allStocks.find((s: any) => s.symbol === symbol);
+                const data = await loadStockDetail(symbol);
 
                 if (data) {
                     setStock(data)
                     setHistory(generateMockHistory(data.price))
                     setNews(generateMockNews(symbol, data.name))
                     setOwnership(generateOwnershipData(symbol))
+                    setFundHolders(await loadFundHolders(symbol))
                     setMedia(generateMockMedia(symbol, data.name))
                     setSocial(generateMockSocial(symbol))
                 }
@@ -354,6 +366,34 @@ export default function StockDetailClient({ symbol }: { symbol: string }) {
                                 </div>
                             </CardContent>
                         </Card>
+
+                        {/* Tracked Fund Holders (13F ownership index) */}
+                        <Card className="border-slate-200">
+                            <CardHeader className="pb-2">
+                                <CardTitle className="flex items-center gap-2 text-base font-bold text-slate-800">
+                                    <Users className="h-4 w-4 text-slate-500" />
+                                    헤지펀드 보유 현황 (Fund Holders)
+                                </CardTitle>
+                                <CardDescription className="text-xs">
+                                    {fundHolders.period ? `13F as of ${fundHolders.period} · ${fundHolders.holders.length} tracked funds` : 'No tracked fund holds this stock.'}
+                                </CardDescription>
+                            </CardHeader>
+                            <CardContent className="space-y-3">
+                                {fundHolders.holders.slice(0, 5).map(h => (
+                                    <div key={h.fund_id} className="flex justify-between items-center text-sm">
+                                        <span className="font-medium text-slate-700 truncate pr-2">{h.name}</span>
+                                        <span className="text-slate-500 whitespace-nowrap">
+                                            ${(h.value / 1_000_000).toFixed(1)}M · {((h.weight || 0) * 100).toFixed(2)}%
+                                        </span>
+                                    </div>
+                                ))}
+                                {fundHolders.counts.length > 1 && (
+                                    <div className="text-xs text-slate-400 pt-2">
+                                        Holders by quarter: {fundHolders.counts.map(c => c.holders).join(' → ')}
+                                    </div>
+                                )}
+                            </CardContent>
+                        </Card>
                     </div>
 
                     {/* Full Width Bottom Section: News & Social */}
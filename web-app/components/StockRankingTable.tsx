@@ -15,6 +15,7 @@ import { Input } from "@/components/ui/input"
 import { Button } from "@/components/ui/button"
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs"
 import { ArrowUpDown, Search } from "lucide-react"
+import { loadStockIndex } from "@/lib/stock-data"
 
 interface Stock {
     symbol: string
@@ -40,10 +41,9 @@ export default function StockRankingTable({ fixedFilter }: { fixedFilter?: strin
     useEffect(() => {
         async function fetchData() {
             try {
-                const res = await fetch('/stock_data.json')
-                const data = await res.json()
+                const data = await loadStockIndex()
                 if (data) {
-                    const sorted = data.sort((a: Stock, b: Stock) => (b.market_cap || 0) - (a.market_cap || 0))
+                    const sorted = [...data].sort((a: Stock, b: Stock) => (b.market_cap || 0) - (a.market_cap || 0))
                     setStocks(sorted)
                     setFilteredStocks(sorted)
                 }
@@ -4,6 +4,7 @@ import { useEffect, useState } from 'react'
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card"
 import { Treemap, ResponsiveContainer, Tooltip } from 'recharts'
 import { useRouter } from 'next/navigation'
+import { loadStockIndex } from '@/lib/stock-data'
 
 // Customized Content for Treemap Node
 const CustomizedContent = (props: any) => {
@@ -107,8 +108,7 @@ export default function StockTreeMap() {
     useEffect(() => {
         async function fetchData() {
             try {
-                const res = await fetch('/stock_data.json');
-                const stocks = await res.json();
+                const stocks = await loadStockIndex();
 
                 if (!stocks) {
                     setLoading(false)
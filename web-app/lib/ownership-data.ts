@@ -0,0 +1,66 @@
+// Loader for the 13F holder buckets (data_pipeline/utils/static_artifact_utils.py,
+// publish_ownership_artifacts). /ownership_manifest.json lists the quarters and
+// the content-hashed bucket files; a symbol's holders live in one bucket.
+import { fnv1a } from './stock-data'
+
+export type FundHolder = { fund_id: string, name: string, shares: number, value: number, weight: number }
+
+export interface SymbolOwnership {
+    period: string | null;
+    holders: FundHolder[];
+    counts: { period: string, holders: number }[];
+}
+
+interface OwnershipManifest {
+    version: number;
+    generated_at: string;
+    periods: string[];
+    buckets: string[];
+}
+
+interface OwnershipBucket {
+    funds: [string, string][];
+    symbols: Record<string, [number, number, number, number, number][]>;
+}
+
+let manifestPromise: Promise<OwnershipManifest> | null = null;
+const bucketPromises: Record<string, Promise<OwnershipBucket>> = {};
+
+async function fetchJson<T>(path: string, init?: RequestInit): Promise<T> {
+    const res = await fetch(path, init);
+    if (!res.ok) throw new Error(`Failed to load ${path}: ${res.status}`);
+    return res.json();
+}
+
+function loadOwnershipManifest(): Promise<OwnershipManifest> {
+    if (!manifestPromise) {
+        manifestPromise = fetchJson<OwnershipManifest>('/ownership_manifest.json', { cache: 'no-cache' })
+            .catch(e => { manifestPromise = null; throw e; });
+    }
+    return manifestPromise;
+}
+
+/** Latest-quarter tracked fund holders and holder count per quarter for one symbol. */
+export async function loadSymbolOwnership(symbol: string): Promise<SymbolOwnership> {
+    const manifest = await loadOwnershipManifest();
+    if (!manifest.buckets.length) return { period: null, holders: [], counts: [] };
+
+    const bucket = manifest.buckets[fnv1a(symbol) % manifest.buckets.length];
+    if (!bucketPromises[bucket]) {
+        bucketPromises[bucket] = fetchJson<OwnershipBucket>(`/${bucket}`)
+            .catch(e => { delete bucketPromises[bucket]; throw e; });
+    }
+    const { funds, symbols } = await bucketPromises[bucket];
+    const rows = symbols[symbol] || [];
+    const latest = rows.reduce((max, r) => Math.max(max, r[1]), -1);
+
+    const holders: FundHolder[] = rows
+        .filter(r => r[1] === latest)
+        .map(([f, , shares, value, weight]) => ({
+            fund_id: funds[f][0], name: funds[f][1], shares, value, weight
+        }))
+        .sort((a, b) => b.value - a.value);
+
+    const counts = manifest.periods.map((period, i) => ({ period, holders: rows.filter(r => r[1] === i).length }));
+    return { period: latest >= 0 ? manifest.periods[latest] : null, holders, counts };
+}
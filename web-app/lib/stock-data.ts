@@ -0,0 +1,100 @@
+// Loaders for the collector's static stock artifacts (data_pipeline/utils/static_artifact_utils.py).
+// /stock_manifest.json is small and revalidated; every file it points at is
+// content-hashed under /data/ and cached forever.
+
+export interface StockSummary {
+    symbol: string;
+    name: string;
+    sector: string;
+    market_cap: number;
+    price: number;
+    changes_percentage: number;
+    valuation_metrics: {
+        dcf?: number;
+        div_yield_ttm?: number;
+    };
+}
+
+interface StockManifest {
+    version: number;
+    generated_at: string;
+    count: number;
+    index: string;
+    buckets: string[];
+}
+
+interface StockIndex {
+    columns: string[];
+    count: number;
+    data: Record<string, any[]>;
+}
+
+let manifestPromise: Promise<StockManifest> | null = null;
+let indexPromise: Promise<StockSummary[]> | null = null;
+const bucketPromises: Record<string, Promise<Record<string, string>>> = {};
+
+async function fetchJson<T>(path: string, init?: RequestInit): Promise<T> {
+    const res = await fetch(path, init);
+    if (!res.ok) throw new Error(`Failed to load ${path}: ${res.status}`);
+    return res.json();
+}
+
+// 32-bit FNV-1a over UTF-8 bytes; must match fnv1a_32() in the pipeline
+export function fnv1a(text: string): number {
+    let h = 0x811c9dc5;
+    for (const byte of new TextEncoder().encode(text)) {
+        h ^= byte;
+        h = Math.imul(h, 0x01000193) >>> 0;
+    }
+    return h >>> 0;
+}
+
+export function loadStockManifest(): Promise<StockManifest> {
+    if (!manifestPromise) {
+        manifestPromise = fetchJson<StockManifest>('/stock_manifest.json', { cache: 'no-cache' })
+            .catch(e => { manifestPromise = null; throw e; });
+    }
+    return manifestPromise;
+}
+
+/** List-view fields for every symbol (columnar index, sorted by market cap). */
+export function loadStockIndex(): Promise<StockSummary[]> {
+    if (!indexPromise) {
+        indexPromise = loadStockManifest()
+            .then(m => fetchJson<StockIndex>(`/${m.index}`))
+            .then(({ count, data }) => {
+                const rows: StockSummary[] = [];
+                for (let i = 0; i < count; i++) {
+                    rows.push({
+                        symbol: data.symbol[i],
+                        name: data.name[i],
+                        sector: data.sector[i],
+                        market_cap: data.market_cap[i],
+                        price: data.price[i],
+                        changes_percentage: data.changes_percentage[i],
+                        valuation_metrics: { dcf: data.dcf[i], div_yield_ttm: data.div_yield[i] },
+                    });
+                }
+                return rows;
+            })
+            .catch(e => { indexPromise = null; throw e; });
+    }
+    return indexPromise;
+}
+
+/** Full record for one symbol: manifest -> its bucket -> its detail file. */
+export async function loadStockDetail(symbol: string): Promise<any | null> {
+    const manifest = await loadStockManifest();
+    const bucket = manifest.buckets[fnv1a(symbol) % manifest.buckets.length];
+    if (!bucketPromises[bucket]) {
+        bucketPromises[bucket] = fetchJson<Record<string, string>>(`/${bucket}`)
+            .catch(e => { delete bucketPromises[bucket]; throw e; });
+    }
+    const path = (await bucketPromises[bucket])[symbol];
+    return path ? fetchJson<any>(`/${path}`) : null;
+}
+
+export async function loadStockDetails(symbols: string[]): Promise<any[]> {
+    const details = await Promise.all(symbols.map(s => loadStockDetail(s)));
+    return details.filter(Boolean);
+}